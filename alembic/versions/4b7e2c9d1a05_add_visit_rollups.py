@@ -0,0 +1,71 @@
+"""Add visit rollups and index visits by url
+
+Revision ID: 4b7e2c9d1a05
+Revises: c210e72b6a32
+Create Date: 2026-10-18 09:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7e2c9d1a05"
+down_revision: Union[str, Sequence[str], None] = "c210e72b6a32"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "visit_rollup",
+        sa.Column("url_id", sa.BigInteger(), nullable=False),
+        sa.Column("bucket", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("visits", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["url_id"], ["url.id"]),
+        sa.PrimaryKeyConstraint("url_id", "bucket", "bucket_start"),
+    )
+
+    # Rollups of the visits recorded so far. Visits written while this runs
+    # may be counted twice, so run it before starting the new log workers.
+    for bucket in ("hour", "day"):
+        op.execute(
+            sa.text(
+                """
+                INSERT INTO visit_rollup (url_id, bucket, bucket_start, visits)
+                SELECT url_id, :bucket,
+                       date_trunc(:bucket, visited_at AT TIME ZONE 'UTC')
+                           AT TIME ZONE 'UTC',
+                       count(*)
+                FROM visit
+                WHERE visited_at IS NOT NULL
+                GROUP BY 1, 2, 3
+                """
+            ).bindparams(bucket=bucket)
+        )
+
+    # Built concurrently so that visits can still be written meanwhile.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_visit_url_id_visited_at",
+            "visit",
+            ["url_id", "visited_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_visit_url_id_visited_at",
+            table_name="visit",
+            postgresql_concurrently=True,
+        )
+    op.drop_table("visit_rollup")
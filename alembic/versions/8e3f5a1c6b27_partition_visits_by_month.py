@@ -0,0 +1,122 @@
+"""Partition visits by month
+
+Revision ID: 8e3f5a1c6b27
+Revises: 4b7e2c9d1a05
+Create Date: 2026-10-18 10:00:00.000000+00:00
+
+Rewrites `visit` as a table range partitioned on `visited_at`, with one
+partition per month from the oldest visit to three months ahead and a
+default partition. Every visit is copied, so stop the log workers while it
+runs; redirects keep queueing their visits meanwhile. Later partitions are
+created by `python -m src.maintenance.partitions`.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3f5a1c6b27"
+down_revision: Union[str, Sequence[str], None] = "4b7e2c9d1a05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _set_aside_visit_table() -> None:
+    op.execute("ALTER TABLE visit RENAME TO visit_old")
+    op.execute("ALTER TABLE visit_old RENAME CONSTRAINT visit_pkey TO visit_old_pkey")
+    op.execute(
+        "ALTER TABLE visit_old RENAME CONSTRAINT visit_url_id_fkey "
+        "TO visit_old_url_id_fkey"
+    )
+    op.execute(
+        "ALTER INDEX ix_visit_url_id_visited_at "
+        "RENAME TO ix_visit_old_url_id_visited_at"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_aside_visit_table()
+    op.execute(
+        """
+        CREATE TABLE visit (
+            id BIGINT NOT NULL DEFAULT nextval('visit_id_seq'),
+            visitor_ip VARCHAR(45) NOT NULL,
+            url_id BIGINT NOT NULL REFERENCES url (id),
+            visited_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, visited_at)
+        ) PARTITION BY RANGE (visited_at)
+        """
+    )
+    op.execute("CREATE TABLE visit_default PARTITION OF visit DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc(
+                        'month',
+                        coalesce((SELECT min(visited_at) FROM visit_old), now())
+                            AT TIME ZONE 'UTC'
+                    ),
+                    date_trunc('month', now() AT TIME ZONE 'UTC')
+                        + interval '3 months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF visit FOR VALUES FROM (%L) TO (%L)',
+                    'visit_p' || to_char(month, 'YYYYMM'),
+                    month || ' 00:00+00',
+                    (month + interval '1 month')::date || ' 00:00+00'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO visit (id, visitor_ip, url_id, visited_at)
+        SELECT id, visitor_ip, url_id, coalesce(visited_at, now())
+        FROM visit_old
+        """
+    )
+    op.execute("ALTER SEQUENCE visit_id_seq OWNED BY visit.id")
+    op.execute("DROP TABLE visit_old")
+    op.create_index(
+        "ix_visit_url_id_visited_at", "visit", ["url_id", "visited_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_aside_visit_table()
+    op.execute(
+        """
+        CREATE TABLE visit (
+            id BIGINT NOT NULL DEFAULT nextval('visit_id_seq'),
+            visitor_ip VARCHAR(45) NOT NULL,
+            url_id INTEGER NOT NULL,
+            visited_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT visit_pkey PRIMARY KEY (id),
+            CONSTRAINT visit_url_id_fkey FOREIGN KEY (url_id) REFERENCES url (id)
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO visit (id, visitor_ip, url_id, visited_at)
+        SELECT id, visitor_ip, url_id, visited_at
+        FROM visit_old
+        """
+    )
+    op.execute("ALTER SEQUENCE visit_id_seq OWNED BY visit.id")
+    op.execute("DROP TABLE visit_old")
+    op.create_index(
+        "ix_visit_url_id_visited_at", "visit", ["url_id", "visited_at"], unique=False
+    )
@@ -0,0 +1,94 @@
+"""Deduplicate urls by a digest of the original url
+
+Revision ID: d5a91f0c3e48
+Revises: 8e3f5a1c6b27
+Create Date: 2026-10-18 11:00:00.000000+00:00
+
+Adds `url.original_url_hash`, the first 16 bytes of the SHA-256 of the
+original url, with a unique index, and backfills it in batches on the oldest
+url of every original url. The text index on `original_url` is dropped
+afterwards. Every step runs outside a long transaction, so shortening keeps
+working meanwhile; urls shortened by the previous version while the backfill
+runs are not deduplicated later.
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a91f0c3e48"
+down_revision: Union[str, Sequence[str], None] = "8e3f5a1c6b27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("url", sa.Column("original_url_hash", sa.LargeBinary(16)))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_url_original_url_hash",
+            "url",
+            ["original_url_hash"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+        connection = op.get_bind()
+        max_id = connection.execute(sa.text("SELECT max(id) FROM url")).scalar()
+        for start in range(0, (max_id or 0) + 1, BACKFILL_BATCH_SIZE):
+            # Each batch commits on its own. A url only gets the digest if no
+            # older url has the same original url and no url has the digest.
+            connection.execute(
+                sa.text(
+                    """
+                    UPDATE url
+                    SET original_url_hash = digest.value
+                    FROM url AS batch
+                    CROSS JOIN LATERAL (
+                        SELECT substring(
+                            sha256(convert_to(batch.original_url, 'UTF8'))
+                            FROM 1 FOR 16
+                        ) AS value
+                    ) AS digest
+                    WHERE url.id = batch.id
+                      AND batch.id >= :start AND batch.id < :end
+                      AND batch.original_url_hash IS NULL
+                      AND NOT EXISTS (
+                          SELECT 1 FROM url AS older
+                          WHERE older.original_url = batch.original_url
+                            AND older.id < batch.id
+                      )
+                      AND NOT EXISTS (
+                          SELECT 1 FROM url AS taken
+                          WHERE taken.original_url_hash = digest.value
+                      )
+                    """
+                ),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+
+        op.drop_index(
+            "ix_url_original_url", table_name="url", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_url_original_url",
+            "url",
+            ["original_url"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+    op.drop_index("ix_url_original_url_hash", table_name="url")
+    op.drop_column("url", "original_url_hash")
@@ -0,0 +1,33 @@
+"""Record the visit counter flush that last incremented each url
+
+Revision ID: f2b8d4e61c93
+Revises: d5a91f0c3e48
+Create Date: 2026-10-18 12:00:00.000000+00:00
+
+Adds `url.visit_count_flush_id`, which lets the visit counter flusher skip
+urls it already wrote back when a flush is retried. The column is nullable
+without a default, so adding it does not rewrite the table.
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b8d4e61c93"
+down_revision: Union[str, Sequence[str], None] = "d5a91f0c3e48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("url", sa.Column("visit_count_flush_id", sa.Uuid()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("url", "visit_count_flush_id")
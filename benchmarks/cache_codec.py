@@ -0,0 +1,60 @@
+"""
+Compares the per-hit and per-miss CPU cost of the redirect cache value format.
+
+The previous format stored a full `URL` row as pydantic JSON; the redirect
+path now stores a `ResolvedUrl` packed by `ResolvedUrlSerializer`.
+
+Run with `python -m benchmarks.cache_codec` from the project root.
+"""
+
+import timeit
+from datetime import datetime, timezone
+
+from src.core.infrastructures.cache.serializers import PydanticSerializer
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.entities.visits import Visit  # noqa: F401 (maps URL.visits)
+from src.core.shorten.schemas.resolved_url import ResolvedUrl, ResolvedUrlSerializer
+
+ITERATIONS = 200_000
+
+
+def _measure(label: str, func) -> float:
+    seconds = min(timeit.repeat(func, number=ITERATIONS, repeat=5))
+    per_call = seconds / ITERATIONS * 1e6
+    print(f"{label:<32} {per_call:8.3f} us/op")
+    return per_call
+
+
+def main():
+    url = URL(
+        id=123_456_789,
+        original_url="https://www.example.com/some/fairly/long/path?utm_source=kurt",
+        short_code="8M0kX",
+        visit_count=42,
+        created_at=datetime.now(timezone.utc),
+    )
+    record = ResolvedUrl(url.id, url.original_url)
+
+    pydantic_codec = PydanticSerializer(URL)
+    compact_codec = ResolvedUrlSerializer()
+    pydantic_payload = pydantic_codec.dumps(url)
+    compact_payload = compact_codec.dumps(record)
+
+    print(f"payload size: pydantic={len(pydantic_payload)}B")
+    print(f"payload size: compact={len(compact_payload)}B")
+
+    old_hit = _measure(
+        "hit  (pydantic validate)", lambda: pydantic_codec.loads(pydantic_payload)
+    )
+    new_hit = _measure(
+        "hit  (compact decode)", lambda: compact_codec.loads(compact_payload)
+    )
+    old_miss = _measure("miss (pydantic dump)", lambda: pydantic_codec.dumps(url))
+    new_miss = _measure("miss (compact encode)", lambda: compact_codec.dumps(record))
+
+    print(f"hit speedup:  {old_hit / new_hit:5.1f}x")
+    print(f"miss speedup: {old_miss / new_miss:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares redirect throughput of the FastAPI route with the
+`FastRedirectMiddleware` fast path, for a short code whose target is cached.
+
+Requests are fed straight into the ASGI app, so the numbers exclude the HTTP
+server and only measure routing, dependency resolution and the response.
+
+Run with `python -m benchmarks.redirect_asgi` from the project root, with
+`SHORTEN_APP_POSTGRES_DSN` pointing at a database that has the schema.
+"""
+
+import asyncio
+import os
+import time
+
+from src.core.shorten.entities.visits import Visit  # noqa: F401 (maps URL.visits)
+
+REQUESTS = 20_000
+SHORT_CODE = "bench-redirect"
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _make_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench/1.0")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def _run(fast_redirect_enabled: bool) -> float:
+    os.environ["SHORTEN_APP_FAST_REDIRECT_ENABLED"] = str(fast_redirect_enabled)
+    os.environ["SHORTEN_APP_CACHE_TYPE"] = "in-memory"
+    os.environ["SHORTEN_APP_MESSAGE_QUEUE_TYPE"] = "in-memory"
+
+    from src.api_server.app import create_app
+
+    app = create_app()
+    container = app.container
+    container.wire(modules=["src.api_server.routes.shorten"])
+
+    service = container.url_shorten_service()
+    if not await service.get_by_short_code(SHORT_CODE):
+        await service.create_short_url(
+            "https://www.example.com/benchmark", custom_code=SHORT_CODE
+        )
+    await container.database().close_session()
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    path = f"/{SHORT_CODE}"
+    # Warm up the cache and the route's lazily built state.
+    for _ in range(100):
+        await app(_make_scope(path), _receive, send)
+    assert set(statuses) == {307}, statuses
+
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await app(_make_scope(path), _receive, send)
+    elapsed = time.perf_counter() - started
+
+    await container.database().close_session()
+    container.unwire()
+    return REQUESTS / elapsed
+
+
+async def main():
+    before = await _run(fast_redirect_enabled=False)
+    after = await _run(fast_redirect_enabled=True)
+    print(f"FastAPI route:     {before:10.0f} req/s")
+    print(f"ASGI fast path:    {after:10.0f} req/s")
+    print(f"speedup:           {after / before:10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Compares how fast the short code strategies encode url ids and decode them
+again, one call at a time and through `generate_many`/`decode_many`.
+
+Run with `python -m benchmarks.short_code_strategy` from the project root.
+"""
+
+import time
+
+from src.core.shorten.utils.shorten_strategy.base_62_shorten_stategy import (
+    Base62ShortCodeStrategy,
+)
+from src.core.shorten.utils.shorten_strategy.feistel_shorten_strategy import (
+    FeistelShortCodeStrategy,
+)
+
+URL_IDS = range(1_000_000, 1_200_000)
+
+
+def _rate(run) -> float:
+    started = time.perf_counter()
+    run()
+    return len(URL_IDS) / (time.perf_counter() - started)
+
+
+def main():
+    strategies = {
+        "base62": Base62ShortCodeStrategy(),
+        "feistel": FeistelShortCodeStrategy("benchmark"),
+    }
+    columns = ("generate", "generate_many", "decode", "decode_many")
+    print(f"{'strategy':>8} " + " ".join(f"{column:>14}" for column in columns))
+    for name, strategy in strategies.items():
+        short_codes = strategy.generate_many(URL_IDS)
+        rates = (
+            _rate(lambda: [strategy.generate(url_id) for url_id in URL_IDS]),
+            _rate(lambda: strategy.generate_many(URL_IDS)),
+            _rate(lambda: [strategy.decode(code) for code in short_codes]),
+            _rate(lambda: strategy.decode_many(short_codes)),
+        )
+        print(f"{name:>8} " + " ".join(f"{rate:>12.0f}/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
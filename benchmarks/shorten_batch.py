@@ -0,0 +1,78 @@
+"""
+Compares shortening urls one `create_short_url` call at a time with one
+`create_short_urls` batch, for fresh urls.
+
+The one-by-one path is only run for the smallest batch size; at the larger
+sizes the table shows the batch rate alone. Every run's urls are deleted
+again afterwards.
+
+Run with `python -m benchmarks.shorten_batch` from the project root, with
+`SHORTEN_APP_POSTGRES_DSN` pointing at a database that has the schema.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.entities.visits import Visit  # noqa: F401 (maps URL.visits)
+
+BATCH_SIZES = (1_000, 10_000, 100_000)
+ONE_BY_ONE_SIZE = 1_000
+
+
+def _urls(size: int) -> list[str]:
+    run = uuid.uuid4().hex
+    return [f"https://www.example.com/{run}/{i}" for i in range(size)]
+
+
+async def main():
+    os.environ["SHORTEN_APP_CACHE_TYPE"] = "in-memory"
+
+    from src.core.infrastructures.dependency_injection.app_container import (
+        AppContainer,
+    )
+
+    container = AppContainer()
+    service = container.url_shorten_service()
+    session = container.db_session()
+
+    async def cleanup(urls: list[str]) -> None:
+        await session.execute(delete(URL).where(URL.original_url.in_(urls)))
+        await session.commit()
+
+    print(f"{'urls':>7} {'one-by-one':>12} {'batch':>12} {'speedup':>8}")
+    try:
+        for size in BATCH_SIZES:
+            one_by_one = None
+            if size <= ONE_BY_ONE_SIZE:
+                urls = _urls(size)
+                started = time.perf_counter()
+                for url in urls:
+                    await service.create_short_url(url)
+                one_by_one = size / (time.perf_counter() - started)
+                await cleanup(urls)
+
+            urls = _urls(size)
+            started = time.perf_counter()
+            await service.create_short_urls(urls)
+            batch = size / (time.perf_counter() - started)
+            for start in range(0, size, 10_000):
+                await cleanup(urls[start : start + 10_000])
+
+            if one_by_one:
+                print(
+                    f"{size:>7} {one_by_one:>10.0f}/s {batch:>10.0f}/s "
+                    f"{batch / one_by_one:>7.1f}x"
+                )
+            else:
+                print(f"{size:>7} {'-':>12} {batch:>10.0f}/s {'-':>8}")
+    finally:
+        await container.database().close_session()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
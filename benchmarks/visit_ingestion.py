@@ -0,0 +1,103 @@
+"""
+Compares how fast LogWorker can write a batch of visits with the ORM
+(`session.add_all`, the previous path) and with `VisitsRepository.bulk_insert`
+(binary COPY on asyncpg, executemany INSERT elsewhere).
+
+Every batch is written and committed in its own transaction, like a worker
+batch, and the rows are deleted again afterwards.
+
+Run with `python -m benchmarks.visit_ingestion` from the project root, with
+`SHORTEN_APP_POSTGRES_DSN` pointing at a database that has the schema.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.common.settings import Settings
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.entities.visits import Visit
+from src.core.shorten.repositories.visits_repository import VisitsRepository
+
+BATCH_SIZES = (100, 1_000, 10_000)
+ROWS_PER_RUN = 20_000
+
+
+Row = tuple[int, str, datetime]
+
+
+async def _orm(session: AsyncSession, rows: list[Row]) -> None:
+    session.add_all(
+        [
+            Visit(url_id=url_id, visitor_ip=ip, visited_at=visited_at)
+            for url_id, ip, visited_at in rows
+        ]
+    )
+
+
+async def _executemany(session: AsyncSession, rows: list[Row]) -> None:
+    await session.execute(
+        insert(Visit),
+        [
+            {"url_id": url_id, "visitor_ip": ip, "visited_at": visited_at}
+            for url_id, ip, visited_at in rows
+        ],
+    )
+
+
+async def _copy(session: AsyncSession, rows: list[Row]) -> None:
+    await VisitsRepository(Visit, session).bulk_insert(rows)
+
+
+async def _measure(session_factory, write, url_id: int, batch_size: int) -> float:
+    batches = max(ROWS_PER_RUN // batch_size, 1)
+    now = datetime.now(timezone.utc)
+    rows = [
+        (url_id, f"10.0.{i // 256 % 256}.{i % 256}", now) for i in range(batch_size)
+    ]
+
+    started = time.perf_counter()
+    for _ in range(batches):
+        async with session_factory() as session:
+            await write(session, rows)
+            await session.commit()
+    elapsed = time.perf_counter() - started
+
+    async with session_factory() as session:
+        await session.execute(delete(Visit).where(Visit.url_id == url_id))
+        await session.commit()
+    return batches * batch_size / elapsed
+
+
+async def main():
+    engine = create_async_engine(str(Settings().postgres_dsn))
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as session:
+        url = URL(original_url="https://example.com/benchmark")
+        session.add(url)
+        await session.commit()
+
+    print(f"{'batch':>6} {'orm':>12} {'executemany':>12} {'copy':>12} {'speedup':>8}")
+    try:
+        for batch_size in BATCH_SIZES:
+            orm = await _measure(session_factory, _orm, url.id, batch_size)
+            many = await _measure(session_factory, _executemany, url.id, batch_size)
+            copy = await _measure(session_factory, _copy, url.id, batch_size)
+            print(
+                f"{batch_size:>6} {orm:>10.0f}/s {many:>10.0f}/s {copy:>10.0f}/s "
+                f"{copy / orm:>7.1f}x"
+            )
+    finally:
+        async with session_factory() as session:
+            await session.execute(delete(URL).where(URL.id == url.id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
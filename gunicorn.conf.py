@@ -0,0 +1,19 @@
+import shutil
+from pathlib import Path
+
+from src.core.common.settings import Settings
+from src.core.infrastructures.metrics.multiprocess import mark_process_dead
+
+metrics_dir = Settings().metrics_multiprocess_dir
+
+
+def on_starting(server):
+    # Snapshots of a previous run would be added to this run's totals.
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        Path(metrics_dir).mkdir(parents=True)
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        mark_process_dead(metrics_dir, worker.pid)
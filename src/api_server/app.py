@@ -1,10 +1,41 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from src.api_server.routes import shorten
+from src.api_server.middlewares.database_session import DatabaseSessionMiddleware
+from src.api_server.middlewares.fast_redirect import FastRedirectMiddleware
+from src.api_server.middlewares.metrics import MetricsMiddleware
+from src.api_server.middlewares.tracing import TracingMiddleware
+from src.api_server.routes import metrics, shorten
 from src.core.infrastructures.logging import setup_logging
 from src.core.infrastructures.dependency_injection.app_container import AppContainer
+from src.core.infrastructures.metrics.collectors import (
+    buffer_collector,
+    cache_collector,
+    pool_collector,
+    queue_depth_collector,
+)
+from src.core.infrastructures.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_short_code_filter(container: AppContainer) -> None:
+    """
+    Loads every existing short code into the existence filter. Until this
+    finishes the filter lets every lookup through to the cache and database.
+    """
+    try:
+        url_repository = container.url_repository()
+        short_code_filter = container.short_code_filter()
+        await short_code_filter.rebuild(url_repository.iter_short_codes())
+    except Exception as e:
+        logger.error(f"Failed to rebuild the short code filter: {e}", exc_info=True)
+    finally:
+        for database in container.shard_databases():
+            await database.close_session()
 
 
 @asynccontextmanager
@@ -12,10 +43,47 @@ async def lifespan(app: FastAPI):
     setup_logging()
     app.container.wire(
         modules=[
+            "src.api_server.routes.metrics",
             "src.api_server.routes.shorten",
         ]
     )
+    collectors = [
+        (cache_collector(), False),
+        (pool_collector(app.container.shard_databases()), False),
+        (buffer_collector(app.container.visit_buffer()), False),
+        (queue_depth_collector(app.container.message_queue()), True),
+    ]
+    for collector, shared in collectors:
+        REGISTRY.register_collector(collector, shared=shared)
+    multiprocess_metrics = app.container.multiprocess_metrics()
+    metrics_snapshots = None
+    if multiprocess_metrics:
+        metrics_snapshots = asyncio.create_task(multiprocess_metrics.run())
+    cache_storage = app.container.cache_storage()
+    await cache_storage.start()
+    filter_rebuild = asyncio.create_task(rebuild_short_code_filter(app.container))
+    replicas = app.container.db_replicas()
+    replica_checks = None
+    if replicas:
+        replica_checks = asyncio.create_task(
+            replicas.run_health_checks(
+                app.container.settings().db_replica_check_interval
+            )
+        )
     yield
+    filter_rebuild.cancel()
+    if replica_checks:
+        replica_checks.cancel()
+        await replicas.dispose()
+    await app.container.visit_buffer().close()
+    await app.container.visit_counter().close()
+    await cache_storage.close()
+    await app.container.tracer().close()
+    if metrics_snapshots:
+        metrics_snapshots.cancel()
+        await multiprocess_metrics.write_snapshot()
+    for collector, _ in collectors:
+        REGISTRY.unregister_collector(collector)
     app.container.unwire()
 
 
@@ -28,7 +96,14 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
     app.container = container
+    # Before the shorten routes, whose `/{short_code}` would match `/metrics`.
+    app.include_router(metrics.router)
     app.include_router(shorten.router)
+    if container.settings().fast_redirect_enabled:
+        app.add_middleware(FastRedirectMiddleware)
+    app.add_middleware(DatabaseSessionMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(TracingMiddleware)
 
     return app
 
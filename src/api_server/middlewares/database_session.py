@@ -0,0 +1,27 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class DatabaseSessionMiddleware:
+    """
+    Releases the database sessions of a request once it has been handled.
+
+    Sessions are scoped to the task serving the request, which is the task
+    this middleware runs in. A session only checks out a connection on its
+    first statement, so requests answered from the cache never touch the
+    pool, and removing the session returns any connection it holds and
+    rolls back what was not committed, even when the request failed.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for database in scope["app"].container.shard_databases():
+                await database.close_session()
@@ -0,0 +1,103 @@
+import json
+from urllib.parse import quote
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.api_server.middlewares.metrics import ROUTE_PATH_KEY
+from src.core.common.exceptions import HTTPException
+from src.core.infrastructures.tracing.tracer import span
+
+# Matches what starlette's RedirectResponse leaves unescaped.
+LOCATION_SAFE_CHARACTERS = ":/%#?=@[]!$&'()*+,;"
+
+
+class FastRedirectMiddleware:
+    """
+    Serves `GET /{short_code}` without going through FastAPI routing,
+    dependency resolution or per-request service construction.
+
+    The short code is resolved through the container's long-lived
+    `redirect_url_visits_service`, whose repository binds a task-scoped
+    session that is removed once the response is sent. Paths that belong to
+    another route without path parameters (`/docs`, `/shorten`, ...) and every
+    other request, HEAD included, are passed on to the wrapped application
+    unchanged, so that they are answered exactly like the route would.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._reserved_paths: frozenset[str] | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not self._is_short_code_path(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        scope[ROUTE_PATH_KEY] = "/{short_code}"
+        container = scope["app"].container
+        service = container.redirect_url_visits_service()
+        client = scope.get("client")
+        try:
+            with span("handler.redirect"):
+                url = await service.get_original_url(
+                    short_code=scope["path"][1:],
+                    ip_address=client[0] if client else None,
+                    user_agent=_get_header(scope, b"user-agent"),
+                )
+        except HTTPException as e:
+            await _send_json(send, e.status_code, {"detail": e.detail})
+            return
+        finally:
+            for database in container.shard_databases():
+                await database.close_session()
+
+        location = quote(url.original_url, safe=LOCATION_SAFE_CHARACTERS)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 307,
+                "headers": [
+                    (b"content-length", b"0"),
+                    (b"location", location.encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+    def _is_short_code_path(self, scope: Scope) -> bool:
+        path = scope["path"]
+        if len(path) < 2 or path.find("/", 1) != -1:
+            return False
+        if self._reserved_paths is None:
+            self._reserved_paths = frozenset(
+                route.path
+                for route in scope["app"].routes
+                if "{" not in getattr(route, "path", "{")
+            )
+        return path not in self._reserved_paths
+
+
+def _get_header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _send_json(send: Send, status: int, content: dict) -> None:
+    body = json.dumps(content, separators=(",", ":")).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-length", str(len(body)).encode()),
+                (b"content-type", b"application/json"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,55 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.infrastructures.metrics.registry import REGISTRY
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route template.",
+    ["method", "route", "status"],
+)
+# Set by handlers that answer outside the router, see `FastRedirectMiddleware`.
+ROUTE_PATH_KEY = "route_path"
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request under its route template
+    rather than its path, so that short codes do not become labels.
+    Requests that match no route are recorded as `unmatched`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                _route_path(scope),
+                str(status),
+            )
+
+
+def _route_path(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get(ROUTE_PATH_KEY, "unmatched")
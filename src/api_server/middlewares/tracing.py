@@ -0,0 +1,60 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.api_server.middlewares.metrics import ROUTE_PATH_KEY
+
+
+class TracingMiddleware:
+    """
+    Traces requests with the container's `tracer`. Responses of traced
+    requests carry a Server-Timing header with the time spent per phase:
+    one entry per span category (`cache`, `redis`, `db`, `visit`,
+    `handler`), `di` for the time before the handler ran, `serialize` for
+    the time after it, and `total`. Sampled traces are exported once the
+    response has been sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracer = scope["app"].container.tracer()
+        trace = tracer.start_trace()
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", trace.server_timing(time.perf_counter())
+                )
+            await send(message)
+
+        token = tracer.activate(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            tracer.deactivate(token)
+            route = scope.get("route")
+            route_path = route.path if route else scope.get(ROUTE_PATH_KEY, "unmatched")
+            tracer.finish(
+                trace,
+                f"{scope['method']} {route_path}",
+                **{
+                    "http.method": scope["method"],
+                    "http.route": route_path,
+                    "http.status_code": status,
+                },
+            )
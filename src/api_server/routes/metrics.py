@@ -0,0 +1,23 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends
+from starlette.responses import Response
+
+from src.core.infrastructures.dependency_injection.app_container import AppContainer
+from src.core.infrastructures.metrics.multiprocess import MultiprocessMetrics
+from src.core.infrastructures.metrics.registry import CONTENT_TYPE, REGISTRY, render
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+@inject
+async def get_metrics(
+    multiprocess_metrics: MultiprocessMetrics | None = Depends(
+        Provide[AppContainer.multiprocess_metrics]
+    ),
+):
+    if multiprocess_metrics is not None:
+        families = await multiprocess_metrics.collect()
+    else:
+        families = await REGISTRY.collect()
+    return Response(render(families), media_type=CONTENT_TYPE)
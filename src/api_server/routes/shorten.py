@@ -1,21 +1,34 @@
+from datetime import datetime
+
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from starlette.responses import RedirectResponse
 
+from src.core.common.exceptions import BadRequestException
+from src.core.common.settings import Settings
 from src.core.infrastructures.dependency_injection.app_container import AppContainer
+from src.core.infrastructures.tracing.tracer import HANDLER, traced
 from src.core.shorten.schemas.shorten import (
+    ShortenBatchItem,
+    ShortenBatchRequest,
+    ShortenBatchResponse,
     ShortenRequest,
     ShortenResponse,
     StatsResponse,
+    TimeseriesResponse,
 )
 from src.core.shorten.services.url_shorten_service import UrlShortenService
 from src.core.shorten.services.url_visits_service import UrlVisitsService
+from src.core.shorten.utils.time_buckets import Bucket
 
 router = APIRouter()
 
 
 @router.post("/shorten", response_model=ShortenResponse)
 @inject
+@traced(HANDLER)
 async def shorten_url(
     request: ShortenRequest,
     url_shorten_service: UrlShortenService = Depends(
@@ -28,8 +41,66 @@ async def shorten_url(
     )
 
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def read_batch_urls(request: Request, max_size: int) -> list[str]:
+    """
+    Reads the urls of a batch, either from a JSON `{"urls": [...]}` body or
+    from an NDJSON body with one `{"url": ...}` object per line. NDJSON is
+    parsed while it streams in, so oversized batches are refused early.
+    """
+    try:
+        if not request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+            body = await request.body()
+            urls = [
+                str(url) for url in ShortenBatchRequest.model_validate_json(body).urls
+            ]
+        else:
+            urls = []
+            pending = b""
+            async for chunk in request.stream():
+                *lines, pending = (pending + chunk).split(b"\n")
+                urls.extend(
+                    str(ShortenBatchItem.model_validate_json(line).url)
+                    for line in lines
+                    if line.strip()
+                )
+                if len(urls) > max_size:
+                    break
+            else:
+                if pending.strip():
+                    urls.append(str(ShortenBatchItem.model_validate_json(pending).url))
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) from e
+    if len(urls) > max_size:
+        raise BadRequestException(f"A batch holds at most {max_size} urls")
+    return urls
+
+
+@router.post("/shorten/batch", response_model=ShortenBatchResponse)
+@inject
+@traced(HANDLER)
+async def shorten_urls(
+    request: Request,
+    url_shorten_service: UrlShortenService = Depends(
+        Provide[AppContainer.url_shorten_service]
+    ),
+    settings: Settings = Depends(Provide[AppContainer.settings]),
+):
+    original_urls = await read_batch_urls(request, settings.shorten_batch_max_size)
+    short_codes = await url_shorten_service.create_short_urls(original_urls)
+    return {
+        "results": [
+            {"short_code": short_code, "original_url": original_url}
+            for original_url, short_code in zip(original_urls, short_codes)
+        ]
+    }
+
+
 @router.get("/{short_code}")
 @inject
+@traced(HANDLER)
 async def redirect_to_long_url(
     short_code: str,
     request: Request,
@@ -47,6 +118,7 @@ async def redirect_to_long_url(
 
 @router.get("/stats/{short_code}", response_model=StatsResponse)
 @inject
+@traced(HANDLER)
 async def get_url_stats(
     short_code: str,
     url_visits_service: UrlVisitsService = Depends(
@@ -55,3 +127,24 @@ async def get_url_stats(
 ):
     visits_count = await url_visits_service.get_url_stats(short_code)
     return {"visits": visits_count}
+
+
+@router.get("/stats/{short_code}/timeseries", response_model=TimeseriesResponse)
+@inject
+@traced(HANDLER)
+async def get_url_timeseries(
+    short_code: str,
+    bucket: Bucket = "hour",
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    url_visits_service: UrlVisitsService = Depends(
+        Provide[AppContainer.url_visits_service]
+    ),
+):
+    points = await url_visits_service.get_url_timeseries(
+        short_code, bucket=bucket, start=start, end=end
+    )
+    return {
+        "bucket": bucket,
+        "points": [{"start": point, "visits": visits} for point, visits in points],
+    }
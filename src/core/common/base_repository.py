@@ -4,9 +4,12 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import SQLModel
 
+from src.core.infrastructures.tracing.tracer import trace_methods
+
 ModelType = TypeVar("ModelType", bound=SQLModel)
 
 
+@trace_methods("db")
 class BaseRepository(Generic[ModelType]):
     """
     A generic repository with basic asynchronous CRUD operations.
@@ -26,6 +26,18 @@ class ConflictException(HTTPException):
         super().__init__(status_code=status.HTTP_409_CONFLICT, detail=message)
 
 
+class ServiceUnavailableException(HTTPException):
+    def __init__(self, message: str = "Service Unavailable"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=message
+        )
+
+
 class ShortCodeAlreadyExistsError(ConflictException):
     def __init__(self, message: str = "Short code already exists"):
         super().__init__(message=message)
+
+
+class ShortCodeAllocationError(ServiceUnavailableException):
+    def __init__(self, message: str = "Could not allocate a short code"):
+        super().__init__(message=message)
@@ -17,21 +17,284 @@ class Settings(BaseSettings):
         description="Maximum number of connections "
         "to allow in addition to the pool size.",
     )
+    db_pool_timeout: float = Field(
+        30.0,
+        description="Seconds to wait for a free pooled connection before giving up.",
+    )
+    postgres_shard_dsns: list[PostgresDsn] = Field(
+        [],
+        description="Databases that urls and visits are sharded over in "
+        "addition to postgres_dsn, which is shard 0, as a JSON list.",
+    )
+    postgres_replica_dsns: list[PostgresDsn] = Field(
+        [],
+        description="Read replicas that redirect and stats lookups are spread "
+        "over, as a JSON list.",
+    )
+    db_replica_pool_size: int = Field(
+        5, description="Connections kept open in the pool of each read replica."
+    )
+    db_replica_max_overflow: int = Field(
+        10,
+        description="Connections allowed per read replica in addition to its "
+        "pool size.",
+    )
+    db_replica_use_pgbouncer: bool | None = Field(
+        None,
+        description="Whether the read replicas are reached through PgBouncer. "
+        "Defaults to DB_USE_PGBOUNCER.",
+    )
+    db_replica_max_lag: float = Field(
+        5.0,
+        description="Seconds a read replica may lag behind the primary before "
+        "reads skip it.",
+    )
+    db_replica_retry_interval: float = Field(
+        5.0, description="Seconds a failed read replica is skipped for."
+    )
+    db_replica_check_interval: float = Field(
+        1.0, description="Seconds between replication lag checks."
+    )
+    db_read_your_writes: bool = Field(
+        True,
+        description="Retry lookups that miss on a read replica on the primary, "
+        "so that urls are found right after they are created.",
+    )
     use_pgbouncer: bool = Field(
         False,
         alias="DB_USE_PGBOUNCER",
         description="Set to true to use NullPool, recommended when using PgBouncer.",
     )
     postgres_dsn: PostgresDsn
+    fast_redirect_enabled: bool = Field(
+        True,
+        description="Serve short code redirects from an ASGI middleware "
+        "instead of the FastAPI route.",
+    )
+    short_code_strategy: str = Field(
+        "base62",
+        description="How short codes are generated from url ids: 'base62' "
+        "(the id itself) or 'feistel' (the id scrambled with short_code_secret).",
+    )
+    short_code_secret: str | None = Field(
+        None,
+        description="Key of the 'feistel' short code strategy. Changing it "
+        "changes the codes of new urls only.",
+    )
+    url_id_block_size: int = Field(
+        1000,
+        description="Url ids each process reserves from the database at a time.",
+    )
+    shorten_batch_max_size: int = Field(
+        100_000, description="Most urls accepted by one POST /shorten/batch."
+    )
     cache_type: str = Field(
-        "in-memory", description="Cache type can be 'in-memory' or 'redis'"
+        "in-memory",
+        description="Cache type can be 'in-memory', 'redis' or 'two-tier' "
+        "(an in-process cache in front of redis).",
+    )
+    cache_namespace: str = Field(
+        "v1",
+        description="Prefix of every cache key. "
+        "Change it on deploy to invalidate all cached entries.",
+    )
+    in_memory_cache_max_entries: int = Field(
+        100_000,
+        description="Maximum number of entries if cache_type is 'in-memory'.",
+    )
+    in_memory_cache_max_bytes: int = Field(
+        64 * 1024 * 1024,
+        description="Approximate memory budget in bytes if cache_type is 'in-memory'.",
+    )
+    in_memory_cache_sweep_interval: float = Field(
+        1.0,
+        description="Seconds between background sweeps of expired entries "
+        "in in-process caches.",
+    )
+    near_cache_max_entries: int = Field(
+        10_000,
+        description="Maximum number of entries kept in-process "
+        "if cache_type is 'two-tier'.",
+    )
+    near_cache_max_bytes: int = Field(
+        16 * 1024 * 1024,
+        description="Approximate memory budget in bytes of the in-process cache "
+        "if cache_type is 'two-tier'.",
+    )
+    near_cache_ttl: int = Field(
+        30,
+        description="Upper bound in seconds on how long an entry is served "
+        "from the in-process cache if cache_type is 'two-tier'.",
+    )
+    cache_invalidation_channel: str = Field(
+        "cache-invalidation",
+        description="Redis pub/sub channel used to invalidate in-process caches "
+        "across replicas if cache_type is 'two-tier'.",
+    )
+    short_code_filter_type: str | None = Field(
+        None,
+        description="Short code existence filter, 'redis', 'in-memory' or 'none'. "
+        "An in-memory filter does not see codes created by other processes, so "
+        "it is only correct when a single process serves requests. Defaults to "
+        "'redis' if the cache is in redis, 'none' otherwise.",
+    )
+    short_code_filter_capacity: int = Field(
+        1_000_000,
+        description="Expected number of short codes the existence filter is sized for.",
+    )
+    short_code_filter_error_rate: float = Field(
+        0.01,
+        description="Target false positive rate of the short code existence filter.",
+    )
+    short_code_filter_key: str = Field(
+        "short_codes:bloom",
+        description="Redis key prefix of the shared short code existence filter.",
     )
     message_queue_type: str = Field(
-        "in-memory", description="Message queue type can be 'in-memory' or 'redis'"
+        "in-memory",
+        description="Message queue type can be 'in-memory', 'redis' (a list) "
+        "or 'redis-stream' (a stream read through a consumer group).",
+    )
+    visit_buffer_max_size: int = Field(
+        500, description="Number of buffered visit messages that triggers a publish."
+    )
+    visit_buffer_flush_interval: float = Field(
+        0.1,
+        description="Maximum seconds a visit message waits in the buffer "
+        "before it is published.",
+    )
+    visit_buffer_max_pending: int = Field(
+        50_000,
+        description="Visit messages held while the message queue is unavailable; "
+        "newer ones are dropped beyond this.",
     )
     redis_queue_name: str | None = Field(
         None, description="Redis queue name if message_queue_type is 'redis'"
     )
+    visit_counter_type: str = Field(
+        "database",
+        description="Visit counter type can be 'database' (the log worker "
+        "increments url.visit_count) or 'redis' (counted on redirect and "
+        "written back periodically).",
+    )
+    visit_counter_key_prefix: str = Field(
+        "visit_counts", description="Redis key prefix of the visit counters."
+    )
+    visit_counter_sync_interval: float = Field(
+        0.1,
+        description="Seconds visits are summed in process before being added "
+        "to the redis counters.",
+    )
+    visit_counter_flush_interval: float = Field(
+        5.0,
+        description="Seconds between write-backs of the redis counters "
+        "to url.visit_count.",
+    )
+    visit_counter_flush_chunk_size: int = Field(
+        5000, description="Urls written back per transaction of a flush."
+    )
+    log_worker_writers: int = Field(
+        4, description="Batches the log worker writes to the database concurrently."
+    )
+    log_worker_min_batch_size: int = Field(
+        100, description="Batch size the log worker starts with and shrinks to."
+    )
+    log_worker_max_batch_size: int = Field(
+        5000, description="Batch size the log worker grows to while backed up."
+    )
+    log_worker_target_commit_latency: float = Field(
+        0.5,
+        description="Seconds per batch commit above which the log worker "
+        "shrinks its batches.",
+    )
+    log_worker_idle_sleep: float = Field(
+        1.0,
+        description="Seconds the log worker waits after finding the queue empty, "
+        "unless the queue blocks on reads.",
+    )
+    log_worker_counter_flush_interval: float = Field(
+        0,
+        description="If set, the log worker sums visit counts across batches and "
+        "writes them every this many seconds instead of with each batch.",
+    )
+    log_worker_metrics_port: int = Field(
+        9100,
+        description="Port the log worker serves /metrics on, 0 to disable.",
+    )
+    metrics_multiprocess_dir: str | None = Field(
+        None,
+        description="Directory through which the processes of a multi-process "
+        "server, such as gunicorn's workers, share their metrics. Emptied when "
+        "gunicorn starts.",
+    )
+    metrics_snapshot_interval: float = Field(
+        5.0,
+        description="Seconds between the metrics snapshots each process writes "
+        "to metrics_multiprocess_dir.",
+    )
+    tracing_sample_rate: float = Field(
+        0.0,
+        description="Share of requests, from 0 to 1, whose spans are exported.",
+    )
+    tracing_server_timing: bool = Field(
+        False,
+        description="Add a Server-Timing header with per-phase durations to "
+        "every response, not only to sampled ones.",
+    )
+    tracing_exporter: str = Field(
+        "ndjson",
+        description="Where sampled spans go, 'ndjson' (a file) or 'otlp' (an "
+        "OpenTelemetry collector over OTLP/HTTP).",
+    )
+    tracing_ndjson_path: str = Field(
+        "logs/traces.ndjson", description="File the 'ndjson' exporter appends to."
+    )
+    tracing_otlp_endpoint: str = Field(
+        "http://localhost:4318/v1/traces",
+        description="Collector endpoint of the 'otlp' exporter.",
+    )
+    visit_partition_premake_months: int = Field(
+        3, description="Months of visit partitions created ahead of time."
+    )
+    visit_retention_days: int = Field(
+        0,
+        description="Days of visits kept; older monthly partitions are removed. "
+        "0 keeps every visit.",
+    )
+    visit_partition_drop_detached: bool = Field(
+        True,
+        description="Drop expired visit partitions, instead of only detaching them "
+        "for archiving.",
+    )
+    redis_stream_name: str = Field(
+        "visit_log_stream",
+        description="Stream key if message_queue_type is 'redis-stream'.",
+    )
+    redis_stream_group: str = Field(
+        "log-workers",
+        description="Consumer group shared by the log workers reading the stream.",
+    )
+    redis_stream_block_ms: int = Field(
+        5000, description="Milliseconds a stream read waits for new messages."
+    )
+    redis_stream_claim_idle_ms: int = Field(
+        60_000,
+        description="Milliseconds a message may stay unacknowledged before "
+        "another worker takes it over.",
+    )
+    redis_stream_max_len: int = Field(
+        1_000_000, description="Approximate number of entries kept in the stream."
+    )
+    redis_stream_max_deliveries: int = Field(
+        5,
+        description="Deliveries after which a message that keeps failing is "
+        "moved to the dead letter stream.",
+    )
+    redis_stream_dead_letter_name: str | None = Field(
+        None,
+        description="Stream that exhausted messages are moved to. Defaults to "
+        "the stream name followed by ':dead'.",
+    )
     redis_dsn: str | None = Field(
         None, description="Redis DSN if cache_type is 'redis'"
     )
@@ -39,11 +302,31 @@ class Settings(BaseSettings):
     @model_validator(mode="before")
     def check_redis_dsn(cls, values):
         if (
-            values.get("cache_type") == "redis"
-            or values.get("message_queue_type") == "redis"
+            values.get("cache_type") in ("redis", "two-tier")
+            or values.get("message_queue_type") in ("redis", "redis-stream")
+            or values.get("visit_counter_type") == "redis"
+            or values.get("short_code_filter_type") == "redis"
         ) and not values.get("redis_dsn"):
             raise ValueError(
-                "REDIS_DSN must be set if cache_type or message_queue_type is 'redis'"
+                "REDIS_DSN must be set if the cache, message queue, visit counter "
+                "or short code filter uses redis"
+            )
+        return values
+
+    @model_validator(mode="after")
+    def default_short_code_filter_type(self):
+        if self.short_code_filter_type is None:
+            shared = self.cache_type in ("redis", "two-tier")
+            self.short_code_filter_type = "redis" if shared else "none"
+        return self
+
+    @model_validator(mode="before")
+    def check_short_code_secret(cls, values):
+        if values.get("short_code_strategy") == "feistel" and not values.get(
+            "short_code_secret"
+        ):
+            raise ValueError(
+                "SHORT_CODE_SECRET must be set if the short code strategy is feistel"
             )
         return values
 
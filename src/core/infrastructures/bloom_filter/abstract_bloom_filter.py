@@ -0,0 +1,68 @@
+import hashlib
+import math
+from abc import ABC, abstractmethod
+from typing import AsyncIterable, Iterable
+
+
+class AbstractBloomFilter(ABC):
+    """
+    An abstract base class for a Bloom filter over strings.
+
+    A filter answers `might_contain` with False only for items that were never
+    added. Until it has been populated with `rebuild`, a filter cannot prove
+    absence and reports every item as possibly present.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+
+    def offsets(self, item: str) -> list[int]:
+        """Returns the bit offsets of `item` (Kirsch-Mitzenmacher double hashing)."""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def empty_bitmap(self) -> bytearray:
+        return bytearray((self.size + 7) // 8)
+
+    def fill_bitmap(self, bitmap: bytearray, items: Iterable[str]) -> None:
+        """
+        Sets the bits of `items` in a bitmap laid out like a Redis bitmap, with
+        bit 0 as the most significant bit of the first byte.
+        """
+        for item in items:
+            for offset in self.offsets(item):
+                bitmap[offset >> 3] |= 0x80 >> (offset & 7)
+
+    @abstractmethod
+    async def add(self, item: str) -> None:
+        """Adds a single item to the filter."""
+        pass
+
+    async def add_many(self, items: Iterable[str]) -> None:
+        """Adds several items to the filter."""
+        for item in items:
+            await self.add(item)
+
+    @abstractmethod
+    async def might_contain(self, item: str) -> bool:
+        """Returns False only if `item` was definitely never added."""
+        pass
+
+    @abstractmethod
+    async def rebuild(self, batches: AsyncIterable[list[str]]) -> None:
+        """Populates the filter from every existing item and marks it ready."""
+        pass
+
+    @abstractmethod
+    async def is_ready(self) -> bool:
+        """Returns whether the filter has been populated and can prove absence."""
+        pass
+
+    async def close(self) -> None:
+        """Releases any connection held by the filter."""
+        pass
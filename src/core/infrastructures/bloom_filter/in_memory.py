@@ -0,0 +1,38 @@
+from typing import AsyncIterable, Iterable
+
+from .abstract_bloom_filter import AbstractBloomFilter
+
+
+class InMemoryBloomFilter(AbstractBloomFilter):
+    """
+    A process-local Bloom filter. Items added by other processes are not
+    seen, so it is only suitable for single-process deployments and tests.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        super().__init__(capacity, error_rate)
+        self._bitmap = self.empty_bitmap()
+        self._ready = False
+
+    async def add(self, item: str) -> None:
+        self.fill_bitmap(self._bitmap, (item,))
+
+    async def add_many(self, items: Iterable[str]) -> None:
+        self.fill_bitmap(self._bitmap, items)
+
+    async def might_contain(self, item: str) -> bool:
+        if not self._ready:
+            return True
+        bitmap = self._bitmap
+        return all(
+            bitmap[offset >> 3] & (0x80 >> (offset & 7))
+            for offset in self.offsets(item)
+        )
+
+    async def rebuild(self, batches: AsyncIterable[list[str]]) -> None:
+        async for batch in batches:
+            self.fill_bitmap(self._bitmap, batch)
+        self._ready = True
+
+    async def is_ready(self) -> bool:
+        return self._ready
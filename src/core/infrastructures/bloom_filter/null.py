@@ -0,0 +1,28 @@
+from typing import AsyncIterable, Iterable
+
+from .abstract_bloom_filter import AbstractBloomFilter
+
+
+class NullBloomFilter(AbstractBloomFilter):
+    """
+    A filter that is never ready, so every short code goes to the database.
+    Used when no filter can be shared by every process serving requests.
+    """
+
+    def __init__(self):
+        super().__init__(capacity=1, error_rate=0.5)
+
+    async def add(self, item: str) -> None:
+        pass
+
+    async def add_many(self, items: Iterable[str]) -> None:
+        pass
+
+    async def might_contain(self, item: str) -> bool:
+        return True
+
+    async def rebuild(self, batches: AsyncIterable[list[str]]) -> None:
+        pass
+
+    async def is_ready(self) -> bool:
+        return False
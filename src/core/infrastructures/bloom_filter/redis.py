@@ -0,0 +1,102 @@
+import logging
+import uuid
+from typing import AsyncIterable, Iterable
+
+import redis.asyncio as redis
+
+from .abstract_bloom_filter import AbstractBloomFilter
+
+logger = logging.getLogger(__name__)
+
+REBUILD_LOCK_TIMEOUT = 10 * 60  # In seconds
+ADD_MANY_CHUNK_SIZE = 10_000  # Bits set per pipeline round-trip
+
+
+class RedisBloomFilter(AbstractBloomFilter):
+    """
+    A Bloom filter stored as a Redis bitmap and shared by every replica.
+
+    The bitmap key embeds the filter dimensions, so replicas configured with a
+    different capacity or error rate never read each other's bits. A separate
+    marker key records that the bitmap has been fully populated. If either key
+    is missing (e.g. evicted by Redis), or Redis cannot be reached, lookups
+    fail open.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        key: str = "short_codes:bloom",
+        capacity: int = 1_000_000,
+        error_rate: float = 0.01,
+    ):
+        super().__init__(capacity, error_rate)
+        self.redis = redis.from_url(dsn)
+        self.key = f"{key}:{self.size}:{self.hash_count}"
+        self.ready_key = f"{self.key}:ready"
+        self.lock_key = f"{self.key}:rebuilding"
+
+    async def add(self, item: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for offset in self.offsets(item):
+                pipe.setbit(self.key, offset, 1)
+            await pipe.execute()
+
+    async def add_many(self, items: Iterable[str]) -> None:
+        offsets = [offset for item in items for offset in self.offsets(item)]
+        for start in range(0, len(offsets), ADD_MANY_CHUNK_SIZE):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for offset in offsets[start : start + ADD_MANY_CHUNK_SIZE]:
+                    pipe.setbit(self.key, offset, 1)
+                await pipe.execute()
+
+    async def might_contain(self, item: str) -> bool:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(self.ready_key, self.key)
+                for offset in self.offsets(item):
+                    pipe.getbit(self.key, offset)
+                ready, *bits = await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Bloom filter lookup failed, letting it through: {e}")
+            return True
+        if ready < 2:
+            return True
+        return all(bits)
+
+    async def rebuild(self, batches: AsyncIterable[list[str]]) -> None:
+        """
+        Populates the shared bitmap unless another replica already did or is
+        doing so. The new bits are OR-ed into the live bitmap, so items added
+        concurrently through `add` are never lost.
+        """
+        if await self.is_ready():
+            logger.info("Bloom filter is already populated, skipping rebuild.")
+            return
+        if not await self.redis.set(self.lock_key, 1, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+            logger.info("Bloom filter is being rebuilt by another replica.")
+            return
+
+        try:
+            bitmap = self.empty_bitmap()
+            item_count = 0
+            async for batch in batches:
+                self.fill_bitmap(bitmap, batch)
+                item_count += len(batch)
+
+            staging_key = f"{self.key}:staging:{uuid.uuid4().hex}"
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(staging_key, bytes(bitmap), ex=REBUILD_LOCK_TIMEOUT)
+                pipe.bitop("OR", self.key, self.key, staging_key)
+                pipe.delete(staging_key)
+                pipe.set(self.ready_key, 1)
+                await pipe.execute()
+            logger.info(f"Bloom filter rebuilt with {item_count} items.")
+        finally:
+            await self.redis.delete(self.lock_key)
+
+    async def is_ready(self) -> bool:
+        return await self.redis.exists(self.ready_key, self.key) == 2
+
+    async def close(self) -> None:
+        await self.redis.aclose()
@@ -14,3 +14,23 @@ class AbstractCacheStorage(ABC):
     @abstractmethod
     async def delete(self, key: str) -> None:
         raise NotImplementedError
+
+    async def acquire_lock(self, key: str, lease: float) -> Optional[str]:
+        """
+        Takes a lock on `key` that expires after `lease` seconds and returns a
+        token to release it with, or None if someone else holds it. Storages
+        that are not shared between processes have nobody to coordinate with.
+        """
+        return "local"
+
+    async def release_lock(self, key: str, token: str) -> None:
+        """Releases a lock taken with `acquire_lock`, if `token` still holds it."""
+        pass
+
+    async def start(self) -> None:
+        """Starts any background work the storage needs. Optional."""
+        pass
+
+    async def close(self) -> None:
+        """Stops background work and releases connections. Optional."""
+        pass
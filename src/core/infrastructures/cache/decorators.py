@@ -1,40 +1,349 @@
+import asyncio
 import functools
 import inspect
 import logging
-from typing import Any, Callable, Optional
+import time
+import types
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence, Union, get_args, get_origin
+
+from .serializers import CacheSerializer, PydanticSerializer
 
 logger = logging.getLogger(__name__)
 
+# Stored in place of a result that was not found, see `negative_expire`.
+NEGATIVE_RESULT = "\x00none"
+# Prefixes values stored with soft/hard deadlines, see `soft_expire`.
+ENVELOPE_MARKER = "\x01"
+LOCK_POLL_INTERVAL = 0.05  # In seconds
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    lock_waits: int = 0
+    stale_hits: int = 0
+    stale_on_error: int = 0
+    refreshes: int = 0
+    storage_errors: int = 0
+
+
+# Counters of every cached method, keyed by `<prefix>:<function name>`.
+CACHE_STATS: dict[str, CacheStats] = {}
+
+
+class _LoadAbandoned(Exception):
+    """Raised to waiters when the coroutine loading their key was cancelled."""
+
+
+def _pack(payload: str, fresh_until: float, stale_until: float) -> str:
+    return f"{ENVELOPE_MARKER}{fresh_until:.3f}|{stale_until:.3f}|{payload}"
+
+
+def _unpack(cached_result: Any) -> tuple[float, float, Any]:
+    """Returns the fresh and stale deadlines of a cached value and its payload."""
+    if isinstance(cached_result, str) and cached_result.startswith(ENVELOPE_MARKER):
+        fresh_until, stale_until, payload = cached_result[1:].split("|", 2)
+        return float(fresh_until), float(stale_until), payload
+    return float("inf"), float("inf"), cached_result
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _compile_key_args(sig: inspect.Signature, key_args: Sequence[str] | None):
+    """
+    Resolves, once per decorated function, where each key argument is found in
+    a call: its position among the arguments after `self` and its default.
+    """
+    params = list(sig.parameters.values())[1:]
+    positional = [
+        p.name for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+    ]
+    named = {
+        p.name: p for p in params if p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+    }
+
+    if key_args is None:
+        key_args = sorted(named)
+    unknown = [name for name in key_args if name not in named]
+    if unknown:
+        raise ValueError(f"Unknown cache key arguments: {', '.join(unknown)}")
+
+    return [
+        (
+            name,
+            positional.index(name) if name in positional else None,
+            named[name].default,
+        )
+        for name in key_args
+    ]
+
+
+def cache(
+    prefix: str,
+    expire: Optional[int] = None,
+    key_args: Optional[Sequence[str]] = None,
+    key_builder: Optional[Callable[..., str]] = None,
+    negative_expire: Optional[int] = None,
+    single_flight: bool = True,
+    distributed_lock: bool = False,
+    lock_lease: float = 5,
+    soft_expire: Optional[int] = None,
+    grace: int = 0,
+    serializer: Optional[CacheSerializer] = None,
+):
+    """
+    Caches the result of an async method in `self.cache_storage`.
+
+    The key is built from `key_args` (defaults to every argument) or, if given,
+    from `key_builder`, which receives the call's arguments without `self`.
+    Keys are prefixed with `self.cache_namespace` when the object has one, so
+    bumping the namespace invalidates every entry at once.
+
+    If `negative_expire` is set, a falsy result is remembered for that many
+    seconds as well, so repeated lookups of missing items skip the call.
+
+    With `single_flight`, concurrent misses for the same key within a process
+    wait for a single call instead of each making their own. With
+    `distributed_lock`, the caller also takes a lease on the key in the cache
+    storage, so only one replica recomputes it while the others poll the
+    cache for at most `lock_lease` seconds.
+
+    With `soft_expire`, a value older than that is still returned at once but
+    refreshed in the background until it is `expire` seconds old. Past
+    `expire` it is reloaded before returning, and for another `grace` seconds
+    the old value is returned instead if reloading fails. Errors from the
+    cache storage itself are treated as misses.
+
+    Results are stored with `serializer`, which defaults to JSON validated
+    against the method's return annotation.
+
+    The wrapper exposes `cache_key(self, ...)` and `invalidate(self, ...)`,
+    which accept the same arguments as the decorated method, and its
+    counters as `stats`.
+    """
+
+    if key_args is not None and key_builder is not None:
+        raise ValueError("Pass either key_args or key_builder, not both")
 
-def cache(prefix: str, expire: Optional[int] = None):
     def decorator(func: Callable[..., Any]):
         sig = inspect.signature(func)
-        return_type = sig.return_annotation
+        codec = serializer or PydanticSerializer(
+            _unwrap_optional(sig.return_annotation)
+        )
+        base_key = f"{prefix}:{func.__name__}:"
 
-        @functools.wraps(func)
-        async def wrapper(self, *args, **kwargs):
-            bound_args = sig.bind(self, *args, **kwargs)
-            bound_args.apply_defaults()
-            key_args_dict = bound_args.arguments
-            key_args_dict.pop("self", None)
+        if key_builder is not None:
 
-            key_args = ",".join(f"{k}={v}" for k, v in sorted(key_args_dict.items()))
-            key = f"{prefix}:{func.__name__}:({key_args})"
+            def build_key(args: tuple, kwargs: dict) -> str:
+                return base_key + key_builder(*args, **kwargs)
 
-            cached_result = await self.cache_storage.get(key)
-            if cached_result:
-                logger.debug("Cache hit", extra={"cache_key": key})
-                if isinstance(cached_result, str):
-                    return return_type.model_validate_json(cached_result)
-                return cached_result
-            logger.debug("Cache miss", extra={"cache_key": key})
+        else:
+            specs = _compile_key_args(sig, key_args)
+            template = (
+                base_key + "(" + ",".join(f"{name}={{}}" for name, _, _ in specs) + ")"
+            )
+
+            def build_key(args: tuple, kwargs: dict) -> str:
+                values = []
+                for name, position, default in specs:
+                    if name in kwargs:
+                        values.append(kwargs[name])
+                    elif position is not None and position < len(args):
+                        values.append(args[position])
+                    elif default is not inspect.Parameter.empty:
+                        values.append(default)
+                    else:
+                        raise TypeError(f"missing required argument '{name}'")
+                return template.format(*values)
+
+        def cache_key(self, *args, **kwargs) -> str:
+            namespace = getattr(self, "cache_namespace", None)
+            key = build_key(args, kwargs)
+            return f"{namespace}:{key}" if namespace else key
+
+        async def invalidate(self, *args, **kwargs) -> None:
+            key = cache_key(self, *args, **kwargs)
+            logger.debug("Cache invalidate", extra={"cache_key": key})
+            await self.cache_storage.delete(key)
+
+        stats = CACHE_STATS.setdefault(base_key.rstrip(":"), CacheStats())
+        in_flight: dict[str, asyncio.Future] = {}
+
+        refresh_tasks: set[asyncio.Task] = set()
+        envelope = bool(soft_expire or grace)
+        storage_expire = expire + grace if expire and grace else expire
+
+        def decode(payload: Any) -> Any:
+            if isinstance(payload, str):
+                return codec.loads(payload)
+            return payload
+
+        async def read(self, key: str) -> Any:
+            try:
+                return await self.cache_storage.get(key)
+            except Exception as e:
+                stats.storage_errors += 1
+                logger.warning(f"Cache read failed: {e}", extra={"cache_key": key})
+                return None
+
+        async def write(self, key: str, value: Any, ttl: Optional[int]) -> None:
+            try:
+                await self.cache_storage.set(key, value, ttl)
+            except Exception as e:
+                stats.storage_errors += 1
+                logger.warning(f"Cache write failed: {e}", extra={"cache_key": key})
+
+        async def compute(self, key: str, args: tuple, kwargs: dict) -> Any:
             result = await func(self, *args, **kwargs)
 
             if result:
-                await self.cache_storage.set(key, result.model_dump_json(), expire)
+                payload = codec.dumps(result)
+                if envelope:
+                    now = time.time()
+                    payload = _pack(
+                        payload,
+                        now + (soft_expire or expire or float("inf")),
+                        now + (expire or float("inf")),
+                    )
+                await write(self, key, payload, storage_expire)
+            elif negative_expire:
+                await write(self, key, NEGATIVE_RESULT, negative_expire)
+            elif envelope:
+                # Do not keep serving a stale value for something that is gone.
+                try:
+                    await self.cache_storage.delete(key)
+                except Exception as e:
+                    stats.storage_errors += 1
+                    logger.warning(
+                        f"Cache delete failed: {e}", extra={"cache_key": key}
+                    )
 
             return result
 
+        async def compute_with_lock(self, key: str, args: tuple, kwargs: dict) -> Any:
+            token = await self.cache_storage.acquire_lock(key, lock_lease)
+            if token is None:
+                stats.lock_waits += 1
+                deadline = time.monotonic() + lock_lease
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+                    cached_result = await read(self, key)
+                    if cached_result == NEGATIVE_RESULT:
+                        return None
+                    if cached_result:
+                        fresh_until, _, payload = _unpack(cached_result)
+                        if fresh_until > time.time():
+                            return decode(payload)
+                logger.debug("Cache lock lease expired", extra={"cache_key": key})
+            try:
+                return await compute(self, key, args, kwargs)
+            finally:
+                if token is not None:
+                    await self.cache_storage.release_lock(key, token)
+
+        load = compute_with_lock if distributed_lock else compute
+
+        async def load_once(self, key: str, args: tuple, kwargs: dict) -> Any:
+            if not single_flight:
+                return await load(self, key, args, kwargs)
+
+            future = in_flight.get(key)
+            if future is not None:
+                stats.coalesced += 1
+                try:
+                    return await asyncio.shield(future)
+                except _LoadAbandoned:
+                    return await load(self, key, args, kwargs)
+
+            future = asyncio.get_running_loop().create_future()
+            in_flight[key] = future
+            try:
+                result = await load(self, key, args, kwargs)
+            except asyncio.CancelledError:
+                future.set_exception(_LoadAbandoned())
+                future.exception()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Mark the exception as retrieved in case nobody was waiting.
+                future.exception()
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                del in_flight[key]
+
+        async def refresh(self, key: str, args: tuple, kwargs: dict) -> None:
+            try:
+                await load_once(self, key, args, kwargs)
+            except Exception as e:
+                logger.warning(
+                    f"Background cache refresh failed: {e}", extra={"cache_key": key}
+                )
+
+        def schedule_refresh(self, key: str, args: tuple, kwargs: dict) -> None:
+            if key in in_flight:
+                return
+            stats.refreshes += 1
+            task = asyncio.get_running_loop().create_task(
+                refresh(self, key, args, kwargs)
+            )
+            # Keep a reference so the task is not garbage-collected mid-flight.
+            refresh_tasks.add(task)
+            task.add_done_callback(refresh_tasks.discard)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            key = cache_key(self, *args, **kwargs)
+
+            cached_result = await read(self, key)
+            if cached_result == NEGATIVE_RESULT:
+                stats.negative_hits += 1
+                logger.debug("Negative cache hit", extra={"cache_key": key})
+                return None
+            if not cached_result:
+                stats.misses += 1
+                logger.debug("Cache miss", extra={"cache_key": key})
+                return await load_once(self, key, args, kwargs)
+
+            fresh_until, stale_until, payload = _unpack(cached_result)
+            now = time.time()
+            if now < fresh_until:
+                stats.hits += 1
+                logger.debug("Cache hit", extra={"cache_key": key})
+                return decode(payload)
+
+            if now < stale_until:
+                stats.stale_hits += 1
+                logger.debug("Stale cache hit", extra={"cache_key": key})
+                schedule_refresh(self, key, args, kwargs)
+                return decode(payload)
+
+            stats.misses += 1
+            try:
+                return await load_once(self, key, args, kwargs)
+            except Exception as e:
+                stats.stale_on_error += 1
+                logger.warning(
+                    f"Serving stale cache entry after load failure: {e}",
+                    extra={"cache_key": key},
+                )
+                return decode(payload)
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+        wrapper.stats = stats
         return wrapper
 
     return decorator
@@ -1,27 +1,232 @@
+import asyncio
+import heapq
+import logging
+import sys
 import time
+from collections import OrderedDict
 from typing import Any, Optional
 
+from ..tracing.tracer import trace_methods
 from .abstract_cache_storage import AbstractCacheStorage
 
+logger = logging.getLogger(__name__)
 
+SWEEP_BATCH_SIZE = 64
+SKETCH_DEPTH_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0x27D4EB2F165667C5,
+)
+SKETCH_MAX_COUNT = 15
+HALVE_TABLE = bytes(count >> 1 for count in range(256))
+
+
+class FrequencySketch:
+    """
+    A count-min sketch of key access frequencies with periodic aging, used as
+    the TinyLFU admission filter.
+
+    Counters saturate at 15 and are all halved once `sample_size` increments
+    have been recorded, so the sketch tracks recent popularity rather than
+    all-time popularity.
+    """
+
+    def __init__(self, capacity: int):
+        width = 1
+        while width < max(capacity, 16):
+            width <<= 1
+        self._mask = width - 1
+        self._table = [bytearray(width) for _ in SKETCH_DEPTH_SEEDS]
+        self._sample_size = 10 * width
+        self._additions = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        h = hash(key)
+        mask = self._mask
+        return [((h * seed) >> 21) & mask for seed in SKETCH_DEPTH_SEEDS]
+
+    def increment(self, key: str) -> None:
+        for row, index in zip(self._table, self._indexes(key)):
+            if row[index] < SKETCH_MAX_COUNT:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._reset()
+
+    def frequency(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._table, self._indexes(key)))
+
+    def _reset(self) -> None:
+        self._additions //= 2
+        for row in self._table:
+            row[:] = row.translate(HALVE_TABLE)
+
+
+@trace_methods("cache")
 class InMemoryCacheStorage(AbstractCacheStorage):
-    def __init__(self):
-        self._cache = {}
-        self._expirations = {}
+    """
+    A size-bounded, process-local cache.
+
+    Entries are kept in LRU order and evicted once either `max_entries` or
+    `max_bytes` is exceeded. When the cache is full, a new key is only
+    admitted if it has been requested more often than the LRU victim it would
+    replace (TinyLFU), so one-off keys cannot flush out the hot set.
+
+    Expiry times are tracked in a heap. Expired entries are reclaimed lazily
+    on read, incrementally on every write and, once `start()` has been
+    awaited, by a background sweeper.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        sweep_interval: float = 1.0,
+        admission: bool = True,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sweep_interval = sweep_interval
+        self._entries: OrderedDict[str, tuple[Any, Optional[float], int]] = (
+            OrderedDict()
+        )
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._sketch = FrequencySketch(max_entries) if admission else None
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0
 
     async def get(self, key: str) -> Optional[Any]:
-        if key in self._expirations and self._expirations[key] < time.time():
-            self.delete(key)
+        if self._sketch:
+            self._sketch.increment(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
             return None
-        return self._cache.get(key)
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
 
     async def set(self, key: str, value: Any, expire: Optional[int] = None) -> None:
-        self._cache[key] = value
-        if expire:
-            self._expirations[key] = time.time() + expire
+        now = time.monotonic()
+        self._sweep_expired(now, SWEEP_BATCH_SIZE)
+
+        replacing = key in self._entries
+        if replacing:
+            self._remove(key)
+
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self._max_bytes or (not replacing and not self._admit(key, size)):
+            self.rejections += 1
+            return
+
+        expires_at = now + expire if expire else None
+        self._entries[key] = (value, expires_at, size)
+        self.size_bytes += size
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            if len(self._expiry_heap) > 2 * len(self._entries) + SWEEP_BATCH_SIZE:
+                self._compact_expiry_heap()
+
+        while (
+            len(self._entries) > self._max_entries or self.size_bytes > self._max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
 
     async def delete(self, key: str) -> None:
-        if key in self._cache:
-            del self._cache[key]
-        if key in self._expirations:
-            del self._expirations[key]
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._expiry_heap.clear()
+        self.size_bytes = 0
+
+    async def start(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    def stats(self) -> dict:
+        """Returns size, hit and eviction counters since process start."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejections": self.rejections,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _admit(self, key: str, size: int) -> bool:
+        if (
+            self._sketch is None
+            or not self._entries
+            or (
+                len(self._entries) < self._max_entries
+                and self.size_bytes + size <= self._max_bytes
+            )
+        ):
+            return True
+        victim = next(iter(self._entries))
+        return self._sketch.frequency(key) > self._sketch.frequency(victim)
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def _sweep_expired(self, now: float, limit: Optional[int] = None) -> int:
+        swept = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now and (limit is None or swept < limit):
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # The heap may hold stale items for keys that were overwritten.
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+                swept += 1
+        return swept
+
+    def _compact_expiry_heap(self) -> None:
+        self._expiry_heap = [
+            (expires_at, key)
+            for key, (_, expires_at, _) in self._entries.items()
+            if expires_at is not None
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            try:
+                swept = self._sweep_expired(time.monotonic())
+                if swept:
+                    logger.debug(f"Swept {swept} expired cache entries.")
+            except Exception as e:
+                logger.error(f"Cache expiry sweep failed: {e}", exc_info=True)
@@ -1,13 +1,25 @@
+import uuid
 from typing import Any, Optional
 
 import redis.asyncio as redis
 
+from ..tracing.tracer import trace_methods
 from .abstract_cache_storage import AbstractCacheStorage
 
+# Deletes the lock only if it is still held by the caller's token.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
 
+
+@trace_methods("redis")
 class RedisCacheStorage(AbstractCacheStorage):
     def __init__(self, redis_url: str):
         self._redis = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self._release_lock = self._redis.register_script(RELEASE_LOCK_SCRIPT)
 
     async def get(self, key: str) -> Optional[Any]:
         return await self._redis.get(key)
@@ -17,3 +29,12 @@ class RedisCacheStorage(AbstractCacheStorage):
 
     async def delete(self, key: str) -> None:
         await self._redis.delete(key)
+
+    async def acquire_lock(self, key: str, lease: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        if await self._redis.set(f"lock:{key}", token, nx=True, px=int(lease * 1000)):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._release_lock(keys=[f"lock:{key}"], args=[token])
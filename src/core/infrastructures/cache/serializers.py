@@ -0,0 +1,30 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class CacheSerializer(ABC):
+    """
+    Converts values returned by a cached method to and from the string that
+    is kept in the cache storage.
+    """
+
+    @abstractmethod
+    def dumps(self, value: Any) -> str: ...
+
+    @abstractmethod
+    def loads(self, payload: str) -> Any: ...
+
+
+class PydanticSerializer(CacheSerializer):
+    """Stores a pydantic model as JSON and validates it again on every hit."""
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+
+    def dumps(self, value: BaseModel) -> str:
+        return value.model_dump_json()
+
+    def loads(self, payload: str) -> BaseModel:
+        return self.model.model_validate_json(payload)
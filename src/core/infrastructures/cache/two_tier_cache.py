@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Optional
+
+import redis.asyncio as redis
+
+from ..tracing.tracer import trace_methods
+from .abstract_cache_storage import AbstractCacheStorage
+from .inmemory_cache import InMemoryCacheStorage
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_INTERVAL = 1  # In seconds
+
+
+@trace_methods("cache")
+class TwoTierCacheStorage(AbstractCacheStorage):
+    """
+    A bounded in-process L1 in front of a shared L2 (normally Redis).
+
+    Writes and deletes are published on a Redis pub/sub channel so that other
+    replicas drop their L1 copy of the key. Pub/sub delivery is best effort,
+    so L1 entries never outlive `near_cache_ttl` seconds and the whole L1 is
+    cleared whenever the invalidation subscription has to be re-established.
+    """
+
+    def __init__(
+        self,
+        remote: AbstractCacheStorage,
+        redis_url: str,
+        max_entries: int = 10_000,
+        max_bytes: int = 16 * 1024 * 1024,
+        near_cache_ttl: int = 30,
+        invalidation_channel: str = "cache-invalidation",
+    ):
+        self._remote = remote
+        self._near = InMemoryCacheStorage(max_entries=max_entries, max_bytes=max_bytes)
+        self._near_cache_ttl = near_cache_ttl
+        self._redis = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        self._channel = invalidation_channel
+        self._node_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        self._ensure_listener()
+        value = await self._near.get(key)
+        if value is not None:
+            self.l1_hits += 1
+            return value
+
+        value = await self._remote.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.l2_hits += 1
+        await self._near.set(key, value, self._near_cache_ttl)
+        return value
+
+    async def set(self, key: str, value: Any, expire: Optional[int] = None) -> None:
+        self._ensure_listener()
+        await self._remote.set(key, value, expire)
+        ttl = min(expire, self._near_cache_ttl) if expire else self._near_cache_ttl
+        await self._near.set(key, value, ttl)
+        await self._publish_invalidation(key)
+
+    async def delete(self, key: str) -> None:
+        self._ensure_listener()
+        await self._near.delete(key)
+        await self._remote.delete(key)
+        await self._publish_invalidation(key)
+
+    async def acquire_lock(self, key: str, lease: float) -> Optional[str]:
+        return await self._remote.acquire_lock(key, lease)
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._remote.release_lock(key, token)
+
+    def stats(self) -> dict:
+        """Returns hit counters and L1/L2 hit ratios since process start."""
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "l1_size": len(self._near),
+            "l1_evictions": self._near.evictions,
+            "l1_hit_ratio": self.l1_hits / lookups if lookups else 0.0,
+            "l2_hit_ratio": self.l2_hits / lookups if lookups else 0.0,
+        }
+
+    async def start(self) -> None:
+        await self._near.start()
+        self._ensure_listener()
+
+    async def close(self) -> None:
+        await self._near.close()
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        await self._redis.aclose()
+
+    async def _publish_invalidation(self, key: str) -> None:
+        try:
+            await self._redis.publish(self._channel, f"{self._node_id}:{key}")
+        except redis.RedisError as e:
+            logger.warning(
+                f"Failed to publish cache invalidation: {e}", extra={"cache_key": key}
+            )
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self._channel)
+                # Anything published while we were not subscribed is lost.
+                self._near.clear()
+                async for message in pubsub.listen():
+                    node_id, _, key = message["data"].partition(":")
+                    if node_id != self._node_id:
+                        await self._near.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener failed: {e}. Retrying...")
+                self._near.clear()
+                await asyncio.sleep(RECONNECT_INTERVAL)
+            finally:
+                await pubsub.aclose()
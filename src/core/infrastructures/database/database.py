@@ -1,31 +1,92 @@
 import asyncio
 import logging
 import uuid
+from typing import Sequence
 
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_scoped_session,
     create_async_engine,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import NullPool
 
 from src.core.common.settings import Settings
+from src.core.infrastructures.database.pool import (
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+    pool_stats,
+)
+from src.core.infrastructures.database.replicas import ReplicaSet
 
 logger = logging.getLogger(__name__)
 Base = declarative_base()
 
 
 class Database:
-    def __init__(self, db_url: str, pool_size: int = 5, max_overflow: int = 10):
+    def __init__(
+        self,
+        db_url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        replica_urls: Sequence[str] = (),
+        replica_pool_size: int = 5,
+        replica_max_overflow: int = 10,
+        replica_use_pgbouncer: bool | None = None,
+        replica_max_lag: float = 5.0,
+        replica_retry_interval: float = 5.0,
+    ):
         settings = Settings()
+        self._engine = self._create_engine(
+            db_url, pool_size, max_overflow, pool_timeout, settings.use_pgbouncer
+        )
+        # Each replica gets its own pool, sized separately from the primary's.
+        self.replicas = ReplicaSet(
+            [
+                self._create_engine(
+                    str(url),
+                    replica_pool_size,
+                    replica_max_overflow,
+                    pool_timeout,
+                    settings.use_pgbouncer
+                    if replica_use_pgbouncer is None
+                    else replica_use_pgbouncer,
+                )
+                for url in replica_urls
+            ],
+            max_lag=replica_max_lag,
+            retry_interval=replica_retry_interval,
+        )
+        session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=self._engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        self._session_factory = async_scoped_session(
+            session_factory,
+            scopefunc=asyncio.current_task,
+        )
+
+    @staticmethod
+    def _create_engine(
+        db_url: str,
+        pool_size: int,
+        max_overflow: int,
+        pool_timeout: float,
+        use_pgbouncer: bool,
+    ) -> AsyncEngine:
         engine_kwargs = {
             "pool_size": pool_size,
             "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "poolclass": InstrumentedQueuePool,
             "echo": False,
         }
 
-        if settings.use_pgbouncer:
+        if use_pgbouncer:
             logger.info("Using NullPool for database connections (PgBouncer mode).")
             engine_kwargs["connect_args"] = {
                 "prepared_statement_name_func": lambda: f"\
@@ -34,35 +95,45 @@ class Database:
                 "prepared_statement_cache_size": 0,
             }
 
-            engine_kwargs["poolclass"] = NullPool
+            engine_kwargs["poolclass"] = InstrumentedNullPool
             # NullPool does not use these arguments, so we remove them.
             del engine_kwargs["pool_size"]
             del engine_kwargs["max_overflow"]
+            del engine_kwargs["pool_timeout"]
         else:
             logger.info(
                 f"Using default QueuePool with pool_size={pool_size} "
                 f"and max_overflow={max_overflow}."
             )
-        self._engine = create_async_engine(
+        return create_async_engine(
             db_url,
             **engine_kwargs,
         )
-        session_factory = sessionmaker(
-            autocommit=False,
-            autoflush=False,
-            bind=self._engine,
-            class_=AsyncSession,
-            expire_on_commit=False,
-        )
-        self._session_factory = async_scoped_session(
-            session_factory,
-            scopefunc=asyncio.current_task,
-        )
 
     def get_session(self) -> AsyncSession:
         """Returns the session."""
         return self._session_factory()
 
+    def get_scoped_session(self) -> async_scoped_session:
+        """
+        Returns a proxy that forwards to the session of the current task, for
+        objects that outlive a single request.
+        """
+        return self._session_factory
+
+    def pool_stats(self) -> dict:
+        """
+        Returns checkout counts, waits, timeouts and connections in use of
+        the primary's pool and of each replica's pool.
+        """
+        return {
+            "primary": pool_stats(self._engine),
+            "replicas": {
+                replica.name: pool_stats(replica.engine)
+                for replica in self.replicas.replicas
+            },
+        }
+
     async def close_session(self):
         """Closes and removes the session."""
         await self._session_factory.remove()
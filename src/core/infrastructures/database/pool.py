@@ -0,0 +1,71 @@
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    in_use: int = 0
+    max_in_use: int = 0
+    checkout_wait_seconds: float = 0.0
+    max_checkout_wait: float = 0.0
+
+
+class _InstrumentedPool(Pool):
+    """
+    Counts checkouts, the time spent waiting for a connection and checkouts
+    that gave up after `pool_timeout`, in `stats`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - started
+            self.stats.checkout_wait_seconds += wait
+            self.stats.max_checkout_wait = max(self.stats.max_checkout_wait, wait)
+        self.stats.checkouts += 1
+        self.stats.in_use += 1
+        self.stats.max_in_use = max(self.stats.max_in_use, self.stats.in_use)
+        return connection
+
+    def _do_return_conn(self, record):
+        self.stats.in_use -= 1
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        # Disposing an engine replaces its pool, the counters carry over.
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPool, NullPool):
+    pass
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    """Returns the counters of `engine`'s pool and how full it is."""
+    pool = engine.sync_engine.pool
+    stats = asdict(pool.stats) if isinstance(pool, _InstrumentedPool) else {}
+    if isinstance(pool, QueuePool):
+        stats["pool_size"] = pool.size()
+        stats["overflow"] = max(pool.overflow(), 0)
+    return stats
@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import Executable, Result, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary, or 0 if it has replayed
+# everything it received (an idle primary would otherwise look like lag).
+REPLICATION_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(
+            extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.session_factory = sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.down_until = 0.0
+        self.lag = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaSet:
+    """
+    Spreads read-only statements over replica databases round-robin,
+    skipping replicas that failed within the last `retry_interval` seconds
+    or lag more than `max_lag` seconds behind the primary. `execute` returns
+    None instead of raising whenever no replica could answer, so callers
+    fall back to the primary.
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        max_lag: float = 5.0,
+        retry_interval: float = 5.0,
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.retry_interval = retry_interval
+        self._turns = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        """Returns the next healthy replica, if any."""
+        now = time.monotonic()
+        turn = next(self._turns)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(turn + offset) % len(self.replicas)]
+            if replica.down_until <= now and replica.lag <= self.max_lag:
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica) -> None:
+        replica.down_until = time.monotonic() + self.retry_interval
+
+    async def execute(self, statement: Executable) -> Optional[Result]:
+        """
+        Runs `statement` on a healthy replica in a session of its own and
+        returns the buffered result, or None if that failed.
+        """
+        replica = self.pick()
+        if replica is None:
+            return None
+        try:
+            async with replica.session_factory() as session:
+                return await session.execute(statement)
+        except Exception as e:
+            logger.warning(f"Read from replica {replica.name} failed: {e}")
+            self.mark_down(replica)
+            return None
+
+    async def check_lag(self) -> None:
+        """Measures the replication lag of every replica."""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as connection:
+                    lag = (await connection.execute(REPLICATION_LAG_QUERY)).scalar()
+            except Exception as e:
+                logger.warning(f"Replica {replica.name} is unreachable: {e}")
+                self.mark_down(replica)
+                continue
+            if lag > self.max_lag >= replica.lag:
+                logger.warning(f"Replica {replica.name} lags {lag:.1f}s behind.")
+            replica.lag = lag
+            replica.down_until = 0.0
+
+    async def run_health_checks(self, interval: float = 1.0) -> None:
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -0,0 +1,85 @@
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Callable, Iterable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+VIRTUAL_NODES = 128  # Points per shard on the hash ring
+
+
+def _ring_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+class ShardRouter:
+    """
+    Maps keys to one of `shard_count` databases with consistent hashing:
+    every shard owns `virtual_nodes` points on a hash ring, and a key goes
+    to the shard of the first point after its hash. Adding a shard moves
+    only about 1/n of the keys, though moving their rows is up to the
+    operator.
+
+    Urls are placed by id. Ids are picked so that a url's id maps to the
+    same shard as its original url digest, or its custom code, so that
+    every lookup only touches one shard. A custom code that decodes to an
+    id is placed like that id, next to the generated code it could clash
+    with.
+    """
+
+    def __init__(self, shard_count: int = 1, virtual_nodes: int = VIRTUAL_NODES):
+        self.shard_count = shard_count
+        points = sorted(
+            (_ring_hash(f"shard-{shard}-{node}".encode()), shard)
+            for shard in range(shard_count)
+            for node in range(virtual_nodes)
+        )
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for_key(self, key: str | bytes | int) -> int:
+        """Returns the shard of `key`; int keys are url ids."""
+        if self.shard_count == 1:
+            return 0
+        if isinstance(key, int):
+            key = key.to_bytes(8, "big")
+        elif isinstance(key, str):
+            key = key.encode()
+        index = bisect.bisect(self._points, _ring_hash(key)) % len(self._points)
+        return self._shards[index]
+
+    def shard_for_id(self, url_id: int) -> int:
+        return self.shard_for_key(url_id)
+
+    def group_by_id(
+        self, items: Iterable[T], url_id_of: Callable[[T], int]
+    ) -> dict[int, list[T]]:
+        """Splits `items` by the shard of their url id, keeping their order."""
+        groups: dict[int, list[T]] = defaultdict(list)
+        for item in items:
+            groups[self.shard_for_id(url_id_of(item))].append(item)
+        return groups
+
+
+class ShardSessions:
+    """
+    The sessions of every shard, committed and rolled back together. The
+    commits are not atomic across shards: if one fails, earlier shards keep
+    their writes.
+    """
+
+    def __init__(self, sessions: list[AsyncSession]):
+        self.sessions = sessions
+
+    def __getitem__(self, shard: int) -> AsyncSession:
+        return self.sessions[shard]
+
+    async def commit(self) -> None:
+        for session in self.sessions:
+            await session.commit()
+
+    async def rollback(self) -> None:
+        for session in self.sessions:
+            await session.rollback()
@@ -1,27 +1,97 @@
 from dependency_injector import containers, providers
 
 from src.core.common.settings import Settings
+from src.core.infrastructures.bloom_filter.abstract_bloom_filter import (
+    AbstractBloomFilter,
+)
+from src.core.infrastructures.bloom_filter.in_memory import InMemoryBloomFilter
+from src.core.infrastructures.bloom_filter.null import NullBloomFilter
+from src.core.infrastructures.bloom_filter.redis import RedisBloomFilter
 from src.core.infrastructures.cache.abstract_cache_storage import AbstractCacheStorage
 from src.core.infrastructures.cache.inmemory_cache import InMemoryCacheStorage
 from src.core.infrastructures.cache.redis_cache import RedisCacheStorage
+from src.core.infrastructures.cache.two_tier_cache import TwoTierCacheStorage
 from src.core.infrastructures.database.database import AsyncSession, Database
+from src.core.infrastructures.database.shards import ShardRouter
 from src.core.infrastructures.message_queue.abstract_message_queue import (
     AbstractMessageQueue,
 )
+from src.core.infrastructures.message_queue.buffer import MessageBuffer
 from src.core.infrastructures.message_queue.in_memory import InMemoryMessageQueue
 from src.core.infrastructures.message_queue.redis import RedisMessageQueue
+from src.core.infrastructures.message_queue.redis_stream import (
+    RedisStreamMessageQueue,
+)
+from src.core.infrastructures.metrics.multiprocess import MultiprocessMetrics
+from src.core.infrastructures.metrics.registry import REGISTRY
+from src.core.infrastructures.tracing.exporters import (
+    NdjsonSpanExporter,
+    OtlpHttpSpanExporter,
+    SpanExporter,
+)
+from src.core.infrastructures.tracing.tracer import Tracer
+from src.core.infrastructures.visit_counter.abstract_visit_counter import (
+    AbstractVisitCounter,
+)
+from src.core.infrastructures.visit_counter.database import DatabaseVisitCounter
+from src.core.infrastructures.visit_counter.redis import RedisVisitCounter
 from src.core.shorten.entities.urls import URL
+from src.core.shorten.entities.visit_rollups import VisitRollup
 from src.core.shorten.entities.visits import Visit
+from src.core.shorten.repositories.sharded_repositories import (
+    ShardedUrlRepository,
+    ShardedVisitRollupRepository,
+    ShardedVisitsRepository,
+)
 from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visit_rollup_repository import (
+    VisitRollupRepository,
+)
 from src.core.shorten.repositories.visits_repository import VisitsRepository
 from src.core.shorten.services.url_shorten_service import UrlShortenService
 from src.core.shorten.services.url_visits_service import UrlVisitsService
+from src.core.shorten.utils.id_allocator import UrlIdAllocator
 from src.core.shorten.utils.shorten_strategy.abstract_shorten_strategy import (
     ShortCodeStrategy,
 )
 from src.core.shorten.utils.shorten_strategy.base_62_shorten_stategy import (
     Base62ShortCodeStrategy,
 )
+from src.core.shorten.utils.shorten_strategy.feistel_shorten_strategy import (
+    FeistelShortCodeStrategy,
+)
+
+
+def _shard_databases(database: Database, settings: Settings) -> list[Database]:
+    return [database] + [
+        Database(
+            str(dsn),
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+        )
+        for dsn in settings.postgres_shard_dsns
+    ]
+
+
+def _sharded_url_repository(
+    databases: list[Database],
+    router: ShardRouter,
+    read_your_writes: bool = True,
+    scoped: bool = False,
+) -> ShardedUrlRepository:
+    return ShardedUrlRepository(
+        [
+            UrlRepository(
+                URL,
+                db.get_scoped_session() if scoped else db.get_session(),
+                replicas=db.replicas,
+                read_your_writes=read_your_writes,
+            )
+            for db in databases
+        ],
+        router,
+    )
 
 
 class AppContainer(containers.DeclarativeContainer):
@@ -35,53 +105,285 @@ class AppContainer(containers.DeclarativeContainer):
         db_url=db_url_provider,
         pool_size=settings.provided.db_pool_size,
         max_overflow=settings.provided.db_max_overflow,
+        pool_timeout=settings.provided.db_pool_timeout,
+        replica_urls=settings.provided.postgres_replica_dsns,
+        replica_pool_size=settings.provided.db_replica_pool_size,
+        replica_max_overflow=settings.provided.db_replica_max_overflow,
+        replica_use_pgbouncer=settings.provided.db_replica_use_pgbouncer,
+        replica_max_lag=settings.provided.db_replica_max_lag,
+        replica_retry_interval=settings.provided.db_replica_retry_interval,
+    )
+    db_replicas = providers.Singleton(lambda db: db.replicas, db=database)
+    # The primary database is shard 0; postgres_shard_dsns adds the others.
+    shard_databases: providers.Singleton[list[Database]] = providers.Singleton(
+        _shard_databases, database=database, settings=settings
+    )
+    shard_router = providers.Singleton(
+        lambda databases: ShardRouter(len(databases)), databases=shard_databases
+    )
+    storage_layout = providers.Callable(
+        lambda s: "sharded" if s.postgres_shard_dsns else "single", s=settings
+    )
+    multiprocess_metrics = providers.Singleton(
+        lambda s: MultiprocessMetrics(
+            REGISTRY, s.metrics_multiprocess_dir, s.metrics_snapshot_interval
+        )
+        if s.metrics_multiprocess_dir
+        else None,
+        s=settings,
+    )
+    span_exporter: providers.Selector[SpanExporter] = providers.Selector(
+        settings.provided.tracing_exporter,
+        ndjson=providers.Singleton(
+            NdjsonSpanExporter, path=settings.provided.tracing_ndjson_path
+        ),
+        otlp=providers.Singleton(
+            OtlpHttpSpanExporter,
+            endpoint=settings.provided.tracing_otlp_endpoint,
+            service_name=settings.provided.application_name,
+        ),
+    )
+    tracer = providers.Singleton(
+        Tracer,
+        exporter=span_exporter,
+        sample_rate=settings.provided.tracing_sample_rate,
+        server_timing=settings.provided.tracing_server_timing,
     )
     db_session: providers.Factory[AsyncSession] = providers.Factory(
         lambda db: db.get_session(),
         db=database,
     )
+    scoped_db_session = providers.Singleton(
+        lambda db: db.get_scoped_session(),
+        db=database,
+    )
 
     redis_cache = providers.Singleton(
         RedisCacheStorage, redis_url=settings.provided.redis_dsn
     )
-    in_memory_cache = providers.Singleton(InMemoryCacheStorage)
+    in_memory_cache = providers.Singleton(
+        InMemoryCacheStorage,
+        max_entries=settings.provided.in_memory_cache_max_entries,
+        max_bytes=settings.provided.in_memory_cache_max_bytes,
+        sweep_interval=settings.provided.in_memory_cache_sweep_interval,
+    )
+    two_tier_cache = providers.Singleton(
+        TwoTierCacheStorage,
+        remote=redis_cache,
+        redis_url=settings.provided.redis_dsn,
+        max_entries=settings.provided.near_cache_max_entries,
+        max_bytes=settings.provided.near_cache_max_bytes,
+        near_cache_ttl=settings.provided.near_cache_ttl,
+        invalidation_channel=settings.provided.cache_invalidation_channel,
+    )
 
     cache_storage: providers.Selector[AbstractCacheStorage] = providers.Selector(
         settings.provided.cache_type,
         redis=redis_cache,
-        **{"in-memory": in_memory_cache},
+        **{"in-memory": in_memory_cache, "two-tier": two_tier_cache},
+    )
+
+    redis_short_code_filter = providers.Singleton(
+        RedisBloomFilter,
+        dsn=settings.provided.redis_dsn,
+        key=settings.provided.short_code_filter_key,
+        capacity=settings.provided.short_code_filter_capacity,
+        error_rate=settings.provided.short_code_filter_error_rate,
+    )
+    in_memory_short_code_filter = providers.Singleton(
+        InMemoryBloomFilter,
+        capacity=settings.provided.short_code_filter_capacity,
+        error_rate=settings.provided.short_code_filter_error_rate,
+    )
+    short_code_filter: providers.Selector[AbstractBloomFilter] = providers.Selector(
+        settings.provided.short_code_filter_type,
+        redis=redis_short_code_filter,
+        none=providers.Singleton(NullBloomFilter),
+        **{"in-memory": in_memory_short_code_filter},
     )
 
     redis_message_queue = providers.Singleton(
         RedisMessageQueue, dsn=settings.provided.redis_dsn
     )
+    redis_stream_message_queue = providers.Singleton(
+        RedisStreamMessageQueue,
+        dsn=settings.provided.redis_dsn,
+        stream_name=settings.provided.redis_stream_name,
+        group_name=settings.provided.redis_stream_group,
+        block_ms=settings.provided.redis_stream_block_ms,
+        claim_idle_ms=settings.provided.redis_stream_claim_idle_ms,
+        max_len=settings.provided.redis_stream_max_len,
+        max_deliveries=settings.provided.redis_stream_max_deliveries,
+        dead_letter_name=settings.provided.redis_stream_dead_letter_name,
+    )
     in_memory_message_queue = providers.Singleton(InMemoryMessageQueue)
     message_queue: providers.Selector[AbstractMessageQueue] = providers.Selector(
         settings.provided.message_queue_type,
         redis=redis_message_queue,
-        **{"in-memory": in_memory_message_queue},
+        **{
+            "in-memory": in_memory_message_queue,
+            "redis-stream": redis_stream_message_queue,
+        },
+    )
+    visit_buffer = providers.Singleton(
+        MessageBuffer,
+        message_queue=message_queue,
+        max_size=settings.provided.visit_buffer_max_size,
+        flush_interval=settings.provided.visit_buffer_flush_interval,
+        max_pending=settings.provided.visit_buffer_max_pending,
     )
 
-    url_repository = providers.Factory(UrlRepository, model=URL, session=db_session)
-    visits_repository = providers.Factory(
+    redis_visit_counter = providers.Singleton(
+        RedisVisitCounter,
+        dsn=settings.provided.redis_dsn,
+        key_prefix=settings.provided.visit_counter_key_prefix,
+        sync_interval=settings.provided.visit_counter_sync_interval,
+    )
+    database_visit_counter = providers.Singleton(DatabaseVisitCounter)
+    visit_counter: providers.Selector[AbstractVisitCounter] = providers.Selector(
+        settings.provided.visit_counter_type,
+        redis=redis_visit_counter,
+        database=database_visit_counter,
+    )
+
+    single_url_repository = providers.Factory(
+        UrlRepository,
+        model=URL,
+        session=db_session,
+        replicas=db_replicas,
+        read_your_writes=settings.provided.db_read_your_writes,
+    )
+    single_visits_repository = providers.Factory(
         VisitsRepository, model=Visit, session=db_session
     )
+    single_visit_rollup_repository = providers.Factory(
+        VisitRollupRepository, model=VisitRollup, session=db_session
+    )
+    sharded_url_repository = providers.Factory(
+        _sharded_url_repository,
+        databases=shard_databases,
+        router=shard_router,
+        read_your_writes=settings.provided.db_read_your_writes,
+    )
+    sharded_visits_repository = providers.Factory(
+        lambda databases, router: ShardedVisitsRepository(
+            [VisitsRepository(Visit, db.get_session()) for db in databases], router
+        ),
+        databases=shard_databases,
+        router=shard_router,
+    )
+    sharded_visit_rollup_repository = providers.Factory(
+        lambda databases, router: ShardedVisitRollupRepository(
+            [VisitRollupRepository(VisitRollup, db.get_session()) for db in databases],
+            router,
+        ),
+        databases=shard_databases,
+        router=shard_router,
+    )
+    url_repository: providers.Selector[UrlRepository] = providers.Selector(
+        storage_layout,
+        single=single_url_repository,
+        sharded=sharded_url_repository,
+    )
+    visits_repository: providers.Selector[VisitsRepository] = providers.Selector(
+        storage_layout,
+        single=single_visits_repository,
+        sharded=sharded_visits_repository,
+    )
+    visit_rollup_repository: providers.Selector[VisitRollupRepository] = (
+        providers.Selector(
+            storage_layout,
+            single=single_visit_rollup_repository,
+            sharded=sharded_visit_rollup_repository,
+        )
+    )
 
-    short_code_strategy: providers.Factory[ShortCodeStrategy] = providers.Factory(
-        Base62ShortCodeStrategy,
+    base62_short_code_strategy = providers.Singleton(Base62ShortCodeStrategy)
+    feistel_short_code_strategy = providers.Singleton(
+        FeistelShortCodeStrategy, secret=settings.provided.short_code_secret
+    )
+    short_code_strategy: providers.Selector[ShortCodeStrategy] = providers.Selector(
+        settings.provided.short_code_strategy,
+        base62=base62_short_code_strategy,
+        feistel=feistel_short_code_strategy,
+    )
+
+    url_id_allocator = providers.Singleton(
+        UrlIdAllocator,
+        block_size=settings.provided.url_id_block_size,
+        router=shard_router,
     )
 
     url_shorten_service = providers.Factory(
         UrlShortenService,
         url_repository=url_repository,
         short_code_strategy=short_code_strategy,
+        short_code_filter=short_code_filter,
+        id_allocator=url_id_allocator,
+        cache_storage=cache_storage,
+        cache_namespace=settings.provided.cache_namespace,
     )
 
     url_visits_service = providers.Factory(
         UrlVisitsService,
         url_repository=url_repository,
-        message_queue=message_queue,
+        visit_rollup_repository=visit_rollup_repository,
+        visit_buffer=visit_buffer,
         cache_storage=cache_storage,
+        short_code_filter=short_code_filter,
+        short_code_strategy=short_code_strategy,
+        visit_counter=visit_counter,
+        cache_namespace=settings.provided.cache_namespace,
+    )
+
+    # Long-lived counterparts used by the redirect fast path, which bind the
+    # session of whichever task is serving the request.
+    redirect_url_repository: providers.Selector[UrlRepository] = providers.Selector(
+        storage_layout,
+        single=providers.Singleton(
+            UrlRepository,
+            model=URL,
+            session=scoped_db_session,
+            replicas=db_replicas,
+            read_your_writes=settings.provided.db_read_your_writes,
+        ),
+        sharded=providers.Singleton(
+            _sharded_url_repository,
+            databases=shard_databases,
+            router=shard_router,
+            read_your_writes=settings.provided.db_read_your_writes,
+            scoped=True,
+        ),
+    )
+    redirect_visit_rollup_repository: providers.Selector[VisitRollupRepository] = (
+        providers.Selector(
+            storage_layout,
+            single=providers.Singleton(
+                VisitRollupRepository, model=VisitRollup, session=scoped_db_session
+            ),
+            sharded=providers.Singleton(
+                lambda databases, router: ShardedVisitRollupRepository(
+                    [
+                        VisitRollupRepository(VisitRollup, db.get_scoped_session())
+                        for db in databases
+                    ],
+                    router,
+                ),
+                databases=shard_databases,
+                router=shard_router,
+            ),
+        )
+    )
+    redirect_url_visits_service = providers.Singleton(
+        UrlVisitsService,
+        url_repository=redirect_url_repository,
+        visit_rollup_repository=redirect_visit_rollup_repository,
+        visit_buffer=visit_buffer,
+        cache_storage=cache_storage,
+        short_code_filter=short_code_filter,
+        short_code_strategy=short_code_strategy,
+        visit_counter=visit_counter,
+        cache_namespace=settings.provided.cache_namespace,
     )
 
 
@@ -6,16 +6,48 @@ class AbstractMessageQueue(ABC):
     An abstract base class defining the interface for a message queue client.
     """
 
+    # Whether `get_batch` waits for messages itself, so callers need not sleep.
+    blocking_reads = False
+    # Seconds after which a message not acked yet may be handed out again, if
+    # the queue redelivers; holders of slow messages `extend` them meanwhile.
+    redelivery_timeout: float | None = None
+
     @abstractmethod
     async def publish(self, message: dict):
         """Publishes a message to the queue."""
         pass
 
+    async def publish_many(self, messages: list[dict]):
+        """Publishes several messages, in order, in as few round-trips as possible."""
+        for message in messages:
+            await self.publish(message)
+
     @abstractmethod
     async def get_batch(self, batch_size: int) -> list[dict]:
         """Fetches a batch of messages from the queue."""
         pass
 
+    async def ack(self, messages: list[dict]):
+        """
+        Acknowledges messages from `get_batch` once they have been processed.
+        Queues that do not redeliver unacknowledged messages ignore this.
+        """
+        pass
+
+    async def extend(self, messages: list[dict]):
+        """
+        Keeps messages from `get_batch` that are still being processed from
+        being redelivered for another `redelivery_timeout`.
+        """
+        pass
+
+    async def depth(self) -> int | None:
+        """
+        Returns the number of messages not yet processed, or None if the
+        queue cannot tell.
+        """
+        return None
+
     @abstractmethod
     async def close(self):
         """Closes the connection to the message queue."""
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from src.core.infrastructures.metrics.registry import REGISTRY
+
+from .abstract_message_queue import AbstractMessageQueue
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_DURATION = REGISTRY.histogram(
+    "visit_publish_duration_seconds",
+    "Time to publish one batch of buffered visits to the message queue.",
+)
+
+
+class MessageBuffer:
+    """
+    Collects messages in process and publishes them to `message_queue` in
+    batches, once `max_size` messages are pending or `flush_interval` seconds
+    after the first of them arrived, whichever comes first.
+
+    If publishing fails the batch is put back and retried on the next flush.
+    At most `max_pending` messages are held; beyond that new messages are
+    dropped and counted. Call `close()` on shutdown to publish what is left.
+    """
+
+    def __init__(
+        self,
+        message_queue: AbstractMessageQueue,
+        max_size: int = 500,
+        flush_interval: float = 0.1,
+        max_pending: int = 50_000,
+    ):
+        self._message_queue = message_queue
+        self._max_size = max_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._pending: list[dict] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set[asyncio.Task] = set()
+
+        self.published = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    def put(self, message: dict) -> None:
+        """Adds a message to the buffer. Never blocks on the message queue."""
+        if len(self._pending) >= self._max_pending:
+            self.dropped += 1
+            logger.debug("Message buffer is full, dropping message.")
+            return
+
+        self._pending.append(message)
+        if len(self._pending) >= self._max_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self._flush_interval, self._schedule_flush
+            )
+
+    async def flush(self) -> None:
+        """Publishes every pending message."""
+        self._cancel_timer()
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            await self._message_queue.publish_many(batch)
+        except Exception as e:
+            self.failed_flushes += 1
+            kept = batch[: max(self._max_pending - len(self._pending), 0)]
+            self.dropped += len(batch) - len(kept)
+            self._pending[:0] = kept
+            logger.error(
+                f"Failed to publish {len(batch)} buffered messages: {e}", exc_info=True
+            )
+            if self._pending and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self._flush_interval, self._schedule_flush
+                )
+            return
+
+        latency = time.perf_counter() - started
+        PUBLISH_DURATION.observe(latency)
+        self.flushes += 1
+        self.published += len(batch)
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self._total_flush_latency += latency
+        logger.debug(f"Published {len(batch)} buffered messages in {latency:.4f}s.")
+
+    async def close(self) -> None:
+        """Waits for in-flight flushes and publishes the remaining messages."""
+        self._cancel_timer()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> dict:
+        """Returns the buffer depth and flush counters since process start."""
+        return {
+            "depth": len(self._pending),
+            "in_flight_flushes": len(self._flush_tasks),
+            "published": self.published,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "avg_flush_latency": (
+                self._total_flush_latency / self.flushes if self.flushes else 0.0
+            ),
+        }
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_flush(self) -> None:
+        self._cancel_timer()
+        if not self._pending:
+            return
+        task = asyncio.get_running_loop().create_task(self.flush())
+        # Keep a reference so the task is not garbage-collected mid-flight.
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
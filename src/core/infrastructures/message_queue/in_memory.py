@@ -9,6 +9,10 @@ class InMemoryMessageQueue(AbstractMessageQueue):
     async def publish(self, message: dict):
         await self.queue.put(message)
 
+    async def publish_many(self, messages: list[dict]):
+        for message in messages:
+            self.queue.put_nowait(message)
+
     async def get_batch(self, batch_size: int) -> list[dict]:
         messages = []
         for _ in range(batch_size):
@@ -19,5 +23,8 @@ class InMemoryMessageQueue(AbstractMessageQueue):
                 break
         return messages
 
+    async def depth(self) -> int | None:
+        return self.queue.qsize()
+
     async def close(self):
         pass
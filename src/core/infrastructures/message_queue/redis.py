@@ -4,6 +4,9 @@ import redis.asyncio as redis
 
 from .abstract_message_queue import AbstractMessageQueue
 
+# Upper bound on values sent in one RPUSH, to keep single commands small.
+PUBLISH_CHUNK_SIZE = 1000
+
 
 class RedisMessageQueue(AbstractMessageQueue):
     def __init__(self, dsn: str, queue_name: str = "default_queue"):
@@ -13,11 +16,23 @@ class RedisMessageQueue(AbstractMessageQueue):
     async def publish(self, message: dict):
         await self.redis.rpush(self.queue_name, json.dumps(message))
 
+    async def publish_many(self, messages: list[dict]):
+        if not messages:
+            return
+        values = [json.dumps(message) for message in messages]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for start in range(0, len(values), PUBLISH_CHUNK_SIZE):
+                pipe.rpush(self.queue_name, *values[start : start + PUBLISH_CHUNK_SIZE])
+            await pipe.execute()
+
     async def get_batch(self, batch_size: int) -> list[dict]:
         messages = await self.redis.lpop(self.queue_name, count=batch_size)
         if not messages:
             return []
         return [json.loads(msg) for msg in messages]
 
+    async def depth(self) -> int | None:
+        return await self.redis.llen(self.queue_name)
+
     async def close(self):
         await self.redis.close()
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import socket
+import time
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from .abstract_message_queue import AbstractMessageQueue
+
+logger = logging.getLogger(__name__)
+
+# Key under which `get_batch` returns the stream entry id of a message.
+MESSAGE_ID_KEY = "_message_id"
+EXTEND_CHUNK_SIZE = 1000  # Entry ids per extend call
+
+# Resets the idle time of the given entries that are still pending for the
+# consumer, so that XAUTOCLAIM leaves them alone; entries another consumer
+# took over meanwhile are not taken back.
+EXTEND_SCRIPT = """
+for i = 3, #ARGV do
+    if #redis.call("XPENDING", KEYS[1], ARGV[1], ARGV[i], ARGV[i], 1, ARGV[2]) > 0
+    then
+        redis.call("XCLAIM", KEYS[1], ARGV[1], ARGV[2], 0, ARGV[i], "JUSTID")
+    end
+end
+"""
+
+
+class RedisStreamMessageQueue(AbstractMessageQueue):
+    """
+    A message queue on a Redis stream, read through a consumer group.
+
+    Messages handed out by `get_batch` stay pending until they are acked, so
+    a worker that dies mid-batch does not lose them: once they have been
+    pending for `claim_idle_ms`, another consumer takes them over with
+    XAUTOCLAIM. Consumers still working on a message after a while `extend`
+    it to keep it. Reads block for up to `block_ms` instead of polling.
+
+    A message delivered more than `max_deliveries` times, which keeps failing
+    however often it is retried, is moved to the `dead_letter_name` stream
+    and acked instead of being claimed again.
+
+    The stream is trimmed to roughly `max_len` entries on publish.
+    """
+
+    blocking_reads = True
+
+    def __init__(
+        self,
+        dsn: str,
+        stream_name: str = "visit_log_stream",
+        group_name: str = "log-workers",
+        consumer_name: str | None = None,
+        block_ms: int = 5000,
+        claim_idle_ms: int = 60_000,
+        max_len: int = 1_000_000,
+        max_deliveries: int = 5,
+        dead_letter_name: str | None = None,
+    ):
+        self.redis = redis.from_url(dsn, decode_responses=True)
+        self.stream_name = stream_name
+        self.group_name = group_name
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.redelivery_timeout = claim_idle_ms / 1000
+        self.max_len = max_len
+        self.max_deliveries = max_deliveries
+        self.dead_letter_name = dead_letter_name or f"{stream_name}:dead"
+        self._extend = self.redis.register_script(EXTEND_SCRIPT)
+        self._group_ready = False
+        self._claim_cursor = "0-0"
+        self._next_claim_at = 0.0
+
+    async def publish(self, message: dict):
+        await self.redis.xadd(
+            self.stream_name,
+            {"data": json.dumps(message)},
+            maxlen=self.max_len,
+            approximate=True,
+        )
+
+    async def publish_many(self, messages: list[dict]):
+        if not messages:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for message in messages:
+                pipe.xadd(
+                    self.stream_name,
+                    {"data": json.dumps(message)},
+                    maxlen=self.max_len,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+    async def get_batch(self, batch_size: int) -> list[dict]:
+        await self._ensure_group()
+        try:
+            entries = await self._claim_stale(batch_size)
+            if not entries:
+                response = await self.redis.xreadgroup(
+                    self.group_name,
+                    self.consumer_name,
+                    {self.stream_name: ">"},
+                    count=batch_size,
+                    block=self.block_ms,
+                )
+                entries = response[0][1] if response else []
+        except ResponseError as e:
+            if "NOGROUP" not in str(e):
+                raise
+            # The stream was deleted along with its group; recreate both.
+            self._group_ready = False
+            return []
+
+        return [self._decode(message_id, fields) for message_id, fields in entries]
+
+    async def ack(self, messages: list[dict]):
+        message_ids = [m[MESSAGE_ID_KEY] for m in messages if MESSAGE_ID_KEY in m]
+        if message_ids:
+            await self.redis.xack(self.stream_name, self.group_name, *message_ids)
+
+    async def extend(self, messages: list[dict]):
+        message_ids = [m[MESSAGE_ID_KEY] for m in messages if MESSAGE_ID_KEY in m]
+        for start in range(0, len(message_ids), EXTEND_CHUNK_SIZE):
+            await self._extend(
+                keys=[self.stream_name],
+                args=[
+                    self.group_name,
+                    self.consumer_name,
+                    *message_ids[start : start + EXTEND_CHUNK_SIZE],
+                ],
+            )
+
+    async def depth(self) -> int | None:
+        """Entries not yet read by the group plus those read but not acked."""
+        try:
+            groups = await self.redis.xinfo_groups(self.stream_name)
+        except ResponseError:
+            return 0  # The stream does not exist yet.
+        for group in groups:
+            if group["name"] == self.group_name:
+                lag = group.get("lag")
+                if lag is None:
+                    # Redis < 7 reports no lag, or it cannot be computed
+                    # after trimming; count every entry instead.
+                    return await self.redis.xlen(self.stream_name)
+                return lag + group["pending"]
+        return await self.redis.xlen(self.stream_name)
+
+    async def close(self):
+        await self.redis.aclose()
+
+    async def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(
+                self.stream_name, self.group_name, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def _claim_stale(self, batch_size: int) -> list:
+        """Takes over entries left pending by consumers that stopped acking."""
+        # Scan the pending list at most a few times per idle period, unless a
+        # previous scan stopped halfway through it.
+        if self._claim_cursor == "0-0":
+            if time.monotonic() < self._next_claim_at:
+                return []
+            self._next_claim_at = time.monotonic() + self.claim_idle_ms / 4000
+
+        next_cursor, entries, *deleted = await self.redis.xautoclaim(
+            self.stream_name,
+            self.group_name,
+            self.consumer_name,
+            min_idle_time=self.claim_idle_ms,
+            start_id=self._claim_cursor,
+            count=batch_size,
+        )
+        self._claim_cursor = next_cursor
+        if deleted and deleted[0]:
+            logger.warning(
+                f"{len(deleted[0])} pending messages were trimmed before being "
+                "processed."
+            )
+
+        claimed = [(message_id, fields) for message_id, fields in entries if fields]
+        if claimed:
+            logger.info(f"Claimed {len(claimed)} stale pending messages.")
+            claimed = await self._dead_letter_exhausted(claimed)
+        return claimed
+
+    async def _dead_letter_exhausted(self, entries: list) -> list:
+        """
+        Moves entries delivered more than `max_deliveries` times to the dead
+        letter stream and returns the others.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for message_id, _ in entries:
+                pipe.xpending_range(
+                    self.stream_name,
+                    self.group_name,
+                    min=message_id,
+                    max=message_id,
+                    count=1,
+                )
+            pending = await pipe.execute()
+        deliveries = {
+            found[0]["message_id"]: found[0]["times_delivered"]
+            for found in pending
+            if found
+        }
+        exhausted = [
+            (message_id, fields)
+            for message_id, fields in entries
+            if deliveries.get(message_id, 0) > self.max_deliveries
+        ]
+        if not exhausted:
+            return entries
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for message_id, fields in exhausted:
+                pipe.xadd(
+                    self.dead_letter_name,
+                    {
+                        **fields,
+                        "message_id": message_id,
+                        "deliveries": deliveries[message_id],
+                    },
+                    maxlen=self.max_len,
+                    approximate=True,
+                )
+            pipe.xack(
+                self.stream_name,
+                self.group_name,
+                *(message_id for message_id, _ in exhausted),
+            )
+            await pipe.execute()
+        logger.error(
+            f"Moved {len(exhausted)} messages delivered more than "
+            f"{self.max_deliveries} times to {self.dead_letter_name}."
+        )
+        dead = {message_id for message_id, _ in exhausted}
+        return [entry for entry in entries if entry[0] not in dead]
+
+    @staticmethod
+    def _decode(message_id: str, fields: dict) -> dict:
+        message = json.loads(fields["data"])
+        message[MESSAGE_ID_KEY] = message_id
+        return message
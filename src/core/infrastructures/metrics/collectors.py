@@ -0,0 +1,144 @@
+from dataclasses import asdict
+from typing import Sequence
+
+from src.core.infrastructures.cache.decorators import CACHE_STATS
+from src.core.infrastructures.database.database import Database
+from src.core.infrastructures.message_queue.abstract_message_queue import (
+    AbstractMessageQueue,
+)
+from src.core.infrastructures.message_queue.buffer import MessageBuffer
+
+from .registry import Collector, MetricFamily, Sample
+
+# `CacheStats` fields by the `result` label they are reported under.
+CACHE_RESULTS = {
+    "hits": "hit",
+    "negative_hits": "negative_hit",
+    "stale_hits": "stale_hit",
+    "misses": "miss",
+}
+CACHE_EVENTS = ("coalesced", "lock_waits", "stale_on_error", "refreshes")
+
+# `pool_stats` keys, as counters or gauges.
+POOL_COUNTERS = {
+    "checkouts": ("db_pool_checkouts", "Connections checked out of the pool."),
+    "timeouts": ("db_pool_timeouts", "Checkouts that gave up waiting."),
+    "checkout_wait_seconds": (
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled connection.",
+    ),
+}
+POOL_GAUGES = {
+    "in_use": ("db_pool_connections_in_use", "Connections checked out right now."),
+    "overflow": ("db_pool_overflow", "Connections open beyond the pool size."),
+    "max_checkout_wait": (
+        "db_pool_max_checkout_wait_seconds",
+        "Longest wait for a pooled connection.",
+    ),
+}
+
+
+def _counter(
+    name: str, help: str, values: list[tuple[dict[str, str], float]]
+) -> MetricFamily:
+    samples = [Sample(f"{name}_total", labels, value) for labels, value in values]
+    return MetricFamily(name, "counter", help, samples)
+
+
+def _gauge(
+    name: str, help: str, values: list[tuple[dict[str, str], float]]
+) -> MetricFamily:
+    samples = [Sample(name, labels, value) for labels, value in values]
+    return MetricFamily(name, "gauge", help, samples)
+
+
+def cache_collector() -> Collector:
+    """Reports the counters of every method wrapped by the `cache` decorator."""
+
+    async def collect() -> list[MetricFamily]:
+        results, events, errors = [], [], []
+        for cache, stats in CACHE_STATS.items():
+            values = asdict(stats)
+            for field, result in CACHE_RESULTS.items():
+                results.append(({"cache": cache, "result": result}, values[field]))
+            for event in CACHE_EVENTS:
+                events.append(({"cache": cache, "event": event}, values[event]))
+            errors.append(({"cache": cache}, values["storage_errors"]))
+        return [
+            _counter("cache_requests", "Cached method calls by outcome.", results),
+            _counter("cache_events", "Coalescing and refresh events.", events),
+            _counter("cache_errors", "Failed cache storage reads and writes.", errors),
+        ]
+
+    return collect
+
+
+def pool_collector(databases: Sequence[Database]) -> Collector:
+    """Reports the connection pools of every shard and their replicas."""
+
+    async def collect() -> list[MetricFamily]:
+        pools = []
+        for shard, database in enumerate(databases):
+            stats = database.pool_stats()
+            pools.append(({"shard": str(shard), "pool": "primary"}, stats["primary"]))
+            for name, replica_stats in stats["replicas"].items():
+                pools.append(({"shard": str(shard), "pool": name}, replica_stats))
+
+        return [
+            _counter(name, help, [(labels, s[key]) for labels, s in pools if key in s])
+            for key, (name, help) in POOL_COUNTERS.items()
+        ] + [
+            _gauge(name, help, [(labels, s[key]) for labels, s in pools if key in s])
+            for key, (name, help) in POOL_GAUGES.items()
+        ]
+
+    return collect
+
+
+def buffer_collector(buffer: MessageBuffer) -> Collector:
+    """Reports how many visits wait in the process's buffer and their fate."""
+
+    async def collect() -> list[MetricFamily]:
+        stats = buffer.stats()
+        return [
+            _gauge(
+                "visit_buffer_depth",
+                "Visits buffered in process, not yet published.",
+                [({}, stats["depth"])],
+            ),
+            _counter(
+                "visit_buffer_published",
+                "Visits published to the message queue.",
+                [({}, stats["published"])],
+            ),
+            _counter(
+                "visit_buffer_failed_flushes",
+                "Batches that could not be published and were put back.",
+                [({}, stats["failed_flushes"])],
+            ),
+            _counter(
+                "visit_buffer_dropped",
+                "Visits dropped because the buffer was full.",
+                [({}, stats["dropped"])],
+            ),
+        ]
+
+    return collect
+
+
+def queue_depth_collector(message_queue: AbstractMessageQueue) -> Collector:
+    """Reports the messages waiting in the queue, for registering as shared."""
+
+    async def collect() -> list[MetricFamily]:
+        depth = await message_queue.depth()
+        if depth is None:
+            return []
+        return [
+            _gauge(
+                "message_queue_depth",
+                "Messages in the queue that have not been processed yet.",
+                [({}, depth)],
+            )
+        ]
+
+    return collect
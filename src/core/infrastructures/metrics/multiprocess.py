@@ -0,0 +1,114 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+
+from .registry import MetricFamily, MetricsRegistry, Sample
+
+logger = logging.getLogger(__name__)
+
+
+class MultiprocessMetrics:
+    """
+    Shares metrics between the worker processes of one server, such as
+    gunicorn's, through `directory`: every process writes a snapshot of its
+    registry to `<pid>.json` every `interval` seconds, and a scrape of any
+    process adds up its own live values and the other processes' snapshots.
+
+    Counters and histograms of processes that exited stay in the sum, so
+    totals do not go backwards; `mark_process_dead` drops their gauges.
+    Other processes' values can be up to `interval` seconds old.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 5):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.interval = interval
+        self.pid = os.getpid()
+
+    @property
+    def _path(self) -> Path:
+        return self.directory / f"{self.pid}.json"
+
+    async def write_snapshot(self) -> None:
+        families = await self.registry.collect(include_shared=False)
+        data = json.dumps([_dump(family) for family in families])
+        # Written aside and renamed, so readers never see a partial file.
+        temporary = self._path.with_suffix(".tmp")
+        temporary.write_text(data)
+        os.replace(temporary, self._path)
+
+    async def run(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            try:
+                await self.write_snapshot()
+            except Exception as e:
+                logger.error(f"Failed to write a metrics snapshot: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def collect(self) -> list[MetricFamily]:
+        families = await self.registry.collect()
+        for path in self.directory.glob("*.json"):
+            if path == self._path:
+                continue
+            try:
+                families.extend(
+                    _load(family) for family in json.loads(path.read_text())
+                )
+            except (OSError, ValueError):
+                continue
+        return merge(families)
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """Drops the gauges of the exited process `pid`, for gunicorn's `child_exit`."""
+    path = Path(directory) / f"{pid}.json"
+    try:
+        families = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return
+    path.write_text(json.dumps([f for f in families if f["type"] != "gauge"]))
+
+
+def merge(families: list[MetricFamily]) -> list[MetricFamily]:
+    """Adds up the samples of families with the same name."""
+    merged: dict[str, tuple[MetricFamily, dict]] = {}
+    for family in families:
+        if family.name not in merged:
+            merged[family.name] = (family, {})
+        values = merged[family.name][1]
+        for sample in family.samples:
+            key = (sample.name, tuple(sample.labels.items()))
+            values[key] = values.get(key, 0) + sample.value
+    return [
+        MetricFamily(
+            family.name,
+            family.type,
+            family.help,
+            [
+                Sample(name, dict(labels), value)
+                for (name, labels), value in values.items()
+            ],
+        )
+        for family, values in merged.values()
+    ]
+
+
+def _dump(family: MetricFamily) -> dict:
+    return {
+        "name": family.name,
+        "type": family.type,
+        "help": family.help,
+        "samples": [list(sample) for sample in family.samples],
+    }
+
+
+def _load(data: dict) -> MetricFamily:
+    return MetricFamily(
+        data["name"],
+        data["type"],
+        data["help"],
+        [Sample(*sample) for sample in data["samples"]],
+    )
@@ -0,0 +1,224 @@
+import bisect
+import logging
+import math
+from typing import Awaitable, Callable, NamedTuple, Sequence
+
+# Seconds, from sub-millisecond cache hits to requests that time out.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Sample(NamedTuple):
+    name: str
+    labels: dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    type: str  # "counter", "gauge" or "histogram"
+    help: str
+    samples: list[Sample]
+
+
+Collector = Callable[[], Awaitable[list[MetricFamily]]]
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def collect(self) -> MetricFamily:
+        return MetricFamily(self.name, self.type, self.help, list(self._samples()))
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        for labels, value in self._values.items():
+            yield Sample(f"{self.name}_total", self._labels(labels), value)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def _samples(self):
+        for labels, value in self._values.items():
+            yield Sample(self.name, self._labels(labels), value)
+
+
+class Histogram(_Metric):
+    """
+    Counts observations per bucket. Only the bucket an observation falls in
+    is incremented; counts are made cumulative when collected.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: a count for each bucket and +Inf, then the sum.
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _samples(self):
+        for labels, counts in self._values.items():
+            label_dict = self._labels(labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield Sample(
+                    f"{self.name}_bucket",
+                    {**label_dict, "le": _format_value(bound)},
+                    cumulative,
+                )
+            yield Sample(f"{self.name}_count", label_dict, cumulative)
+            yield Sample(f"{self.name}_sum", label_dict, counts[-1])
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of this process and collectors that read values kept
+    elsewhere (pools, caches, queues) when scraped.
+
+    Collectors registered as `shared` report state that every process sees
+    alike, such as the queue depth, so they are left out of multiprocess
+    snapshots and only read by the process answering the scrape.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[tuple[Collector, bool]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Collector, shared: bool = False) -> None:
+        self._collectors.append((collector, shared))
+
+    def unregister_collector(self, collector: Collector) -> None:
+        self._collectors = [
+            (registered, shared)
+            for registered, shared in self._collectors
+            if registered is not collector
+        ]
+
+    async def collect(self, include_shared: bool = True) -> list[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector, shared in self._collectors:
+            if shared and not include_shared:
+                continue
+            try:
+                families.extend(await collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return families
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n")
+
+
+def _escape(value: str) -> str:
+    return _escape_help(value).replace('"', r"\"")
+
+
+def render(families: list[MetricFamily]) -> str:
+    """Formats `families` in the Prometheus text exposition format."""
+    lines = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for sample in family.samples:
+            labels = ",".join(
+                f'{name}="{_escape(str(value))}"'
+                for name, value in sample.labels.items()
+            )
+            labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{sample.name}{labels} {_format_value(sample.value)}")
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metrics of this process.
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from .registry import CONTENT_TYPE, MetricFamily, render
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 5  # In seconds
+
+
+async def start_metrics_server(
+    collect: Callable[[], Awaitable[list[MetricFamily]]],
+    host: str = "0.0.0.0",
+    port: int = 9100,
+) -> asyncio.Server:
+    """
+    Serves `GET /metrics` over plain HTTP/1.0 for processes without a web
+    framework, such as the log worker. Every other request gets a 404.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT
+            )
+            method, path, *_ = request.split(b" ", 2)
+            if method == b"GET" and path.split(b"?")[0] == b"/metrics":
+                status, content_type = "200 OK", CONTENT_TYPE
+                body = render(await collect()).encode()
+            else:
+                status, content_type = "404 Not Found", "text/plain"
+                body = b"Not Found\n"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except Exception as e:
+            logger.error(f"Failed to serve metrics: {e}", exc_info=True)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on {host}:{port}/metrics.")
+    return server
@@ -0,0 +1,282 @@
+import asyncio
+import inspect
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Optional
+
+from .exporters import SpanExporter, SpanRecord
+
+logger = logging.getLogger(__name__)
+
+# Spans of this category mark the route handler, see `Trace.handler`.
+HANDLER = "handler"
+
+
+class Trace:
+    """
+    The spans of one request. Every trace sums the time spent per span
+    category for the Server-Timing header; only sampled traces keep the
+    spans themselves, to be exported.
+    """
+
+    def __init__(self, sampled: bool):
+        self.sampled = sampled
+        self.trace_id = f"{random.getrandbits(128):032x}" if sampled else ""
+        self.root_span_id = f"{random.getrandbits(64):016x}" if sampled else None
+        self.started = time.perf_counter()
+        self.start_time_ns = time.time_ns()
+        self.phases: dict[str, float] = {}
+        self.spans: list[SpanRecord] = []
+        # Start and end of the first handler span, to tell apart the time
+        # before (routing, dependency injection) and after (serialization).
+        self.handler: Optional[tuple[float, float]] = None
+
+    def time_ns(self, perf_counter: float) -> int:
+        return self.start_time_ns + int((perf_counter - self.started) * 1e9)
+
+    def server_timing(self, now: float) -> str:
+        """Formats the time per phase until `now` as a Server-Timing header."""
+        phases = dict(self.phases)
+        if self.handler is not None:
+            handler_started, handler_ended = self.handler
+            phases["di"] = handler_started - self.started
+            phases["serialize"] = now - handler_ended
+        phases["total"] = now - self.started
+        metrics = [
+            f"{name};dur={seconds * 1000:.3f}" for name, seconds in phases.items()
+        ]
+        if self.sampled:
+            metrics.append(f'trace;desc="{self.trace_id}"')
+        return ", ".join(metrics)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+# Id and category of the innermost open span.
+_current_span: ContextVar[Optional[tuple[Optional[str], str]]] = ContextVar(
+    "span", default=None
+)
+
+
+class _Span:
+    __slots__ = (
+        "trace",
+        "name",
+        "category",
+        "attributes",
+        "span_id",
+        "parent",
+        "started",
+        "_token",
+    )
+
+    def __init__(self, trace: Trace, name: str, category: str, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "_Span":
+        self.parent = _current_span.get()
+        self.span_id = f"{random.getrandbits(64):016x}" if self.trace.sampled else None
+        self._token = _current_span.set((self.span_id, self.category))
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ended = time.perf_counter()
+        _current_span.reset(self._token)
+        trace = self.trace
+        # Nested spans of the same category, such as a two-tier cache
+        # calling its tiers, are only counted once.
+        if self.parent is None or self.parent[1] != self.category:
+            duration = ended - self.started
+            trace.phases[self.category] = trace.phases.get(self.category, 0) + duration
+        if self.category == HANDLER and trace.handler is None:
+            trace.handler = (self.started, ended)
+        if trace.sampled:
+            if exc_type is not None:
+                self.attributes["error"] = exc_type.__name__
+            trace.spans.append(
+                SpanRecord(
+                    trace.trace_id,
+                    self.span_id,
+                    self.parent[0] if self.parent else trace.root_span_id,
+                    self.name,
+                    trace.time_ns(self.started),
+                    trace.time_ns(ended),
+                    self.attributes,
+                )
+            )
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, category: Optional[str] = None, **attributes: Any):
+    """
+    Times a block as a span of the current request's trace. The category,
+    by default the part of `name` before the first dot, is the phase it is
+    reported under in Server-Timing. Outside a trace this does nothing.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name, category or name.split(".", 1)[0], attributes)
+
+
+def traced(category: str, name: Optional[str] = None):
+    """Wraps a coroutine function in a span, named after it by default."""
+
+    def decorator(func):
+        span_name = name or f"{category}.{func.__name__}"
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            with _Span(trace, span_name, category, {}):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(category: str):
+    """
+    Class decorator that wraps every public coroutine method the class
+    defines in a span named `<category>.<runtime class>.<method>`.
+    """
+
+    def decorator(cls):
+        for attribute, method in list(vars(cls).items()):
+            if attribute.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, attribute, _traced_method(category, attribute, method))
+        return cls
+
+    return decorator
+
+
+def _traced_method(category: str, attribute: str, method):
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        trace = _current_trace.get()
+        if trace is None:
+            return await method(self, *args, **kwargs)
+        name = f"{category}.{type(self).__name__}.{attribute}"
+        with _Span(trace, name, category, {}):
+            return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Tracer:
+    """
+    Starts request traces, sampling `sample_rate` of them, and hands the
+    spans of sampled traces to `exporter` in batches, from a worker thread.
+    With `server_timing`, unsampled requests are traced too, without
+    keeping their spans, so that every response can carry Server-Timing.
+    Spans beyond `max_pending` waiting for export are dropped.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        sample_rate: float = 0.0,
+        server_timing: bool = False,
+        export_interval: float = 1.0,
+        max_pending: int = 10_000,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.server_timing = server_timing
+        self.export_interval = export_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: list[SpanRecord] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._export_tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.server_timing
+
+    def start_trace(self) -> Optional[Trace]:
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and not self.server_timing:
+            return None
+        return Trace(sampled)
+
+    def activate(self, trace: Optional[Trace]):
+        """Makes `trace` current; pass the returned token to `deactivate`."""
+        return _current_trace.set(trace)
+
+    def deactivate(self, token) -> None:
+        _current_trace.reset(token)
+
+    def finish(self, trace: Trace, name: str, **attributes: Any) -> None:
+        """Ends `trace` with a root span called `name` and queues its spans."""
+        if not trace.sampled:
+            return
+        trace.spans.append(
+            SpanRecord(
+                trace.trace_id,
+                trace.root_span_id,
+                None,
+                name,
+                trace.start_time_ns,
+                trace.time_ns(time.perf_counter()),
+                attributes,
+            )
+        )
+        room = self.max_pending - len(self._pending)
+        self.dropped += max(len(trace.spans) - room, 0)
+        self._pending.extend(trace.spans[: max(room, 0)])
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.export_interval, self._schedule_export
+            )
+
+    async def export(self) -> None:
+        """Exports every pending span."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self.exporter.export, batch)
+        except Exception as e:
+            logger.error(f"Failed to export {len(batch)} spans: {e}", exc_info=True)
+
+    async def close(self) -> None:
+        if self._export_tasks:
+            await asyncio.gather(*self._export_tasks, return_exceptions=True)
+        await self.export()
+        self.exporter.shutdown()
+
+    def _schedule_export(self) -> None:
+        self._timer = None
+        task = asyncio.get_running_loop().create_task(self.export())
+        self._export_tasks.add(task)
+        task.add_done_callback(self._export_tasks.discard)
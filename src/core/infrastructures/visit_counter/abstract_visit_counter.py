@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class AbstractVisitCounter(ABC):
+    """
+    An abstract base class for per-url visit counters kept outside the
+    database.
+
+    A url's visit count is its last known database value (the base) plus
+    the visits counted since then that have not been written back yet. A
+    background job moves those visits into `url.visit_count` with
+    `take_pending`, then `renew_flush` and `complete_flush` for every
+    written-back chunk of them, then `end_flush`.
+    """
+
+    # Whether visits are counted here; if not, the database is authoritative.
+    enabled = True
+    # Identifies the visits returned by the last `take_pending`, the same for
+    # every retry of a flush until all of them are completed.
+    flush_id: Optional[str] = None
+
+    @abstractmethod
+    def incr(self, url_id: int) -> None:
+        """Counts one visit of `url_id`. Must not block."""
+        pass
+
+    @abstractmethod
+    async def get(self, url_id: int) -> tuple[Optional[int], int]:
+        """Returns the base of `url_id`, if known, and its unflushed visits."""
+        pass
+
+    @abstractmethod
+    async def set_base(self, url_id: int, visit_count: int) -> None:
+        """Records a database value of `url_id` unless a base is already known."""
+        pass
+
+    @abstractmethod
+    async def take_pending(self) -> dict[int, int]:
+        """Returns the visits to write back, continuing an unfinished flush."""
+        pass
+
+    @abstractmethod
+    async def complete_flush(
+        self, url_ids: list[int], visit_counts: dict[int, int]
+    ) -> None:
+        """
+        Forgets the written-back visits of `url_ids` and records
+        `visit_counts`, their new database values, as the bases.
+        """
+        pass
+
+    async def renew_flush(self) -> bool:
+        """Extends the flush for another chunk; False if it was taken over."""
+        return True
+
+    async def end_flush(self) -> None:
+        """Ends a flush; visits not completed are taken by the next one."""
+        pass
+
+    async def close(self) -> None:
+        """Publishes any visits still held locally."""
+        pass
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from typing import Optional
+
+import redis.asyncio as redis
+
+from .abstract_visit_counter import AbstractVisitCounter
+
+logger = logging.getLogger(__name__)
+
+FLUSH_LOCK_LEASE = 30  # In seconds
+
+# Moves the pending visits aside for writing back under a new flush id,
+# unless an earlier flush never completed, in which case its visits are
+# returned again with its id. The id comes first in the reply.
+TAKE_PENDING_SCRIPT = """
+if redis.call("EXISTS", KEYS[2]) == 0 then
+    if redis.call("EXISTS", KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call("RENAME", KEYS[1], KEYS[2])
+    redis.call("SET", KEYS[3], ARGV[1])
+end
+local flush_id = redis.call("GET", KEYS[3])
+if not flush_id then
+    flush_id = ARGV[1]
+    redis.call("SET", KEYS[3], flush_id)
+end
+local fields = redis.call("HGETALL", KEYS[2])
+table.insert(fields, 1, flush_id)
+return fields
+"""
+
+# Forgets the flushed visits of a chunk of urls and stores their written-back
+# counts as bases, in one step so that readers never count them twice or not
+# at all. Urls that no longer exist come with an empty count. Also renews the
+# flush lock, if still held, for the next chunk.
+COMPLETE_FLUSH_SCRIPT = """
+for i = 3, #ARGV, 2 do
+    redis.call("HDEL", KEYS[2], ARGV[i])
+    if ARGV[i + 1] ~= "" then
+        redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+if redis.call("GET", KEYS[3]) == ARGV[1] then
+    redis.call("EXPIRE", KEYS[3], ARGV[2])
+end
+"""
+
+# Extends the lock only if it is still held by the caller's token.
+RENEW_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Deletes the lock only if it is still held by the caller's token.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisVisitCounter(AbstractVisitCounter):
+    """
+    Visit counters in three Redis hashes keyed by url id: `base` holds the
+    last written-back database value, `pending` the visits counted since and
+    `flushing` the visits that are being written back right now.
+
+    Visits are summed in process and sent with one HINCRBY per url every
+    `sync_interval` seconds, so redirects never wait on Redis. Only one
+    flusher at a time can take the pending visits, under a lock whose lease
+    is renewed for every chunk. They are written back in chunks, each
+    forgotten once committed, so a failed flush only leaves the rest for the
+    next one. Every flush has an id, kept until all of its visits are
+    completed, which the database records along with the counts; if the
+    flusher dies after a commit but before `complete_flush`, the next flush
+    skips the urls already written back under that id.
+    """
+
+    def __init__(
+        self, dsn: str, key_prefix: str = "visit_counts", sync_interval: float = 0.1
+    ):
+        self._redis = redis.from_url(dsn, decode_responses=True)
+        # The hash tag keeps all keys in one cluster slot for the scripts.
+        self._base_key = f"{{{key_prefix}}}:base"
+        self._pending_key = f"{{{key_prefix}}}:pending"
+        self._flushing_key = f"{{{key_prefix}}}:flushing"
+        self._lock_key = f"{{{key_prefix}}}:flush-lock"
+        self._flush_id_key = f"{{{key_prefix}}}:flush-id"
+        self._take_pending = self._redis.register_script(TAKE_PENDING_SCRIPT)
+        self._complete_flush = self._redis.register_script(COMPLETE_FLUSH_SCRIPT)
+        self._renew_lock = self._redis.register_script(RENEW_LOCK_SCRIPT)
+        self._release_lock = self._redis.register_script(RELEASE_LOCK_SCRIPT)
+        self._sync_interval = sync_interval
+        self._local: Counter[int] = Counter()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sync_tasks: set[asyncio.Task] = set()
+        self._lock_token: Optional[str] = None
+
+    def incr(self, url_id: int) -> None:
+        self._local[url_id] += 1
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self._sync_interval, self._schedule_sync
+            )
+
+    async def get(self, url_id: int) -> tuple[Optional[int], int]:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hget(self._base_key, url_id)
+            pipe.hget(self._pending_key, url_id)
+            pipe.hget(self._flushing_key, url_id)
+            base, pending, flushing = await pipe.execute()
+        delta = int(pending or 0) + int(flushing or 0) + self._local[url_id]
+        return (int(base) if base is not None else None), delta
+
+    async def set_base(self, url_id: int, visit_count: int) -> None:
+        await self._redis.hsetnx(self._base_key, url_id, visit_count)
+
+    async def take_pending(self) -> dict[int, int]:
+        token = uuid.uuid4().hex
+        if not await self._redis.set(
+            self._lock_key, token, nx=True, ex=FLUSH_LOCK_LEASE
+        ):
+            return {}
+        self._lock_token = token
+
+        fields = await self._take_pending(
+            keys=[self._pending_key, self._flushing_key, self._flush_id_key],
+            args=[str(uuid.uuid4())],
+        )
+        if not fields:
+            await self.end_flush()
+            return {}
+        self.flush_id, *fields = fields
+        return {int(k): int(v) for k, v in zip(fields[::2], fields[1::2])}
+
+    async def renew_flush(self) -> bool:
+        if not self._lock_token:
+            return False
+        return bool(
+            await self._renew_lock(
+                keys=[self._lock_key], args=[self._lock_token, FLUSH_LOCK_LEASE]
+            )
+        )
+
+    async def complete_flush(
+        self, url_ids: list[int], visit_counts: dict[int, int]
+    ) -> None:
+        args = [self._lock_token or "", FLUSH_LOCK_LEASE]
+        for url_id in url_ids:
+            args += [url_id, visit_counts.get(url_id, "")]
+        await self._complete_flush(
+            keys=[self._base_key, self._flushing_key, self._lock_key], args=args
+        )
+
+    async def end_flush(self) -> None:
+        """Lets another flusher take over, keeping the visits not yet flushed."""
+        if self._lock_token:
+            await self._release_lock(keys=[self._lock_key], args=[self._lock_token])
+            self._lock_token = None
+        self.flush_id = None
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._sync_tasks:
+            await asyncio.gather(*self._sync_tasks, return_exceptions=True)
+        await self._sync()
+        await self._redis.aclose()
+
+    def _schedule_sync(self) -> None:
+        self._timer = None
+        task = asyncio.get_running_loop().create_task(self._sync())
+        # Keep a reference so the task is not garbage-collected mid-flight.
+        self._sync_tasks.add(task)
+        task.add_done_callback(self._sync_tasks.discard)
+
+    async def _sync(self) -> None:
+        counts, self._local = self._local, Counter()
+        if not counts:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for url_id, count in counts.items():
+                    pipe.hincrby(self._pending_key, url_id, count)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to sync {sum(counts.values())} visit counts: {e}")
+            self._local.update(counts)
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self._sync_interval, self._schedule_sync
+                )
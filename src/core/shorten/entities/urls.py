@@ -2,7 +2,9 @@ from typing import List, Optional
 from datetime import datetime
 from sqlmodel import Field, Relationship, SQLModel, Column, DateTime
 from sqlalchemy.sql import func
-from sqlalchemy import BigInteger
+from sqlalchemy import BigInteger, LargeBinary, Uuid
+
+from src.core.shorten.utils.url_digest import DIGEST_SIZE
 
 
 class URL(SQLModel, table=True):
@@ -10,9 +12,24 @@ class URL(SQLModel, table=True):
         default=None,
         sa_column=Column(BigInteger, autoincrement=True, primary_key=True),
     )
-    original_url: str = Field(index=True)
+    original_url: str
+    # Set by `UrlRepository` on the one url that later shortens of the same
+    # original url return; every other url leaves it empty.
+    original_url_hash: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(
+            LargeBinary(DIGEST_SIZE),
+            unique=True,
+            index=True,
+        ),
+    )
     short_code: Optional[str] = Field(default=None, unique=True, index=True)
     visit_count: int = Field(default=0)
+    # The visit counter flush that last incremented visit_count; see
+    # VisitCounterFlusher.
+    visit_count_flush_id: Optional[str] = Field(
+        default=None, sa_column=Column(Uuid(as_uuid=False))
+    )
     created_at: Optional[datetime] = Field(
         default=None,
         sa_column=Column(DateTime(timezone=True), server_default=func.now()),
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, ForeignKey
+from sqlmodel import Column, DateTime, Field, SQLModel, String
+
+
+class VisitRollup(SQLModel, table=True):
+    """Number of visits of a url per hour or per day."""
+
+    __tablename__ = "visit_rollup"
+
+    url_id: int = Field(
+        sa_column=Column(BigInteger, ForeignKey("url.id"), primary_key=True)
+    )
+    bucket: str = Field(sa_column=Column(String(8), primary_key=True))
+    bucket_start: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), primary_key=True)
+    )
+    visits: int = Field(default=0)
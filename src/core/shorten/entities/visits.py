@@ -2,10 +2,16 @@ from typing import Optional
 from datetime import datetime
 from sqlmodel import Field, Relationship, SQLModel, Column, DateTime
 from sqlalchemy.sql import func
-from sqlalchemy import BigInteger
+from sqlalchemy import DDL, BigInteger, Index, event
 
 
 class Visit(SQLModel, table=True):
+    # Range partitioned by month; see src/maintenance/partitions.py.
+    __table_args__ = (
+        Index("ix_visit_url_id_visited_at", "url_id", "visited_at"),
+        {"postgresql_partition_by": "RANGE (visited_at)"},
+    )
+
     id: Optional[int] = Field(
         default=None,
         sa_column=Column(BigInteger, autoincrement=True, primary_key=True),
@@ -16,7 +22,19 @@ class Visit(SQLModel, table=True):
 
     visited_at: Optional[datetime] = Field(
         default=None,
-        sa_column=Column(DateTime(timezone=True), server_default=func.now()),
+        sa_column=Column(
+            DateTime(timezone=True),
+            server_default=func.now(),
+            primary_key=True,
+        ),
     )
 
     url: Optional["URL"] = Relationship(back_populates="visits")
+
+
+# Catches rows outside every monthly partition, so that inserts never fail.
+event.listen(
+    Visit.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS visit_default PARTITION OF visit DEFAULT"),
+)
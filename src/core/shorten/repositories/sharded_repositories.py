@@ -0,0 +1,183 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Tuple
+
+from src.core.infrastructures.database.shards import ShardRouter, ShardSessions
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visit_rollup_repository import (
+    RollupKey,
+    VisitRollupRepository,
+)
+from src.core.shorten.repositories.visits_repository import VisitsRepository
+from src.core.shorten.utils.url_digest import url_digest
+
+
+class ShardedUrlRepository:
+    """
+    Routes the methods of `UrlRepository` that the services use to one
+    repository per shard. Urls live on the shard of their id; ids come from
+    the sequence of shard 0. Urls are only created through `insert` and
+    `bulk_insert`; the single-session CRUD methods of `BaseRepository` are
+    not offered.
+    """
+
+    def __init__(self, repositories: List[UrlRepository], router: ShardRouter):
+        self.repositories = repositories
+        self.router = router
+        self.session = ShardSessions([repo.session for repo in repositories])
+
+    def _for_id(self, url_id: int) -> UrlRepository:
+        return self.repositories[self.router.shard_for_id(url_id)]
+
+    def _for_key(self, key: str | bytes | int) -> UrlRepository:
+        return self.repositories[self.router.shard_for_key(key)]
+
+    async def get_by_short_code(
+        self, short_code: str, url_id: int | None = None
+    ) -> URL | None:
+        # Codes that decode to an id live on the shard of that id, whether
+        # generated or custom; other custom codes on the shard of the code.
+        if url_id is not None:
+            return await self._for_id(url_id).get_by_short_code(short_code, url_id)
+        return await self._for_key(short_code).get_by_short_code(short_code)
+
+    async def get(self, _id: int) -> URL | None:
+        return await self._for_id(_id).get(_id)
+
+    async def get_with_visits_by_short_code(
+        self, short_code: str, url_id: int | None = None
+    ) -> URL | None:
+        if url_id is not None:
+            repository = self._for_id(url_id)
+        else:
+            repository = self._for_key(short_code)
+        return await repository.get_with_visits_by_short_code(short_code)
+
+    async def get_by_original_url(self, original_url: str) -> URL | None:
+        repository = self._for_key(url_digest(original_url))
+        return await repository.get_by_original_url(original_url)
+
+    async def get_short_codes_by_original_urls(
+        self, original_urls: List[str]
+    ) -> Dict[str, str]:
+        groups: Dict[int, List[str]] = {}
+        for original_url in original_urls:
+            shard = self.router.shard_for_key(url_digest(original_url))
+            groups.setdefault(shard, []).append(original_url)
+        short_codes: Dict[str, str] = {}
+        for found in await asyncio.gather(
+            *(
+                self.repositories[shard].get_short_codes_by_original_urls(urls)
+                for shard, urls in groups.items()
+            )
+        ):
+            short_codes.update(found)
+        return short_codes
+
+    async def get_one_or_none(self, **filter_by) -> URL | None:
+        for repository in self.repositories:
+            if url := await repository.get_one_or_none(**filter_by):
+                return url
+        return None
+
+    async def get_by_short_codes(self, short_codes: List[str]) -> List[URL]:
+        urls = []
+        for repository in self.repositories:
+            urls.extend(await repository.get_by_short_codes(short_codes))
+        return urls
+
+    async def iter_short_codes(
+        self, batch_size: int = 10_000
+    ) -> AsyncIterator[List[str]]:
+        for repository in self.repositories:
+            async for batch in repository.iter_short_codes(batch_size):
+                yield batch
+
+    async def reserve_ids(self, count: int) -> List[int]:
+        return await self.repositories[0].reserve_ids(count)
+
+    async def insert(
+        self,
+        original_url: str,
+        short_code: str,
+        url_id: int | None = None,
+        deduplicate: bool = False,
+    ) -> URL | None:
+        if url_id is None:
+            raise ValueError("Sharded urls need an id to be placed by")
+        return await self._for_id(url_id).insert(
+            original_url, short_code, url_id=url_id, deduplicate=deduplicate
+        )
+
+    async def bulk_insert(
+        self, ids: List[int], original_urls: List[str], short_codes: List[str]
+    ) -> List[int]:
+        inserted = []
+        groups = self.router.group_by_id(
+            zip(ids, original_urls, short_codes), lambda row: row[0]
+        )
+        for shard, rows in groups.items():
+            url_ids, urls, codes = map(list, zip(*rows))
+            inserted.extend(
+                await self.repositories[shard].bulk_insert(url_ids, urls, codes)
+            )
+        return inserted
+
+    async def lock_for_update(self, ids: List[int]) -> None:
+        for shard, url_ids in sorted(self.router.group_by_id(ids, int).items()):
+            await self.repositories[shard].lock_for_update(url_ids)
+
+    async def bulk_increment_visit_counts(
+        self, counts: Dict[int, int], flush_id: str | None = None
+    ) -> Dict[int, int]:
+        visit_counts = {}
+        for shard, url_ids in sorted(self.router.group_by_id(counts, int).items()):
+            visit_counts.update(
+                await self.repositories[shard].bulk_increment_visit_counts(
+                    {url_id: counts[url_id] for url_id in url_ids}, flush_id
+                )
+            )
+        return visit_counts
+
+
+class ShardedVisitsRepository:
+    """Routes `VisitsRepository` writes and counts to the shard of the url."""
+
+    def __init__(self, repositories: List[VisitsRepository], router: ShardRouter):
+        self.repositories = repositories
+        self.router = router
+        self.session = ShardSessions([repo.session for repo in repositories])
+
+    async def count_by_url_id(
+        self,
+        url_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> int:
+        shard = self.router.shard_for_id(url_id)
+        return await self.repositories[shard].count_by_url_id(url_id, start, end)
+
+    async def bulk_insert(self, visits: list[tuple[int, str | None, datetime]]) -> None:
+        for shard, rows in self.router.group_by_id(visits, lambda row: row[0]).items():
+            await self.repositories[shard].bulk_insert(rows)
+
+
+class ShardedVisitRollupRepository:
+    """Routes `VisitRollupRepository` to the shard of the url of the rollups."""
+
+    def __init__(self, repositories: List[VisitRollupRepository], router: ShardRouter):
+        self.repositories = repositories
+        self.router = router
+        self.session = ShardSessions([repo.session for repo in repositories])
+
+    async def bulk_add_visits(self, counts: Dict[RollupKey, int]) -> None:
+        groups = self.router.group_by_id(counts.items(), lambda item: item[0][0])
+        for shard, items in sorted(groups.items()):
+            await self.repositories[shard].bulk_add_visits(dict(items))
+
+    async def get_series(
+        self, url_id: int, bucket: str, start: datetime, end: datetime
+    ) -> List[Tuple[datetime, int]]:
+        shard = self.router.shard_for_id(url_id)
+        return await self.repositories[shard].get_series(url_id, bucket, start, end)
@@ -1,23 +1,185 @@
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Type
 
-from sqlalchemy import case, select, update
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    LargeBinary,
+    Select,
+    String,
+    any_,
+    bindparam,
+    func,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from src.core.common.base_repository import BaseRepository
+from src.core.infrastructures.database.replicas import ReplicaSet
+from src.core.infrastructures.tracing.tracer import trace_methods
 from src.core.shorten.entities.urls import URL
+from src.core.shorten.utils.url_digest import url_digest
 
 
+@trace_methods("db")
 class UrlRepository(BaseRepository[URL]):
-    async def get_by_short_code(self, short_code: str) -> URL | None:
-        return await self.get_one_or_none(short_code=short_code)
+    """
+    With `replicas`, point lookups by short code are read from a replica and
+    from the primary, through `session`, if no replica can answer. With
+    `read_your_writes`, lookups that find nothing on a replica are retried
+    on the primary too, as the url may be too new to have been replicated.
+    """
+
+    def __init__(
+        self,
+        model: Type[URL],
+        session: AsyncSession,
+        replicas: ReplicaSet | None = None,
+        read_your_writes: bool = True,
+    ):
+        super().__init__(model, session)
+        self.replicas = replicas
+        self.read_your_writes = read_your_writes
+
+    async def _read_all(self, statement: Select, expected: int) -> List[URL]:
+        if self.replicas:
+            result = await self.replicas.execute(statement)
+            if result is not None:
+                urls = result.scalars().all()
+                if len(urls) >= expected or not self.read_your_writes:
+                    return urls
+        return (await self.session.execute(statement)).scalars().all()
+
+    async def get_by_short_code(
+        self, short_code: str, url_id: int | None = None
+    ) -> URL | None:
+        """
+        Returns the url with `short_code`. Given `url_id`, the id the code
+        decodes to, it is looked up by primary key first and by the short
+        code index only if that misses, as for custom codes. Both lookups
+        are one statement, in which the second only runs if the first
+        finds nothing.
+        """
+        if url_id is None:
+            return await self.get_one_or_none(short_code=short_code)
+        by_id = select(self.model).where(
+            self.model.id == url_id, self.model.short_code == short_code
+        )
+        by_short_code = select(self.model).where(self.model.short_code == short_code)
+        statement = select(self.model).from_statement(
+            union_all(by_id, by_short_code).limit(1)
+        )
+        urls = await self._read_all(statement, expected=1)
+        return urls[0] if urls else None
 
     async def get_by_original_url(self, original_url: str) -> URL | None:
-        return await self.get_one_or_none(original_url=original_url)
+        """
+        Returns the url that shortens of `original_url` resolve to. Always
+        read from the primary, as shortening decides whether to insert on it.
+        """
+        statement = select(self.model).filter_by(
+            original_url_hash=url_digest(original_url), original_url=original_url
+        )
+        result = await self.session.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def get_short_codes_by_original_urls(
+        self, original_urls: List[str]
+    ) -> Dict[str, str]:
+        """
+        Maps every given url that was shortened before to its short code, in
+        one query. The digests are bound as a single array, so there is no
+        limit on how many urls can be looked up at once.
+        """
+        if not original_urls:
+            return {}
+        digests = [url_digest(original_url) for original_url in original_urls]
+        statement = select(self.model.original_url, self.model.short_code).where(
+            self.model.original_url_hash
+            == any_(bindparam("digests", digests, ARRAY(LargeBinary)))
+        )
+        result = await self.session.execute(statement)
+        return dict(result.tuples().all())
+
+    async def reserve_ids(self, count: int) -> List[int]:
+        """Takes `count` ids from the url id sequence in one round-trip."""
+        result = await self.session.execute(
+            select(func.nextval(func.pg_get_serial_sequence("url", "id"))).select_from(
+                func.generate_series(1, count)
+            )
+        )
+        return list(result.scalars())
+
+    async def insert(
+        self,
+        original_url: str,
+        short_code: str,
+        url_id: int | None = None,
+        deduplicate: bool = False,
+    ) -> URL | None:
+        """
+        Inserts and commits a url in one statement. With `deduplicate`, the
+        url becomes the one later shortens of `original_url` return. Returns
+        None, without inserting, if the short code is already taken or, with
+        `deduplicate`, `original_url` has such a url already.
+        """
+        row = {
+            "original_url": original_url,
+            "original_url_hash": url_digest(original_url) if deduplicate else None,
+            "short_code": short_code,
+        }
+        if url_id is not None:
+            row["id"] = url_id
+        result = await self.session.execute(
+            pg_insert(self.model)
+            .values(**row)
+            .on_conflict_do_nothing()
+            .returning(self.model)
+        )
+        url = result.scalar_one_or_none()
+        await self.session.commit()
+        return url
+
+    async def bulk_insert(
+        self, ids: List[int], original_urls: List[str], short_codes: List[str]
+    ) -> List[int]:
+        """
+        Inserts one deduplicated url per given id in a single statement,
+        binding the columns as arrays so that there is no limit on the number
+        of urls. Urls whose short code is already taken, or whose original url
+        was shortened concurrently, are skipped; returns the ids that were
+        inserted. The caller commits.
+        """
+        if not ids:
+            return []
+        digests = [url_digest(original_url) for original_url in original_urls]
+        rows = select(
+            func.unnest(bindparam("ids", ids, ARRAY(BigInteger))),
+            func.unnest(bindparam("original_urls", original_urls, ARRAY(String))),
+            func.unnest(bindparam("digests", digests, ARRAY(LargeBinary))),
+            func.unnest(bindparam("short_codes", short_codes, ARRAY(String))),
+        )
+        result = await self.session.execute(
+            pg_insert(self.model)
+            .from_select(
+                ["id", "original_url", "original_url_hash", "short_code"], rows
+            )
+            .on_conflict_do_nothing()
+            .returning(self.model.id)
+        )
+        return list(result.scalars())
 
     async def get_one_or_none(self, **filter_by) -> URL | None:
         statement = select(self.model).filter_by(**filter_by)
-        result = await self.session.execute(statement)
-        return result.scalar_one_or_none()
+        urls = await self._read_all(statement, expected=1)
+        if len(urls) > 1:
+            raise MultipleResultsFound("Multiple urls match the filter")
+        return urls[0] if urls else None
 
     async def get_with_visits_by_short_code(self, short_code: str) -> URL | None:
         query = (
@@ -26,7 +188,7 @@ class UrlRepository(BaseRepository[URL]):
             .filter_by(short_code=short_code)
         )
         result = await self.session.execute(query)
-        return result.scalars().one_or_none()
+        return result.unique().scalars().one_or_none()
 
     async def increment_visit_count(self, short_code: str) -> None:
         query = (
@@ -40,26 +202,76 @@ class UrlRepository(BaseRepository[URL]):
         if not short_codes:
             return []
         statement = select(self.model).where(self.model.short_code.in_(short_codes))
-        result = await self.session.execute(statement)
+        return await self._read_all(statement, expected=len(set(short_codes)))
 
-        return result.scalars().all()
+    async def iter_short_codes(
+        self, batch_size: int = 10_000
+    ) -> AsyncIterator[List[str]]:
+        """
+        Yields every assigned short code in batches, paginating on the primary
+        key so that no batch holds a long-running cursor open.
+        """
+        last_id = 0
+        while True:
+            statement = (
+                select(self.model.id, self.model.short_code)
+                .where(self.model.id > last_id, self.model.short_code.is_not(None))
+                .order_by(self.model.id)
+                .limit(batch_size)
+            )
+            rows = (await self.session.execute(statement)).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield [row.short_code for row in rows]
 
-    async def bulk_increment_visit_counts(self, counts: Dict[str, int]) -> None:
+    async def lock_for_update(self, ids: List[int]) -> None:
+        """
+        Row-locks the given urls in ascending id order, so that concurrent
+        transactions locking overlapping sets cannot deadlock on each other.
+        The lock is FOR NO KEY UPDATE, which does not conflict with the
+        FOR KEY SHARE locks that inserting visits and rollups takes on their
+        urls through the foreign keys.
+        """
+        if not ids:
+            return
+        await self.session.execute(
+            select(self.model.id)
+            .where(self.model.id == any_(bindparam("ids", ids, ARRAY(BigInteger))))
+            .order_by(self.model.id)
+            .with_for_update(key_share=True)
+        )
+
+    async def bulk_increment_visit_counts(
+        self, counts: Dict[int, int], flush_id: str | None = None
+    ) -> Dict[int, int]:
         """
         Atomically increments the visit_count for multiple urls.
-        `counts` is a dictionary mapping short_code to the increment value.
+        `counts` is a dictionary mapping url id to the increment value.
+        Call `lock_for_update` first to take the row locks in a fixed order.
+        The deltas are bound as arrays, so there is no limit on the number of
+        urls. With `flush_id`, urls already incremented under that id are
+        skipped and the others record it, so that writing back the same
+        visit counter flush twice counts it once. Returns the new visit_count
+        of every updated url.
         """
         if not counts:
-            return
+            return {}
 
-        await self.session.execute(
+        ids, increments = map(list, zip(*sorted(counts.items())))
+        deltas = select(
+            func.unnest(bindparam("ids", ids, ARRAY(BigInteger))).label("id"),
+            func.unnest(bindparam("deltas", increments, ARRAY(Integer))).label("delta"),
+        ).subquery("deltas")
+        statement = (
             update(self.model)
-            .where(self.model.short_code.in_(counts.keys()))
-            .values(
-                visit_count=self.model.visit_count
-                + case(
-                    counts,
-                    value=self.model.short_code,
-                )
-            )
+            .where(self.model.id == deltas.c.id)
+            .values(visit_count=self.model.visit_count + deltas.c.delta)
+            .returning(self.model.id, self.model.visit_count)
         )
+        if flush_id is not None:
+            statement = statement.where(
+                self.model.visit_count_flush_id.is_distinct_from(flush_id)
+            ).values(visit_count_flush_id=flush_id)
+        result = await self.session.execute(statement)
+        return dict(result.tuples().all())
@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from src.core.common.base_repository import BaseRepository
+from src.core.infrastructures.tracing.tracer import trace_methods
+from src.core.shorten.entities.visit_rollups import VisitRollup
+
+RollupKey = Tuple[int, str, datetime]
+
+
+@trace_methods("db")
+class VisitRollupRepository(BaseRepository[VisitRollup]):
+    async def bulk_add_visits(self, counts: Dict[RollupKey, int]) -> None:
+        """
+        Adds visits to the rollup rows keyed by `(url_id, bucket, bucket_start)`,
+        creating missing rows. The columns are bound as arrays, so there is no
+        limit on the number of keys. Rows are written in key order so that
+        concurrent batches lock them in the same order.
+        """
+        if not counts:
+            return
+
+        keys, visits = zip(*sorted(counts.items()))
+        url_ids, buckets, starts = map(list, zip(*keys))
+        rows = select(
+            func.unnest(bindparam("url_ids", url_ids, ARRAY(BigInteger))),
+            func.unnest(bindparam("buckets", buckets, ARRAY(String))),
+            func.unnest(bindparam("starts", starts, ARRAY(DateTime(timezone=True)))),
+            func.unnest(bindparam("visits", list(visits), ARRAY(Integer))),
+        )
+        statement = insert(self.model).from_select(
+            ["url_id", "bucket", "bucket_start", "visits"], rows
+        )
+        await self.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["url_id", "bucket", "bucket_start"],
+                set_={"visits": self.model.visits + statement.excluded.visits},
+            )
+        )
+
+    async def get_series(
+        self, url_id: int, bucket: str, start: datetime, end: datetime
+    ) -> List[Tuple[datetime, int]]:
+        """Returns the non-empty buckets of a url within `[start, end)`."""
+        statement = (
+            select(self.model.bucket_start, self.model.visits)
+            .where(
+                self.model.url_id == url_id,
+                self.model.bucket == bucket,
+                self.model.bucket_start >= start,
+                self.model.bucket_start < end,
+            )
+            .order_by(self.model.bucket_start)
+        )
+        result = await self.session.execute(statement)
+        return list(result.tuples().all())
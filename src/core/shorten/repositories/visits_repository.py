@@ -1,14 +1,76 @@
-from sqlalchemy import func, select
+from datetime import datetime
+
+from sqlalchemy import Select, func, insert, select
 
 from src.core.common.base_repository import BaseRepository
+from src.core.infrastructures.tracing.tracer import trace_methods
 from src.core.shorten.entities.visits import Visit
 
 
+@trace_methods("db")
 class VisitsRepository(BaseRepository[Visit]):
-    async def count_by_url_id(self, url_id: int) -> int:
+    def count_by_url_id_query(
+        self,
+        url_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Select:
         query = select(func.count()).select_from(self.model).filter_by(url_id=url_id)
-        result = await self.session.execute(query)
+        if start is not None:
+            query = query.where(self.model.visited_at >= start)
+        if end is not None:
+            query = query.where(self.model.visited_at < end)
+        return query
+
+    async def count_by_url_id(
+        self,
+        url_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> int:
+        """
+        Counts the visits of a url in `[start, end)`. The table is partitioned
+        by month on `visited_at`, so bounds restrict the scan to the
+        partitions they overlap; without them every partition is read.
+        """
+        result = await self.session.execute(
+            self.count_by_url_id_query(url_id, start, end)
+        )
         return result.scalar_one()
 
     async def add_all(self, visits: list[Visit]) -> None:
         self.session.add_all(visits)
+
+    async def bulk_insert(self, visits: list[tuple[int, str | None, datetime]]) -> None:
+        """
+        Inserts `(url_id, visitor_ip, visited_at)` rows in the session's
+        transaction.
+
+        On asyncpg the rows are streamed with a binary COPY, which skips
+        statement parsing and ORM bookkeeping; other drivers fall back to an
+        executemany INSERT without identity tracking.
+        """
+        if not visits:
+            return
+
+        connection = await self.session.connection()
+        # The driver only opens its transaction when a statement goes through
+        # SQLAlchemy; without one the COPY below would autocommit.
+        await connection.exec_driver_sql("SELECT 1")
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if hasattr(driver_connection, "copy_records_to_table"):
+            await driver_connection.copy_records_to_table(
+                self.model.__tablename__,
+                records=visits,
+                columns=["url_id", "visitor_ip", "visited_at"],
+            )
+            return
+
+        await self.session.execute(
+            insert(self.model),
+            [
+                {"url_id": url_id, "visitor_ip": ip, "visited_at": visited_at}
+                for url_id, ip, visited_at in visits
+            ],
+        )
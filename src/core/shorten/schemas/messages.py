@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -7,3 +9,4 @@ class VisitLogMessage(BaseModel):
     short_code: str
     ip_address: str | None = None
     user_agent: str | None = None
+    visited_at: datetime | None = None
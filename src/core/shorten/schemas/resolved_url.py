@@ -0,0 +1,24 @@
+from typing import NamedTuple
+
+from src.core.infrastructures.cache.serializers import CacheSerializer
+
+
+class ResolvedUrl(NamedTuple):
+    """The part of a `URL` row the redirect path needs."""
+
+    id: int
+    original_url: str
+
+
+class ResolvedUrlSerializer(CacheSerializer):
+    """
+    Packs a `ResolvedUrl` as `<id>|<original_url>`. Decoding is a single
+    partition and an int conversion, with no validation.
+    """
+
+    def dumps(self, value: ResolvedUrl) -> str:
+        return f"{value.id}|{value.original_url}"
+
+    def loads(self, payload: str) -> ResolvedUrl:
+        url_id, _, original_url = payload.partition("|")
+        return ResolvedUrl(int(url_id), original_url)
@@ -1,5 +1,9 @@
+from datetime import datetime
+
 from pydantic import BaseModel, HttpUrl
 
+from src.core.shorten.utils.time_buckets import Bucket
+
 
 class ShortenRequest(BaseModel):
     url: HttpUrl
@@ -11,5 +15,27 @@ class ShortenResponse(BaseModel):
     original_url: str
 
 
+class ShortenBatchItem(BaseModel):
+    url: HttpUrl
+
+
+class ShortenBatchRequest(BaseModel):
+    urls: list[HttpUrl]
+
+
+class ShortenBatchResponse(BaseModel):
+    results: list[ShortenResponse]
+
+
 class StatsResponse(BaseModel):
     visits: int
+
+
+class TimeseriesPoint(BaseModel):
+    start: datetime
+    visits: int
+
+
+class TimeseriesResponse(BaseModel):
+    bucket: Bucket
+    points: list[TimeseriesPoint]
@@ -0,0 +1,25 @@
+from typing import NamedTuple
+
+from src.core.infrastructures.cache.serializers import CacheSerializer
+
+
+class ShortenedUrl(NamedTuple):
+    """The part of a `URL` row the shorten path returns."""
+
+    id: int
+    original_url: str
+    short_code: str
+
+
+class ShortenedUrlSerializer(CacheSerializer):
+    """
+    Packs a `ShortenedUrl` as `<id>|<short_code>|<original_url>`. Only urls
+    with generated codes are cached, and those never contain a `|`.
+    """
+
+    def dumps(self, value: ShortenedUrl) -> str:
+        return f"{value.id}|{value.short_code}|{value.original_url}"
+
+    def loads(self, payload: str) -> ShortenedUrl:
+        url_id, short_code, original_url = payload.split("|", 2)
+        return ShortenedUrl(int(url_id), original_url, short_code)
@@ -1,9 +1,33 @@
-from src.core.common.exceptions import ShortCodeAlreadyExistsError
+import asyncio
+import logging
+
+from src.core.common.exceptions import (
+    ShortCodeAllocationError,
+    ShortCodeAlreadyExistsError,
+)
+from src.core.infrastructures.bloom_filter.abstract_bloom_filter import (
+    AbstractBloomFilter,
+)
+from src.core.infrastructures.cache.abstract_cache_storage import AbstractCacheStorage
+from src.core.infrastructures.cache.decorators import cache
 from src.core.shorten.entities.urls import URL
 from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.schemas.shortened_url import (
+    ShortenedUrl,
+    ShortenedUrlSerializer,
+)
+from src.core.shorten.services.url_visits_service import UrlVisitsService
+from src.core.shorten.utils.id_allocator import UrlIdAllocator
 from src.core.shorten.utils.shorten_strategy.abstract_shorten_strategy import (
     ShortCodeStrategy,
 )
+from src.core.shorten.utils.url_digest import url_digest
+
+logger = logging.getLogger(__name__)
+
+A_DAY = 24 * 60 * 60
+INVALIDATE_CHUNK_SIZE = 500  # Cache deletes in flight at once
+MAX_INSERT_ATTEMPTS = 5  # Ids tried for one url before giving up
 
 
 class UrlShortenService:
@@ -11,34 +35,149 @@ class UrlShortenService:
         self,
         url_repository: UrlRepository,
         short_code_strategy: ShortCodeStrategy,
+        short_code_filter: AbstractBloomFilter,
+        id_allocator: UrlIdAllocator,
+        cache_storage: AbstractCacheStorage,
+        cache_namespace: str | None = None,
     ) -> None:
         self.url_repository = url_repository
         self.short_code_strategy = short_code_strategy
+        self.short_code_filter = short_code_filter
+        self.id_allocator = id_allocator
+        self.cache_storage = cache_storage
+        self.cache_namespace = cache_namespace
 
     async def create_short_url(
         self, original_url: str, custom_code: str | None = None
-    ) -> URL:
+    ) -> ShortenedUrl:
         if custom_code:
-            if await self.url_repository.get_by_short_code(short_code=custom_code):
+            # A custom code that a generated code could equal is stored with
+            # the url of that id, where the unique index catches the clash.
+            decoded_id = self.short_code_strategy.decode(custom_code)
+            [url_id] = await self.id_allocator.allocate(
+                1,
+                self.url_repository,
+                shard_keys=[custom_code if decoded_id is None else decoded_id],
+            )
+            created_url = await self.url_repository.insert(
+                original_url=original_url, short_code=custom_code, url_id=url_id
+            )
+            if created_url is None:
                 raise ShortCodeAlreadyExistsError(
                     f"Short code '{custom_code}' already exists"
                 )
-            new_url = URL(original_url=original_url, short_code=custom_code)
-            return await self.url_repository.create(obj_in=new_url)
+            await self.short_code_filter.add(custom_code)
+            await self._forget_missing([custom_code])
+            return self._shortened(created_url)
 
-        if existing_url := await self.url_repository.get_by_original_url(
-            original_url=original_url
-        ):
+        if existing_url := await self.find_short_url(original_url):
             return existing_url
 
-        new_url = URL(original_url=original_url)
-        created_url = await self.url_repository.create(obj_in=new_url)
+        for _ in range(MAX_INSERT_ATTEMPTS):
+            [url_id] = await self.id_allocator.allocate(
+                1, self.url_repository, shard_keys=[url_digest(original_url)]
+            )
+            created_url = await self.url_repository.insert(
+                original_url=original_url,
+                short_code=self.short_code_strategy.generate(url_id),
+                url_id=url_id,
+                deduplicate=True,
+            )
+            if created_url:
+                await self.short_code_filter.add(created_url.short_code)
+                await self._forget_missing([created_url.short_code])
+                return self._shortened(created_url)
+            # Either a concurrent request shortened the same url, or a custom
+            # code took the generated one and the next id is tried.
+            if existing_url := await self.url_repository.get_by_original_url(
+                original_url
+            ):
+                return self._shortened(existing_url)
+        raise ShortCodeAllocationError(
+            f"No free short code for '{original_url}' after "
+            f"{MAX_INSERT_ATTEMPTS} attempts"
+        )
+
+    # Short codes of generated urls never change, so entries only expire to
+    # make room.
+    @cache(
+        prefix="find_short_url",
+        expire=A_DAY,
+        key_builder=lambda original_url: url_digest(original_url).hex(),
+        serializer=ShortenedUrlSerializer(),
+    )
+    async def find_short_url(self, original_url: str) -> ShortenedUrl | None:
+        """Returns the url that shortens of `original_url` resolve to, if any."""
+        url = await self.url_repository.get_by_original_url(original_url)
+        return self._shortened(url) if url else None
+
+    async def create_short_urls(self, original_urls: list[str]) -> list[str]:
+        """
+        Shortens many urls at once and returns their short codes in input
+        order. Urls that were shortened before keep their code, and a url
+        given more than once is only created once.
+        """
+        distinct_urls = list(dict.fromkeys(original_urls))
+        short_codes = await self.url_repository.get_short_codes_by_original_urls(
+            distinct_urls
+        )
+        new_urls = [url for url in distinct_urls if url not in short_codes]
+        created_codes = []
+        for _ in range(MAX_INSERT_ATTEMPTS):
+            if not new_urls:
+                break
+            ids = await self.id_allocator.allocate(
+                len(new_urls),
+                self.url_repository,
+                shard_keys=[url_digest(url) for url in new_urls],
+            )
+            codes = self.short_code_strategy.generate_many(ids)
+            inserted = set(await self.url_repository.bulk_insert(ids, new_urls, codes))
+            skipped_urls = []
+            for url_id, url, code in zip(ids, new_urls, codes):
+                if url_id in inserted:
+                    short_codes[url] = code
+                    created_codes.append(code)
+                else:
+                    skipped_urls.append(url)
+            short_codes.update(
+                await self.url_repository.get_short_codes_by_original_urls(skipped_urls)
+            )
+            new_urls = [url for url in skipped_urls if url not in short_codes]
+        if new_urls:
+            await self.url_repository.session.rollback()
+            raise ShortCodeAllocationError(
+                f"No free short codes for {len(new_urls)} urls after "
+                f"{MAX_INSERT_ATTEMPTS} attempts"
+            )
+        if created_codes:
+            await self.url_repository.session.commit()
+            await self.short_code_filter.add_many(created_codes)
+            await self._forget_missing(created_codes)
+        return [short_codes[url] for url in original_urls]
+
+    async def _forget_missing(self, short_codes: list[str]) -> None:
+        """
+        Drops the cached lookups of newly created short codes, which may have
+        been remembered as missing if they were requested before.
+        """
+        invalidate = UrlVisitsService.resolve_short_code.invalidate
+        try:
+            for start in range(0, len(short_codes), INVALIDATE_CHUNK_SIZE):
+                await asyncio.gather(
+                    *(
+                        invalidate(self, short_code=short_code)
+                        for short_code in short_codes[
+                            start : start + INVALIDATE_CHUNK_SIZE
+                        ]
+                    )
+                )
+        except Exception as e:
+            logger.warning(f"Failed to invalidate created short codes: {e}")
 
-        short_code = self.short_code_strategy.generate(created_url.id)
-        update_payload = URL(short_code=short_code)
-        await self.url_repository.update(db_obj=created_url, obj_in=update_payload)
-        created_url.short_code = short_code
-        return created_url
+    @staticmethod
+    def _shortened(url: URL) -> ShortenedUrl:
+        return ShortenedUrl(url.id, url.original_url, url.short_code)
 
     async def get_by_short_code(self, short_code: str) -> URL:
         return await self.url_repository.get_by_short_code(short_code=short_code)
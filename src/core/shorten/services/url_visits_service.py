@@ -1,43 +1,153 @@
-from src.core.common.exceptions import NotFoundException
+from datetime import datetime, timedelta, timezone
+
+from src.core.common.exceptions import BadRequestException, NotFoundException
+from src.core.infrastructures.bloom_filter.abstract_bloom_filter import (
+    AbstractBloomFilter,
+)
 from src.core.infrastructures.cache.abstract_cache_storage import AbstractCacheStorage
 from src.core.infrastructures.cache.decorators import cache
-from src.core.infrastructures.message_queue.abstract_message_queue import (
-    AbstractMessageQueue,
-)
+from src.core.infrastructures.message_queue.buffer import MessageBuffer
 from src.core.infrastructures.message_queue.decorators import log_visit
+from src.core.infrastructures.visit_counter.abstract_visit_counter import (
+    AbstractVisitCounter,
+)
 from src.core.shorten.entities.urls import URL
 from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visit_rollup_repository import (
+    VisitRollupRepository,
+)
+from src.core.shorten.schemas.resolved_url import ResolvedUrl, ResolvedUrlSerializer
+from src.core.shorten.utils.shorten_strategy.abstract_shorten_strategy import (
+    ShortCodeStrategy,
+)
+from src.core.shorten.utils.time_buckets import (
+    BUCKET_WIDTHS,
+    Bucket,
+    as_utc,
+    bucket_range,
+)
 
-A_DAY = 24 * 60 * 60
+AN_HOUR = 60 * 60
+A_DAY = 24 * AN_HOUR
+NEGATIVE_CACHE_TTL = 30  # In seconds
+MAX_TIMESERIES_POINTS = 24 * 92
+DEFAULT_TIMESERIES_SPANS = {"hour": timedelta(days=1), "day": timedelta(days=30)}
 
 
 class UrlVisitsService:
     def __init__(
         self,
         url_repository: UrlRepository,
-        message_queue: AbstractMessageQueue,
+        visit_rollup_repository: VisitRollupRepository,
+        visit_buffer: MessageBuffer,
         cache_storage: AbstractCacheStorage,
+        short_code_filter: AbstractBloomFilter,
+        short_code_strategy: ShortCodeStrategy,
+        visit_counter: AbstractVisitCounter,
+        cache_namespace: str | None = None,
     ) -> None:
         self.url_repository = url_repository
-        self.message_queue = message_queue
+        self.visit_rollup_repository = visit_rollup_repository
+        self.visit_buffer = visit_buffer
         self.cache_storage = cache_storage
+        self.short_code_filter = short_code_filter
+        self.short_code_strategy = short_code_strategy
+        self.visit_counter = visit_counter
+        self.cache_namespace = cache_namespace
+
+    async def _get_url_or_none(self, short_code: str) -> URL | None:
+        # Unknown codes are rejected here without a database round-trip.
+        if not await self.short_code_filter.might_contain(short_code):
+            return None
+        return await self.url_repository.get_by_short_code(
+            short_code=short_code, url_id=self.short_code_strategy.decode(short_code)
+        )
 
     async def _get_url_or_raise(self, short_code: str) -> URL:
-        url = await self.url_repository.get_by_short_code(short_code=short_code)
+        url = await self._get_url_or_none(short_code)
         if not url:
             raise NotFoundException("Short code not found.")
         return url
 
+    # Entries are refreshed in the background after a day, and can stand in
+    # for the database for up to two hours if it is unavailable.
+    @cache(
+        prefix="resolve_short_code",
+        soft_expire=A_DAY,
+        expire=A_DAY + AN_HOUR,
+        grace=AN_HOUR,
+        key_args=["short_code"],
+        negative_expire=NEGATIVE_CACHE_TTL,
+        serializer=ResolvedUrlSerializer(),
+    )
+    async def resolve_short_code(self, short_code: str) -> ResolvedUrl | None:
+        url = await self._get_url_or_none(short_code)
+        return ResolvedUrl(url.id, url.original_url) if url else None
+
     @log_visit
-    @cache(prefix="get_original_url", expire=A_DAY)
     async def get_original_url(
         self,
         short_code: str,
         ip_address: str | None = None,
         user_agent: str | None = None,
-    ) -> URL:
-        return await self._get_url_or_raise(short_code)
+    ) -> ResolvedUrl:
+        url = await self.resolve_short_code(short_code)
+        if not url:
+            raise NotFoundException("Short code not found.")
+        self.visit_counter.incr(url.id)
+        return url
+
+    async def invalidate_original_url(self, short_code: str) -> None:
+        """Drops the cached redirect target of `short_code`."""
+        await UrlVisitsService.resolve_short_code.invalidate(
+            self, short_code=short_code
+        )
 
     async def get_url_stats(self, short_code: str) -> int:
-        url = await self._get_url_or_raise(short_code)
-        return url.visit_count
+        if not self.visit_counter.enabled:
+            url = await self._get_url_or_raise(short_code)
+            return url.visit_count
+
+        resolved = await self.resolve_short_code(short_code)
+        if not resolved:
+            raise NotFoundException("Short code not found.")
+        base, unflushed = await self.visit_counter.get(resolved.id)
+        if base is None:
+            url = await self.url_repository.get(resolved.id)
+            if not url:
+                raise NotFoundException("Short code not found.")
+            base = url.visit_count
+            await self.visit_counter.set_base(resolved.id, base)
+        return base + unflushed
+
+    async def get_url_timeseries(
+        self,
+        short_code: str,
+        bucket: Bucket,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[tuple[datetime, int]]:
+        """
+        Returns the visits of every `bucket` from `start` up to `end`, read
+        from the rollups. Buckets without visits are included with zero.
+        """
+        end = as_utc(end) if end else datetime.now(timezone.utc)
+        start = as_utc(start) if start else end - DEFAULT_TIMESERIES_SPANS[bucket]
+        if start >= end:
+            raise BadRequestException("'from' must be before 'to'.")
+        if (end - start) / BUCKET_WIDTHS[bucket] > MAX_TIMESERIES_POINTS:
+            raise BadRequestException(
+                f"At most {MAX_TIMESERIES_POINTS} buckets can be requested at once."
+            )
+
+        url = await self.resolve_short_code(short_code)
+        if not url:
+            raise NotFoundException("Short code not found.")
+
+        buckets = list(bucket_range(start, end, bucket))
+        visits = dict(
+            await self.visit_rollup_repository.get_series(
+                url.id, bucket, buckets[0], end
+            )
+        )
+        return [(bucket_start, visits.get(bucket_start, 0)) for bucket_start in buckets]
@@ -0,0 +1,55 @@
+import asyncio
+from collections import Counter, defaultdict, deque
+from typing import Optional, Sequence
+
+from src.core.infrastructures.database.shards import ShardRouter
+from src.core.shorten.repositories.url_repository import UrlRepository
+
+
+class UrlIdAllocator:
+    """
+    Hands out url ids from blocks reserved from the url id sequence (a hi/lo
+    allocator), so that a url's id, and with it its short code, is known
+    before the url is inserted. Ids left in a block when the process exits
+    are never used, which only leaves gaps in the sequence.
+
+    With a `router` over several shards, reserved ids are kept per shard, so
+    that a url can be given an id that lives on the shard of its key.
+    """
+
+    def __init__(self, block_size: int = 1000, router: Optional[ShardRouter] = None):
+        self.block_size = block_size
+        self.router = router
+        self._ids: defaultdict[int, deque[int]] = defaultdict(deque)
+        self._lock = asyncio.Lock()
+
+    async def allocate(
+        self,
+        count: int,
+        url_repository: UrlRepository,
+        shard_keys: Optional[Sequence[str | bytes | int]] = None,
+    ) -> list[int]:
+        """
+        Returns `count` unused ids, reserving new blocks when needed. Given
+        `shard_keys`, the i-th id is placed on the shard of the i-th key.
+        """
+        router = self.router
+        sharded = router is not None and router.shard_count > 1
+        shard_count = router.shard_count if sharded else 1
+        if sharded and shard_keys is not None:
+            shards = [router.shard_for_key(key) for key in shard_keys]
+        else:
+            shards = [0] * count
+
+        async with self._lock:
+            needed = Counter(shards)
+            while missing := sum(
+                max(wanted - len(self._ids[shard]), 0)
+                for shard, wanted in needed.items()
+            ):
+                # Every shard gets about 1/n of the reserved ids.
+                size = max(missing * shard_count, self.block_size)
+                for url_id in await url_repository.reserve_ids(size):
+                    shard = router.shard_for_id(url_id) if sharded else 0
+                    self._ids[shard].append(url_id)
+            return [self._ids[shard].popleft() for shard in shards]
@@ -1,6 +1,21 @@
 from abc import ABC, abstractmethod
+from typing import Iterable
 
 
 class ShortCodeStrategy(ABC):
     @abstractmethod
     def generate(self, url_id: int) -> str: ...
+
+    def decode(self, short_code: str) -> int | None:
+        """
+        Returns the url id `short_code` would have been generated from, or
+        None if no id generates it. A code that decodes may still be a
+        custom code of another url.
+        """
+        return None
+
+    def generate_many(self, url_ids: Iterable[int]) -> list[str]:
+        return [self.generate(url_id) for url_id in url_ids]
+
+    def decode_many(self, short_codes: Iterable[str]) -> list[int | None]:
+        return [self.decode(short_code) for short_code in short_codes]
@@ -2,10 +2,13 @@ import string
 
 from .abstract_shorten_strategy import ShortCodeStrategy
 
+MAX_URL_ID = 2**63 - 1  # The largest BIGINT
+
 
 class Base62ShortCodeStrategy(ShortCodeStrategy):
     def __init__(self):
         self.characters = string.digits + string.ascii_letters  # 0-9a-zA-Z
+        self.values = {char: value for value, char in enumerate(self.characters)}
 
     def generate(self, url_id: int) -> str:
         if url_id == 0:
@@ -20,3 +23,16 @@ class Base62ShortCodeStrategy(ShortCodeStrategy):
             base62_str.append(self.characters[remainder])
 
         return "".join(reversed(base62_str))
+
+    def decode(self, short_code: str) -> int | None:
+        # Leading zeros are rejected, as `generate` never produces them.
+        if not short_code or (short_code[0] == "0" and len(short_code) > 1):
+            return None
+        values = self.values
+        num = 0
+        for char in short_code:
+            value = values.get(char)
+            if value is None:
+                return None
+            num = num * 62 + value
+        return num if num <= MAX_URL_ID else None
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Literal
+
+Bucket = Literal["hour", "day"]
+
+BUCKETS: tuple[Bucket, ...] = ("hour", "day")
+BUCKET_WIDTHS: dict[Bucket, timedelta] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Converts `moment` to UTC, reading naive datetimes as UTC."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def bucket_start(moment: datetime, bucket: Bucket) -> datetime:
+    """Returns the start, in UTC, of the bucket that `moment` falls in."""
+    moment = as_utc(moment)
+    if bucket == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_range(start: datetime, end: datetime, bucket: Bucket) -> Iterator[datetime]:
+    """Yields the start of every bucket overlapping `[start, end)`."""
+    current = bucket_start(start, bucket)
+    while current < end:
+        yield current
+        current += BUCKET_WIDTHS[bucket]
@@ -0,0 +1,12 @@
+import hashlib
+
+DIGEST_SIZE = 16  # In bytes
+
+
+def url_digest(original_url: str) -> bytes:
+    """
+    Returns the fixed-width digest urls are deduplicated by. Equal to
+    `substring(sha256(convert_to(original_url, 'UTF8')) FROM 1 FOR 16)`
+    in Postgres.
+    """
+    return hashlib.sha256(original_url.encode()).digest()[:DIGEST_SIZE]
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Callable
+
+from src.core.infrastructures.visit_counter.abstract_visit_counter import (
+    AbstractVisitCounter,
+)
+from src.core.shorten.repositories.url_repository import UrlRepository
+
+logger = logging.getLogger(__name__)
+
+
+class VisitCounterFlusher:
+    """
+    Periodically writes the visits counted by `visit_counter` back to
+    `url.visit_count`, in one transaction per `chunk_size` urls. Chunks
+    committed before a failure stay flushed; the rest are retried on the
+    next flush. Each url records the id of the flush that last incremented
+    it in the same statement, so a chunk written again, after a crash before
+    `complete_flush` or by a flusher that took over an expired lease, is not
+    counted twice.
+    """
+
+    def __init__(
+        self,
+        visit_counter: AbstractVisitCounter,
+        url_repository_factory: Callable[[], UrlRepository],
+        interval: float = 5.0,
+        chunk_size: int = 5000,
+    ):
+        self.visit_counter = visit_counter
+        self.url_repository_factory = url_repository_factory
+        self.interval = interval
+        self.chunk_size = chunk_size
+
+    async def flush(self, url_repository: UrlRepository) -> int:
+        """Writes back the pending visits and returns how many there were."""
+        counts = await self.visit_counter.take_pending()
+        if not counts:
+            return 0
+
+        flushed = 0
+        flush_id = self.visit_counter.flush_id
+        url_ids = sorted(counts)
+        try:
+            for start in range(0, len(url_ids), self.chunk_size):
+                if not await self.visit_counter.renew_flush():
+                    logger.warning(
+                        "The visit counter flush was taken over; leaving the "
+                        "rest of it to the other flusher."
+                    )
+                    break
+                chunk = {
+                    url_id: counts[url_id]
+                    for url_id in url_ids[start : start + self.chunk_size]
+                }
+                try:
+                    await url_repository.lock_for_update(list(chunk))
+                    visit_counts = await url_repository.bulk_increment_visit_counts(
+                        chunk, flush_id=flush_id
+                    )
+                    await url_repository.session.commit()
+                except Exception:
+                    await url_repository.session.rollback()
+                    raise
+                await self.visit_counter.complete_flush(list(chunk), visit_counts)
+                flushed += sum(chunk[url_id] for url_id in visit_counts)
+        finally:
+            await self.visit_counter.end_flush()
+        return flushed
+
+    async def run(self):
+        logger.info(f"Flushing visit counters every {self.interval}s.")
+        url_repository = self.url_repository_factory()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                flushed = await self.flush(url_repository)
+                if flushed:
+                    logger.info(f"Flushed {flushed} counted visits.")
+            except Exception as e:
+                logger.error(f"Failed to flush visit counters: {e}", exc_info=True)
@@ -1,38 +1,150 @@
 import asyncio
 import logging
+import random
+import time
 from collections import Counter
-from typing import List
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
 
 from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
 
 from src.core.infrastructures.dependency_injection.app_container import AppContainer
 from src.core.infrastructures.logging import setup_logging
 from src.core.infrastructures.message_queue.abstract_message_queue import (
     AbstractMessageQueue,
 )
-from src.core.shorten.entities.visits import Visit
+from src.core.infrastructures.metrics.collectors import (
+    pool_collector,
+    queue_depth_collector,
+)
+from src.core.infrastructures.metrics.registry import (
+    REGISTRY,
+    MetricFamily,
+    Sample,
+)
+from src.core.infrastructures.metrics.server import start_metrics_server
 from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visit_rollup_repository import (
+    VisitRollupRepository,
+)
 from src.core.shorten.repositories.visits_repository import VisitsRepository
 from src.core.shorten.schemas.messages import VisitLogMessage
+from src.core.shorten.utils.time_buckets import BUCKETS, bucket_start
+from src.log_worker.visit_counter_flusher import VisitCounterFlusher
 
-BATCH_SIZE = 100
-SLEEP_INTERVAL = 1  # In seconds
+CONNECTION_RETRY_INTERVAL = 5  # In seconds
+DEADLOCK_RETRIES = 3
+DEADLOCK_BACKOFF = 0.05  # In seconds, grows with every retry
+DEADLOCK_DETECTED = "40P01"
 
 logger = logging.getLogger(__name__)
 
+BATCH_SIZE = REGISTRY.histogram(
+    "log_worker_batch_size",
+    "Valid messages per batch written.",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+COMMIT_DURATION = REGISTRY.histogram(
+    "log_worker_commit_duration_seconds",
+    "Time to write and commit one batch, including deadlock retries.",
+)
+
+
+@dataclass
+class WorkerStats:
+    batches: int = 0
+    messages: int = 0
+    counter_flushes: int = 0
+    deadlocks: int = 0
+    retries: int = 0
+    lock_wait_seconds: float = 0.0
+    max_lock_wait: float = 0.0
+
+
+def _is_deadlock(error: Exception) -> bool:
+    return (
+        isinstance(error, DBAPIError)
+        and getattr(error.orig, "pgcode", None) == DEADLOCK_DETECTED
+    )
+
 
 class LogWorker:
+    """
+    Moves visit messages from the message queue into the database.
+
+    Fetching and validation run in one coroutine and hand batches to
+    `writers` concurrent writer coroutines, each with its own session, so
+    the queue is read while earlier batches are being committed. Messages are
+    acked only once the batch holding them has been committed. Until then,
+    on queues that redeliver unacked messages, they are extended a few
+    times per `redelivery_timeout`, so that a slow batch is not handed to
+    another worker while this one is still writing it.
+
+    The batch size starts at `min_batch_size`. It doubles, up to
+    `max_batch_size`, while the queue fills whole batches and commits take
+    less than `target_commit_latency` seconds. It halves again once commits
+    get slower than that.
+
+    Visit counters are updated per url id, locking the rows in id order. A
+    transaction that still deadlocks is retried. With
+    `counter_flush_interval`, counts from every batch are summed in memory
+    and written every that many seconds in one transaction instead. The
+    messages are then acked only after that write. Without
+    `update_visit_counts` only the visits themselves are stored, for when
+    another component keeps the counters. Hourly and daily rollups are
+    updated in the same transaction as the visits.
+    """
+
     def __init__(
         self,
         message_queue: AbstractMessageQueue,
-        url_repository: UrlRepository,
-        visits_repository: VisitsRepository,
+        url_repository_factory: Callable[[], UrlRepository],
+        visits_repository_factory: Callable[[], VisitsRepository],
+        writers: int = 4,
+        min_batch_size: int = 100,
+        max_batch_size: int = 5000,
+        target_commit_latency: float = 0.5,
+        idle_sleep: float = 1.0,
+        counter_flush_interval: float = 0,
+        update_visit_counts: bool = True,
+        visit_rollup_repository_factory: Optional[
+            Callable[[], VisitRollupRepository]
+        ] = None,
     ):
         self.message_queue = message_queue
-        self.url_repository = url_repository
-        self.visits_repository = visits_repository
+        self.url_repository_factory = url_repository_factory
+        self.visits_repository_factory = visits_repository_factory
+        self.writers = writers
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_commit_latency = target_commit_latency
+        self.idle_sleep = idle_sleep
+        self.counter_flush_interval = counter_flush_interval
+        self.update_visit_counts = update_visit_counts
+        self.visit_rollup_repository_factory = visit_rollup_repository_factory
+        self.stats = WorkerStats()
 
-    async def process_messages(self, messages: List[VisitLogMessage]):
+        self.batch_size = min_batch_size
+        self.last_commit_latency = 0.0
+        # Bounded so that fetching pauses when the writers fall behind.
+        self._batches: asyncio.Queue[tuple[list[dict], List[VisitLogMessage]]] = (
+            asyncio.Queue(maxsize=writers)
+        )
+        self._pending_counts: Counter[int] = Counter()
+        self._pending_acks: list[dict] = []
+        # Messages fetched but not acked yet, by identity.
+        self._unacked: dict[int, dict] = {}
+
+    async def process_messages(
+        self,
+        messages: List[VisitLogMessage],
+        url_repository: UrlRepository,
+        visits_repository: VisitsRepository,
+        update_counters: bool = True,
+        visit_rollup_repository: Optional[VisitRollupRepository] = None,
+    ):
         """
         Processes a batch of visit messages efficiently using bulk operations.
         """
@@ -41,63 +153,292 @@ class LogWorker:
 
         logger.info(f"Processing a batch of {len(messages)} messages.")
 
+        now = datetime.now(timezone.utc)
         visits_to_add = [
-            Visit(url_id=msg.url_id, visitor_ip=msg.ip_address) for msg in messages
+            (msg.url_id, msg.ip_address, msg.visited_at or now) for msg in messages
         ]
 
-        visit_counts = Counter(msg.short_code for msg in messages)
-
-        await self.visits_repository.add_all(visits_to_add)
-        await self.url_repository.bulk_increment_visit_counts(visit_counts)
+        await visits_repository.bulk_insert(visits_to_add)
+        if visit_rollup_repository is not None:
+            rollups = Counter(
+                (url_id, bucket, bucket_start(visited_at, bucket))
+                for url_id, _, visited_at in visits_to_add
+                for bucket in BUCKETS
+            )
+            await visit_rollup_repository.bulk_add_visits(rollups)
+        if update_counters:
+            visit_counts = Counter(msg.url_id for msg in messages)
+            await self._increment_visit_counts(url_repository, visit_counts)
 
-        await self.visits_repository.session.commit()
+        await visits_repository.session.commit()
         logger.info(f"Successfully processed {len(visits_to_add)} visits.")
 
+    async def _increment_visit_counts(
+        self, url_repository: UrlRepository, counts: Counter[int]
+    ):
+        started = time.perf_counter()
+        await url_repository.lock_for_update(list(counts))
+        lock_wait = time.perf_counter() - started
+        self.stats.lock_wait_seconds += lock_wait
+        self.stats.max_lock_wait = max(self.stats.max_lock_wait, lock_wait)
+
+        await url_repository.bulk_increment_visit_counts(counts)
+
+    async def _retry_on_deadlock(
+        self, transaction: Callable[[], Awaitable[None]], session
+    ):
+        for attempt in range(DEADLOCK_RETRIES + 1):
+            try:
+                return await transaction()
+            except DBAPIError as e:
+                await session.rollback()
+                if not _is_deadlock(e) or attempt == DEADLOCK_RETRIES:
+                    raise
+                self.stats.deadlocks += 1
+                self.stats.retries += 1
+                logger.warning(f"Deadlock detected, retrying (attempt {attempt + 1}).")
+                await asyncio.sleep(DEADLOCK_BACKOFF * (attempt + 1) * random.random())
+
     async def run(self):
         logger.info("Log worker started.")
         logger.info(
-            f"Using message queue type: {self.message_queue.__class__.__name__}"
+            f"Using message queue type: {self.message_queue.__class__.__name__}, "
+            f"{self.writers} writers."
         )
+        loops = [self._fetch_loop()]
+        loops.extend(self._write_loop(i) for i in range(self.writers))
+        if self.update_visit_counts and self.counter_flush_interval:
+            loops.append(self._counter_flush_loop())
+        if self.message_queue.redelivery_timeout:
+            loops.append(self._extend_loop())
+        await asyncio.gather(*loops)
 
+    async def _fetch_loop(self):
         while True:
             try:
-                raw_messages = await self.message_queue.get_batch(BATCH_SIZE)
+                batch_size = self.batch_size
+                raw_messages = await self.message_queue.get_batch(batch_size)
 
                 if not raw_messages:
-                    logger.debug("Queue is empty, sleeping...")
-                    await asyncio.sleep(SLEEP_INTERVAL)
+                    if not self.message_queue.blocking_reads:
+                        logger.debug("Queue is empty, sleeping...")
+                        await asyncio.sleep(self.idle_sleep)
                     continue
-                valid_messages: List[VisitLogMessage] = []
 
-                for msg_data in raw_messages:
-                    try:
-                        valid_messages.append(VisitLogMessage.model_validate(msg_data))
-                    except ValidationError as e:
-                        logger.warning(
-                            f"Skipping malformed message. Data: {msg_data}. Error: {e}"
-                        )
-
-                if valid_messages:
-                    await self.process_messages(valid_messages)
+                self._unacked.update((id(m), m) for m in raw_messages)
+                valid_messages = self._validate(raw_messages)
+                await self._batches.put((raw_messages, valid_messages))
+                if len(raw_messages) == batch_size:
+                    self._grow_batch_size()
 
             except ConnectionError as e:
                 logger.error(f"Message queue connection error: {e}. Retrying...")
-                await asyncio.sleep(5)
+                await asyncio.sleep(CONNECTION_RETRY_INTERVAL)
             except Exception as e:
                 logger.error(f"An unexpected error occurred: {e}", exc_info=True)
-                await asyncio.sleep(SLEEP_INTERVAL)
+                await asyncio.sleep(self.idle_sleep)
+
+    async def _write_loop(self, writer_id: int):
+        # Called from this coroutine's own task, so the repositories share a
+        # session that no other writer uses.
+        url_repository = self.url_repository_factory()
+        visits_repository = self.visits_repository_factory()
+        visit_rollup_repository = (
+            self.visit_rollup_repository_factory()
+            if self.visit_rollup_repository_factory
+            else None
+        )
+        session = visits_repository.session
+
+        update_counters = self.update_visit_counts and not self.counter_flush_interval
+        defer_counters = self.update_visit_counts and self.counter_flush_interval
+
+        while True:
+            raw_messages, valid_messages = await self._batches.get()
+            deferred = False
+            try:
+                started = time.perf_counter()
+                if valid_messages:
+                    await self._retry_on_deadlock(
+                        lambda: self.process_messages(
+                            valid_messages,
+                            url_repository,
+                            visits_repository,
+                            update_counters=update_counters,
+                            visit_rollup_repository=visit_rollup_repository,
+                        ),
+                        session,
+                    )
+                latency = time.perf_counter() - started
+                self._record_commit_latency(latency)
+                COMMIT_DURATION.observe(latency)
+                BATCH_SIZE.observe(len(valid_messages))
+                self.stats.batches += 1
+                self.stats.messages += len(valid_messages)
+
+                if defer_counters:
+                    self._pending_counts.update(msg.url_id for msg in valid_messages)
+                    self._pending_acks.extend(raw_messages)
+                    deferred = True
+                    continue
+                # Only after the commit, so a crash above leads to redelivery.
+                # Malformed messages are acked too, they would never succeed.
+                await self.message_queue.ack(raw_messages)
+            except Exception as e:
+                logger.error(
+                    f"Writer {writer_id} failed to process a batch: {e}",
+                    exc_info=True,
+                )
+                await session.rollback()
+            finally:
+                if not deferred:
+                    # Failed batches are left to be redelivered.
+                    self._release(raw_messages)
+                self._batches.task_done()
+
+    async def _counter_flush_loop(self):
+        url_repository = self.url_repository_factory()
+        session = url_repository.session
+
+        async def flush(counts: Counter[int]):
+            await self._increment_visit_counts(url_repository, counts)
+            await session.commit()
+
+        while True:
+            await asyncio.sleep(self.counter_flush_interval)
+            if not self._pending_acks:
+                continue
+            counts, self._pending_counts = self._pending_counts, Counter()
+            acks, self._pending_acks = self._pending_acks, []
+            try:
+                await self._retry_on_deadlock(lambda: flush(counts), session)
+            except Exception as e:
+                logger.error(f"Failed to flush visit counters: {e}", exc_info=True)
+                self._pending_counts.update(counts)
+                self._pending_acks[:0] = acks
+                continue
+
+            self.stats.counter_flushes += 1
+            try:
+                await self.message_queue.ack(acks)
+            except Exception as e:
+                logger.error(f"Failed to ack messages: {e}", exc_info=True)
+            finally:
+                self._release(acks)
+
+    async def _extend_loop(self):
+        interval = self.message_queue.redelivery_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not self._unacked:
+                continue
+            try:
+                await self.message_queue.extend(list(self._unacked.values()))
+            except Exception as e:
+                logger.error(f"Failed to extend unacked messages: {e}", exc_info=True)
+
+    def _release(self, messages: list[dict]):
+        for message in messages:
+            self._unacked.pop(id(message), None)
+
+    @staticmethod
+    def _validate(raw_messages: list[dict]) -> List[VisitLogMessage]:
+        valid_messages: List[VisitLogMessage] = []
+        for msg_data in raw_messages:
+            try:
+                valid_messages.append(VisitLogMessage.model_validate(msg_data))
+            except ValidationError as e:
+                logger.warning(
+                    f"Skipping malformed message. Data: {msg_data}. Error: {e}"
+                )
+        return valid_messages
+
+    async def collect_metrics(self) -> list[MetricFamily]:
+        """Reports the counters in `stats` and the current batch size."""
+        counters = [
+            ("batches", "Batches written."),
+            ("messages", "Visits written."),
+            ("counter_flushes", "Deferred visit counter writes."),
+            ("deadlocks", "Transactions that deadlocked."),
+            ("retries", "Transactions retried after a deadlock."),
+            ("lock_wait_seconds", "Time spent waiting for url row locks."),
+        ]
+        families = [
+            MetricFamily(
+                f"log_worker_{field}",
+                "counter",
+                help,
+                [Sample(f"log_worker_{field}_total", {}, getattr(self.stats, field))],
+            )
+            for field, help in counters
+        ]
+        families.append(
+            MetricFamily(
+                "log_worker_target_batch_size",
+                "gauge",
+                "Batch size the worker currently fetches.",
+                [Sample("log_worker_target_batch_size", {}, self.batch_size)],
+            )
+        )
+        return families
+
+    def _grow_batch_size(self):
+        if (
+            self.batch_size < self.max_batch_size
+            and self.last_commit_latency < self.target_commit_latency
+        ):
+            self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+            logger.debug(f"Queue is backed up, batch size is now {self.batch_size}.")
+
+    def _record_commit_latency(self, latency: float):
+        self.last_commit_latency = latency
+        if latency > self.target_commit_latency:
+            if self.batch_size > self.min_batch_size:
+                self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+                logger.debug(
+                    f"Commit took {latency:.3f}s, batch size is now {self.batch_size}."
+                )
 
 
 async def main():
     setup_logging()
     container = AppContainer()
+    settings = container.settings()
+    visit_counter = container.visit_counter()
 
-    message_queue = container.message_queue()
-    url_repository = container.url_repository()
-    visits_repository = container.visits_repository()
+    worker = LogWorker(
+        message_queue=container.message_queue(),
+        url_repository_factory=container.url_repository,
+        visits_repository_factory=container.visits_repository,
+        visit_rollup_repository_factory=container.visit_rollup_repository,
+        writers=settings.log_worker_writers,
+        min_batch_size=settings.log_worker_min_batch_size,
+        max_batch_size=settings.log_worker_max_batch_size,
+        target_commit_latency=settings.log_worker_target_commit_latency,
+        idle_sleep=settings.log_worker_idle_sleep,
+        counter_flush_interval=settings.log_worker_counter_flush_interval,
+        update_visit_counts=not visit_counter.enabled,
+    )
+    if settings.log_worker_metrics_port:
+        REGISTRY.register_collector(worker.collect_metrics)
+        REGISTRY.register_collector(pool_collector(container.shard_databases()))
+        REGISTRY.register_collector(
+            queue_depth_collector(worker.message_queue), shared=True
+        )
+        await start_metrics_server(
+            REGISTRY.collect, port=settings.log_worker_metrics_port
+        )
+    if not visit_counter.enabled:
+        await worker.run()
+        return
 
-    worker = LogWorker(message_queue, url_repository, visits_repository)
-    await worker.run()
+    flusher = VisitCounterFlusher(
+        visit_counter,
+        url_repository_factory=container.url_repository,
+        interval=settings.visit_counter_flush_interval,
+        chunk_size=settings.visit_counter_flush_chunk_size,
+    )
+    await asyncio.gather(worker.run(), flusher.run())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.infrastructures.dependency_injection.app_container import AppContainer
+from src.core.infrastructures.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "visit"
+PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(moment: date) -> date:
+    return moment.replace(day=1)
+
+
+def next_month(moment: date) -> date:
+    return (moment.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+class VisitPartitionManager:
+    """
+    Keeps the monthly partitions of the `visit` table in shape: creates the
+    partitions for the current month and the next `premake_months`, and
+    detaches every partition that ends more than `retention_days` ago.
+    Detached partitions are dropped unless `drop_detached` is off, in which
+    case they are left as plain tables to be archived.
+
+    Run it at least once a month, e.g. daily from cron.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        premake_months: int = 3,
+        retention_days: int = 0,
+        drop_detached: bool = True,
+    ):
+        self.session = session
+        self.premake_months = premake_months
+        self.retention_days = retention_days
+        self.drop_detached = drop_detached
+
+    async def list_partitions(self) -> dict[date, str]:
+        """Returns the monthly partitions attached to the table by month."""
+        result = await self.session.execute(
+            text(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :parent
+                """
+            ),
+            {"parent": PARENT_TABLE},
+        )
+        partitions = {}
+        for (name,) in result:
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+    async def default_partition(self) -> str | None:
+        """Returns the name of the default partition of the table, if any."""
+        result = await self.session.execute(
+            text(
+                """
+                SELECT NULLIF(partdefid, 0)::regclass::text
+                FROM pg_partitioned_table
+                WHERE partrelid = CAST(:parent AS regclass)
+                """
+            ),
+            {"parent": PARENT_TABLE},
+        )
+        return result.scalar_one_or_none()
+
+    async def create_partition(self, month: date, default: str | None) -> str:
+        """
+        Creates the partition of `month`. Visits of that month that landed in
+        the default partition meanwhile, e.g. because a run was missed, would
+        make a plain CREATE fail on the default's constraint, so the default
+        is detached while they are moved into the new partition and attached
+        again afterwards. The caller commits; until then the table is locked.
+        """
+        name = partition_name(month)
+        # Bounds are dates in UTC, like the buckets of the rollups.
+        start, end = f"{month} 00:00+00", f"{next_month(month)} 00:00+00"
+        in_month = f"visited_at >= '{start}' AND visited_at < '{end}'"
+        create = (
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        strays = 0
+        if default:
+            # Keeps visits from landing in the default until the commit.
+            await self.session.execute(text(f"LOCK TABLE {default} IN SHARE MODE"))
+            strays = await self.session.scalar(
+                text(f"SELECT count(*) FROM {default} WHERE {in_month}")
+            )
+        if not strays:
+            await self.session.execute(text(create))
+            return name
+
+        columns = "id, visitor_ip, url_id, visited_at"
+        for statement in (
+            f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {default}",
+            create,
+            f"INSERT INTO {PARENT_TABLE} ({columns}) "
+            f"SELECT {columns} FROM {default} WHERE {in_month}",
+            f"DELETE FROM {default} WHERE {in_month}",
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {default} DEFAULT",
+        ):
+            await self.session.execute(text(statement))
+        logger.warning(
+            f"Moved {strays} visits from {default} into the new partition {name}."
+        )
+        return name
+
+    async def ensure_partitions(self, today: date) -> list[str]:
+        """Creates the missing partitions from this month onwards."""
+        existing = await self.list_partitions()
+        default = await self.default_partition()
+        created = []
+        month = month_start(today)
+        for _ in range(self.premake_months + 1):
+            if month not in existing:
+                created.append(await self.create_partition(month, default))
+            month = next_month(month)
+        await self.session.commit()
+        return created
+
+    async def expire_partitions(self, today: date) -> list[str]:
+        """Detaches, and drops, the partitions past the retention period."""
+        if not self.retention_days:
+            return []
+
+        cutoff = today - timedelta(days=self.retention_days)
+        expired = []
+        for month, name in sorted((await self.list_partitions()).items()):
+            if next_month(month) > cutoff:
+                continue
+            await self.session.execute(
+                text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+            )
+            if self.drop_detached:
+                await self.session.execute(text(f"DROP TABLE {name}"))
+            await self.session.commit()
+            expired.append(name)
+        return expired
+
+    async def run(self, today: date | None = None) -> None:
+        today = today or datetime.now(timezone.utc).date()
+        created = await self.ensure_partitions(today)
+        if created:
+            logger.info(f"Created visit partitions: {', '.join(created)}.")
+        expired = await self.expire_partitions(today)
+        if expired:
+            action = "Dropped" if self.drop_detached else "Detached"
+            logger.info(f"{action} visit partitions: {', '.join(expired)}.")
+
+
+async def main():
+    setup_logging()
+    container = AppContainer()
+    settings = container.settings()
+
+    # Every shard holds its own visit table.
+    for database in container.shard_databases():
+        manager = VisitPartitionManager(
+            database.get_session(),
+            premake_months=settings.visit_partition_premake_months,
+            retention_days=settings.visit_retention_days,
+            drop_detached=settings.visit_partition_drop_detached,
+        )
+        try:
+            await manager.run()
+        finally:
+            await database.close_session()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
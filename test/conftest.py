@@ -2,6 +2,8 @@ from typing import AsyncGenerator
 
 import pytest
 import pytest_asyncio
+import redis.asyncio
+from fakeredis import FakeAsyncRedis, FakeServer
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -23,6 +25,7 @@ def test_settings() -> Settings:
         _env_file=".env.test",
         cache_type="in-memory",
         message_queue_type="in-memory",
+        short_code_filter_type="in-memory",
     )
 
 
@@ -88,3 +91,15 @@ def url_visits_service(test_container: AppContainer) -> UrlVisitsService:
 @pytest.fixture
 def message_queue(test_container: AppContainer) -> InMemoryMessageQueue:
     return test_container.message_queue()
+
+
+@pytest.fixture
+def fake_redis_server(monkeypatch: pytest.MonkeyPatch) -> FakeServer:
+    """Makes every `redis.asyncio.from_url` client talk to one in-process fake."""
+    server = FakeServer()
+    monkeypatch.setattr(
+        redis.asyncio,
+        "from_url",
+        lambda url, **kwargs: FakeAsyncRedis(server=server, **kwargs),
+    )
+    return server
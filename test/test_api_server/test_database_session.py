@@ -0,0 +1,71 @@
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from src.api_server.app import AppContainer, create_app
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def session_client(
+    test_container: AppContainer,
+) -> AsyncGenerator[AsyncClient, None]:
+    # Routes use the container's own task-scoped sessions.
+    test_container.db_session.reset_override()
+    app = create_app()
+    app.container = test_container
+    test_container.wire(modules=["src.api_server.routes.shorten"])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    test_container.unwire()
+    await test_container.database()._engine.dispose()
+
+
+class TestDatabaseSessionMiddleware:
+    async def test_connection_is_returned_after_read_only_request(
+        self, session_client: AsyncClient, test_container: AppContainer
+    ):
+        response = await session_client.post(
+            "/shorten", json={"url": "https://example.com/"}
+        )
+
+        response = await session_client.get(f"/stats/{response.json()['short_code']}")
+
+        assert response.status_code == 200
+        stats = test_container.database().pool_stats()["primary"]
+        assert stats["checkouts"] > 0
+        assert stats["in_use"] == 0
+
+    async def test_failed_request_releases_its_connection(
+        self, session_client: AsyncClient, test_container: AppContainer
+    ):
+        await session_client.post(
+            "/shorten", json={"url": "https://example.com/", "custom_code": "taken"}
+        )
+
+        response = await session_client.post(
+            "/shorten", json={"url": "https://example.com/", "custom_code": "taken"}
+        )
+
+        assert response.status_code == 409
+        assert test_container.database().pool_stats()["primary"]["in_use"] == 0
+
+    async def test_cache_hit_does_not_check_out_a_connection(
+        self, session_client: AsyncClient, test_container: AppContainer
+    ):
+        response = await session_client.post(
+            "/shorten", json={"url": "https://example.com/"}
+        )
+        short_code = response.json()["short_code"]
+        await session_client.get(f"/{short_code}")
+        checkouts = test_container.database().pool_stats()["primary"]["checkouts"]
+
+        response = await session_client.get(f"/{short_code}")
+
+        assert response.status_code == 307
+        stats = test_container.database().pool_stats()["primary"]
+        assert stats["checkouts"] == checkouts
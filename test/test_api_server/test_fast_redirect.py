@@ -0,0 +1,58 @@
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from src.api_server.app import AppContainer, create_app
+from src.core.shorten.services.url_shorten_service import UrlShortenService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def fast_client(
+    test_container: AppContainer,
+) -> AsyncGenerator[AsyncClient, None]:
+    app = create_app()
+    app.container = test_container
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await test_container.database().close_session()
+
+
+class TestFastRedirectMiddleware:
+    async def test_redirects_known_short_code(
+        self, fast_client: AsyncClient, url_shorten_service: UrlShortenService
+    ):
+        url = await url_shorten_service.create_short_url(
+            "https://www.example.com/a b", custom_code="fast"
+        )
+
+        response = await fast_client.get(f"/{url.short_code}")
+
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://www.example.com/a%20b"
+
+    async def test_head_is_answered_like_the_route(
+        self, fast_client: AsyncClient, url_shorten_service: UrlShortenService
+    ):
+        url = await url_shorten_service.create_short_url("https://www.example.com/")
+
+        response = await fast_client.head(f"/{url.short_code}")
+
+        assert response.status_code == 405
+        assert response.headers["allow"] == "GET"
+
+    async def test_unknown_short_code_returns_404(self, fast_client: AsyncClient):
+        response = await fast_client.get("/missing")
+
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Short code not found."}
+
+    async def test_other_routes_are_passed_through(self, fast_client: AsyncClient):
+        response = await fast_client.get("/openapi.json")
+
+        assert response.status_code == 200
+        assert response.json()["info"]["title"] == "Yet Another URL Shortener"
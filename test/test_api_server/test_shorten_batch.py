@@ -0,0 +1,76 @@
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from dependency_injector import providers
+from httpx import ASGITransport, AsyncClient
+
+from src.api_server.app import AppContainer, create_app
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def batch_client(
+    test_container: AppContainer,
+) -> AsyncGenerator[AsyncClient, None]:
+    app = create_app()
+    app.container = test_container
+    test_container.wire(modules=["src.api_server.routes.shorten"])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    test_container.unwire()
+
+
+class TestShortenBatch:
+    async def test_json_batch_returns_results_in_input_order(
+        self, batch_client: AsyncClient
+    ):
+        urls = ["https://a.example/", "https://b.example/", "https://a.example/"]
+
+        response = await batch_client.post("/shorten/batch", json={"urls": urls})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["original_url"] for result in results] == urls
+        assert results[0]["short_code"] == results[2]["short_code"]
+        assert results[0]["short_code"] != results[1]["short_code"]
+
+    async def test_ndjson_batch(self, batch_client: AsyncClient):
+        body = b'{"url": "https://a.example/"}\n\n{"url": "https://b.example/"}'
+
+        response = await batch_client.post(
+            "/shorten/batch",
+            content=body,
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        assert [r["original_url"] for r in response.json()["results"]] == [
+            "https://a.example/",
+            "https://b.example/",
+        ]
+
+    async def test_invalid_url_is_rejected(self, batch_client: AsyncClient):
+        response = await batch_client.post(
+            "/shorten/batch",
+            content=b'{"url": "not a url"}\n',
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 422
+
+    async def test_oversized_batch_is_rejected(
+        self, batch_client: AsyncClient, test_container: AppContainer
+    ):
+        settings = test_container.settings().model_copy(
+            update={"shorten_batch_max_size": 1}
+        )
+        test_container.settings.override(providers.Object(settings))
+
+        response = await batch_client.post(
+            "/shorten/batch", json={"urls": ["https://a.example", "https://b.example"]}
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,93 @@
+import pytest
+from fakeredis import FakeServer
+
+from src.core.common.settings import Settings
+from src.core.infrastructures.bloom_filter.redis import RedisBloomFilter
+
+pytestmark = pytest.mark.asyncio
+
+
+async def batches(*batches: list[str]):
+    for batch in batches:
+        yield batch
+
+
+@pytest.fixture
+def bloom_filter(fake_redis_server: FakeServer) -> RedisBloomFilter:
+    return RedisBloomFilter("redis://fake", capacity=1000)
+
+
+class TestRedisBloomFilter:
+    async def test_lets_everything_through_until_rebuilt(
+        self, bloom_filter: RedisBloomFilter
+    ):
+        assert await bloom_filter.might_contain("unknown")
+
+        await bloom_filter.rebuild(batches(["a", "b"], ["c"]))
+
+        assert await bloom_filter.is_ready()
+        assert not await bloom_filter.might_contain("unknown")
+        for item in ("a", "b", "c"):
+            assert await bloom_filter.might_contain(item)
+
+    async def test_rebuild_keeps_items_added_meanwhile(
+        self, bloom_filter: RedisBloomFilter
+    ):
+        async def rebuild_batches():
+            yield ["old"]
+            # Added by a request while the rebuild reads the database.
+            await bloom_filter.add("new")
+            yield ["older"]
+
+        await bloom_filter.rebuild(rebuild_batches())
+
+        for item in ("old", "older", "new"):
+            assert await bloom_filter.might_contain(item)
+
+    async def test_only_one_replica_rebuilds(
+        self, bloom_filter: RedisBloomFilter, fake_redis_server: FakeServer
+    ):
+        other = RedisBloomFilter("redis://fake", capacity=1000)
+        await bloom_filter.redis.set(bloom_filter.lock_key, 1)
+
+        await other.rebuild(batches(["a"]))
+
+        assert not await other.is_ready()
+        await bloom_filter.redis.delete(bloom_filter.lock_key)
+        await other.rebuild(batches(["a"]))
+        assert await bloom_filter.is_ready()
+        assert not await bloom_filter.redis.exists(bloom_filter.lock_key)
+
+    async def test_missing_ready_marker_fails_open(
+        self, bloom_filter: RedisBloomFilter
+    ):
+        await bloom_filter.rebuild(batches(["a"]))
+
+        await bloom_filter.redis.delete(bloom_filter.ready_key)
+
+        assert await bloom_filter.might_contain("unknown")
+
+    async def test_redis_errors_fail_open(
+        self, bloom_filter: RedisBloomFilter, fake_redis_server: FakeServer
+    ):
+        await bloom_filter.rebuild(batches(["a"]))
+
+        fake_redis_server.connected = False
+
+        assert await bloom_filter.might_contain("unknown")
+
+
+class TestShortCodeFilterType:
+    async def test_only_a_shared_cache_gets_a_filter_by_default(self):
+        local = Settings(
+            _env_file=None, cache_type="in-memory", message_queue_type="in-memory"
+        )
+        shared = Settings(
+            _env_file=None,
+            cache_type="two-tier",
+            message_queue_type="in-memory",
+            redis_dsn="redis://localhost",
+        )
+
+        assert local.short_code_filter_type == "none"
+        assert shared.short_code_filter_type == "redis"
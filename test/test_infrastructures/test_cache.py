@@ -0,0 +1,167 @@
+import asyncio
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from src.core.infrastructures.cache.decorators import cache
+from src.core.infrastructures.cache.inmemory_cache import InMemoryCacheStorage
+from src.core.shorten.schemas.resolved_url import ResolvedUrl, ResolvedUrlSerializer
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestInMemoryCacheStorage:
+    async def test_get_returns_value_until_it_expires(self):
+        cache = InMemoryCacheStorage()
+        await cache.set("key", "value", expire=1)
+
+        assert await cache.get("key") == "value"
+
+        await asyncio.sleep(1.05)
+        assert await cache.get("key") is None
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+
+    async def test_evicts_least_recently_used_entry(self):
+        cache = InMemoryCacheStorage(max_entries=2, admission=False)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")
+
+        await cache.set("c", "3")
+
+        assert await cache.get("a") == "1"
+        assert await cache.get("b") is None
+        assert cache.evictions == 1
+
+    async def test_admission_keeps_hot_keys_over_one_off_keys(self):
+        cache = InMemoryCacheStorage(max_entries=2)
+        await cache.set("hot", "1")
+        await cache.set("warm", "2")
+        for _ in range(5):
+            await cache.get("hot")
+            await cache.get("warm")
+
+        for i in range(10):
+            await cache.set(f"scan-{i}", "x")
+
+        assert await cache.get("hot") == "1"
+        assert await cache.get("warm") == "2"
+        assert cache.rejections == 10
+
+    async def test_respects_byte_budget(self):
+        cache = InMemoryCacheStorage(max_bytes=1024, admission=False)
+        for i in range(100):
+            await cache.set(f"key-{i}", "x" * 100)
+
+        assert cache.size_bytes <= 1024
+        assert await cache.get("key-99") is not None
+
+    async def test_background_sweeper_reclaims_expired_entries(self):
+        cache = InMemoryCacheStorage(sweep_interval=0.05)
+        await cache.start()
+        await cache.set("key", "value", expire=1)
+
+        await asyncio.sleep(1.1)
+
+        assert len(cache) == 0
+        assert cache.expirations == 1
+        await cache.close()
+
+
+class _Value(BaseModel):
+    version: int
+
+
+class _Service:
+    def __init__(self, cache_namespace: str | None = None):
+        self.cache_storage = InMemoryCacheStorage()
+        self.cache_namespace = cache_namespace
+
+    @cache(prefix="lookup", key_args=["code"])
+    async def lookup(self, code: str, visitor: str | None = None) -> str:
+        return code
+
+
+class TestCacheDecorator:
+    async def test_key_only_contains_key_args(self):
+        service = _Service()
+
+        assert _Service.lookup.cache_key(service, "abc", visitor="x") == (
+            "lookup:lookup:(code=abc)"
+        )
+        assert _Service.lookup.cache_key(service, code="abc") == (
+            "lookup:lookup:(code=abc)"
+        )
+
+    async def test_key_is_prefixed_with_namespace(self):
+        service = _Service(cache_namespace="v2")
+
+        assert (
+            _Service.lookup.cache_key(service, "abc") == "v2:lookup:lookup:(code=abc)"
+        )
+
+    async def test_unknown_key_args_are_rejected(self):
+        with pytest.raises(ValueError, match="Unknown cache key arguments: missing"):
+            cache(prefix="broken", key_args=["missing"])(_Service.lookup)
+
+    async def test_concurrent_misses_share_one_call(self):
+        calls = 0
+
+        class Service:
+            cache_storage = InMemoryCacheStorage()
+
+            @cache(prefix="slow", key_args=["code"])
+            async def lookup(self, code: str) -> str | None:
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0.05)
+                return None
+
+        service = Service()
+        await asyncio.gather(*(service.lookup("abc") for _ in range(10)))
+
+        assert calls == 1
+        assert Service.lookup.stats.coalesced == 9
+
+    async def test_stale_value_is_served_while_refreshing_and_on_errors(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        clock = 1000.0
+        monkeypatch.setattr(time, "time", lambda: clock)
+        calls = 0
+        database_down = False
+
+        class Service:
+            cache_storage = InMemoryCacheStorage()
+
+            @cache(prefix="swr", key_args=["code"], soft_expire=10, expire=20, grace=30)
+            async def lookup(self, code: str) -> _Value | None:
+                nonlocal calls
+                calls += 1
+                if database_down:
+                    raise ConnectionError("database is down")
+                return _Value(version=calls)
+
+        service = Service()
+        assert (await service.lookup("abc")).version == 1
+
+        clock += 15
+        assert (await service.lookup("abc")).version == 1
+        await asyncio.sleep(0.01)
+        assert (await service.lookup("abc")).version == 2
+
+        database_down = True
+        clock += 25
+        assert (await service.lookup("abc")).version == 2
+        assert Service.lookup.stats.stale_hits == 1
+        assert Service.lookup.stats.stale_on_error == 1
+
+
+class TestResolvedUrlSerializer:
+    async def test_round_trip_keeps_separators_in_url(self):
+        serializer = ResolvedUrlSerializer()
+        record = ResolvedUrl(42, "https://example.com/?q=a|b")
+
+        assert serializer.loads(serializer.dumps(record)) == record
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from src.core.infrastructures.message_queue.buffer import MessageBuffer
+from src.core.infrastructures.message_queue.in_memory import InMemoryMessageQueue
+
+pytestmark = pytest.mark.asyncio
+
+
+class FlakyMessageQueue(InMemoryMessageQueue):
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+        self.calls = 0
+
+    async def publish_many(self, messages: list[dict]):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("queue is down")
+        await super().publish_many(messages)
+
+
+class TestMessageBuffer:
+    async def test_publishes_in_one_batch_once_full(self):
+        queue = FlakyMessageQueue()
+        queue.fail = False
+        buffer = MessageBuffer(queue, max_size=3, flush_interval=60)
+
+        for i in range(3):
+            buffer.put({"n": i})
+        await asyncio.sleep(0)
+
+        assert await queue.get_batch(10) == [{"n": 0}, {"n": 1}, {"n": 2}]
+        assert queue.calls == 1
+        assert buffer.stats()["depth"] == 0
+        assert buffer.stats()["published"] == 3
+
+    async def test_publishes_after_flush_interval(self):
+        queue = InMemoryMessageQueue()
+        buffer = MessageBuffer(queue, max_size=100, flush_interval=0.01)
+
+        buffer.put({"n": 1})
+        assert await queue.get_batch(10) == []
+
+        await asyncio.sleep(0.05)
+        assert await queue.get_batch(10) == [{"n": 1}]
+
+    async def test_keeps_messages_when_publish_fails(self):
+        queue = FlakyMessageQueue()
+        buffer = MessageBuffer(queue, max_size=100, flush_interval=60, max_pending=2)
+
+        for i in range(3):
+            buffer.put({"n": i})
+        await buffer.flush()
+
+        assert len(buffer) == 2
+        assert buffer.dropped == 1
+        assert buffer.failed_flushes == 1
+
+        queue.fail = False
+        await buffer.close()
+        assert await queue.get_batch(10) == [{"n": 0}, {"n": 1}]
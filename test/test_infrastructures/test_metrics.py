@@ -0,0 +1,153 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from src.api_server.app import AppContainer, create_app
+from src.core.infrastructures.message_queue.in_memory import InMemoryMessageQueue
+from src.core.infrastructures.metrics.collectors import queue_depth_collector
+from src.core.infrastructures.metrics.multiprocess import (
+    MultiprocessMetrics,
+    mark_process_dead,
+)
+from src.core.infrastructures.metrics.registry import MetricsRegistry, render
+from src.core.infrastructures.metrics.server import start_metrics_server
+from src.core.shorten.services.url_shorten_service import UrlShortenService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def metrics_client(
+    test_container: AppContainer,
+) -> AsyncGenerator[AsyncClient, None]:
+    app = create_app()
+    app.container = test_container
+    test_container.wire(
+        modules=["src.api_server.routes.metrics", "src.api_server.routes.shorten"]
+    )
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    test_container.unwire()
+    await test_container.database().close_session()
+
+
+class TestMetricsRegistry:
+    async def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "latency_seconds", "Latency.", ["route"], buckets=(0.1, 1)
+        )
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(5, "/a")
+
+        text = render(await registry.collect())
+
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1.0' in text
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 2.0' in text
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3.0' in text
+        assert 'latency_seconds_count{route="/a"} 3.0' in text
+        assert 'latency_seconds_sum{route="/a"} 5.55' in text
+
+    async def test_queue_depth_collector(self):
+        queue = InMemoryMessageQueue()
+        await queue.publish_many([{"url_id": 1}, {"url_id": 2}])
+
+        [family] = await queue_depth_collector(queue)()
+
+        assert family.samples[0].value == 2
+
+
+class TestMultiprocessMetrics:
+    async def test_scrape_adds_up_every_process(self, tmp_path: Path):
+        registry = MetricsRegistry()
+        registry.counter("visits", "Visits.").inc(amount=2)
+        registry.gauge("in_use", "In use.").set(1)
+        other = tmp_path / "12345.json"
+        other.write_text(
+            json.dumps(
+                [
+                    {
+                        "name": "visits",
+                        "type": "counter",
+                        "help": "Visits.",
+                        "samples": [["visits_total", {}, 3]],
+                    },
+                    {
+                        "name": "in_use",
+                        "type": "gauge",
+                        "help": "In use.",
+                        "samples": [["in_use", {}, 4]],
+                    },
+                ]
+            )
+        )
+        metrics = MultiprocessMetrics(registry, str(tmp_path))
+
+        text = render(await metrics.collect())
+        mark_process_dead(str(tmp_path), 12345)
+        after_exit = render(await metrics.collect())
+
+        assert "visits_total 5.0" in text
+        assert "in_use 5.0" in text
+        assert "visits_total 5.0" in after_exit
+        assert "in_use 1.0" in after_exit
+
+    async def test_snapshot_leaves_out_shared_collectors(self, tmp_path: Path):
+        registry = MetricsRegistry()
+        registry.register_collector(
+            queue_depth_collector(InMemoryMessageQueue()), shared=True
+        )
+        metrics = MultiprocessMetrics(registry, str(tmp_path))
+
+        await metrics.write_snapshot()
+
+        assert json.loads((tmp_path / f"{metrics.pid}.json").read_text()) == []
+
+
+class TestMetricsEndpoint:
+    async def test_routes_are_recorded_by_template(
+        self,
+        metrics_client: AsyncClient,
+        url_shorten_service: UrlShortenService,
+    ):
+        url = await url_shorten_service.create_short_url("https://example.com/")
+        await metrics_client.get(f"/{url.short_code}")
+        await metrics_client.get("/stats/missing")
+
+        response = await metrics_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/{short_code}",status="307"}'
+        ) in response.text
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/stats/{short_code}",status="404"}'
+        ) in response.text
+
+
+class TestMetricsServer:
+    async def test_serves_metrics_over_http(self):
+        registry = MetricsRegistry()
+        registry.counter("batches", "Batches.").inc()
+        server = await start_metrics_server(registry.collect, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+        assert response.startswith(b"HTTP/1.0 200 OK")
+        assert b"batches_total 1.0" in response
@@ -0,0 +1,87 @@
+import pytest
+from fakeredis import FakeServer
+
+from src.core.infrastructures.message_queue.redis_stream import (
+    MESSAGE_ID_KEY,
+    RedisStreamMessageQueue,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def stream_queue(consumer_name: str, **kwargs) -> RedisStreamMessageQueue:
+    kwargs.setdefault("claim_idle_ms", 0)
+    return RedisStreamMessageQueue(
+        "redis://fake", consumer_name=consumer_name, block_ms=10, **kwargs
+    )
+
+
+def url_ids(messages: list[dict]) -> list[int]:
+    return [message["url_id"] for message in messages]
+
+
+class TestRedisStreamMessageQueue:
+    async def test_unacked_messages_are_taken_over(self, fake_redis_server: FakeServer):
+        first = stream_queue("first", claim_idle_ms=60_000)
+        second = stream_queue("second")
+        await first.publish_many([{"url_id": 1}, {"url_id": 2}])
+
+        batch = await first.get_batch(10)
+        await first.ack(batch[:1])
+
+        assert url_ids(batch) == [1, 2]
+        assert url_ids(await second.get_batch(10)) == [2]
+        assert await first.depth() == 1
+
+    async def test_acked_messages_are_not_redelivered(
+        self, fake_redis_server: FakeServer
+    ):
+        queue = stream_queue("worker")
+        await queue.publish({"url_id": 1})
+
+        await queue.ack(await queue.get_batch(10))
+
+        assert await queue.get_batch(10) == []
+        assert await queue.depth() == 0
+
+    async def test_claims_continue_from_the_cursor(self, fake_redis_server: FakeServer):
+        dead = stream_queue("dead", claim_idle_ms=60_000)
+        await dead.publish_many([{"url_id": i} for i in range(5)])
+        await dead.get_batch(10)
+        queue = stream_queue("worker")
+
+        claimed = []
+        for _ in range(3):
+            batch = await queue.get_batch(2)
+            claimed += url_ids(batch)
+            await queue.ack(batch)
+
+        assert claimed == [0, 1, 2, 3, 4]
+
+    async def test_recovers_from_a_lost_group(self, fake_redis_server: FakeServer):
+        queue = stream_queue("worker")
+        await queue.publish({"url_id": 1})
+        await queue.ack(await queue.get_batch(10))
+
+        await queue.redis.xgroup_destroy(queue.stream_name, queue.group_name)
+        await queue.publish({"url_id": 2})
+
+        assert await queue.get_batch(10) == []
+        # The group is recreated from the start of the stream.
+        assert url_ids(await queue.get_batch(10)) == [1, 2]
+
+    async def test_messages_that_keep_failing_are_dead_lettered(
+        self, fake_redis_server: FakeServer
+    ):
+        queue = stream_queue("worker", max_deliveries=2)
+        await queue.publish_many([{"url_id": 1}, {"url_id": 2}])
+
+        batches = [await queue.get_batch(10) for _ in range(3)]
+
+        assert [url_ids(batch) for batch in batches] == [[1, 2], [1, 2], []]
+        dead = await queue.redis.xrange(queue.dead_letter_name)
+        assert [fields["message_id"] for _, fields in dead] == [
+            message[MESSAGE_ID_KEY] for message in batches[0]
+        ]
+        assert {fields["deliveries"] for _, fields in dead} == {"3"}
+        assert await queue.depth() == 0
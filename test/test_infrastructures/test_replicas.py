@@ -0,0 +1,74 @@
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.core.common.settings import Settings
+from src.core.infrastructures.database.replicas import ReplicaSet
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+
+pytestmark = pytest.mark.asyncio
+
+UNREACHABLE_DSN = "postgresql+asyncpg://postgres@127.0.0.1:1/unreachable"
+
+
+@pytest_asyncio.fixture
+async def replicas(test_settings: Settings) -> AsyncGenerator[ReplicaSet, None]:
+    # The test database stands in for a healthy replica.
+    replicas = ReplicaSet(
+        [
+            create_async_engine(str(test_settings.postgres_dsn)),
+            create_async_engine(UNREACHABLE_DSN),
+        ],
+        retry_interval=60,
+    )
+    yield replicas
+    await replicas.dispose()
+
+
+class TestReplicaSet:
+    async def test_failed_replica_is_skipped(self, replicas: ReplicaSet):
+        healthy, unreachable = replicas.replicas
+        results = [await replicas.execute(select(1)) for _ in range(4)]
+
+        assert [result is not None for result in results] == [True, False, True, True]
+        assert unreachable.down_until > healthy.down_until
+
+    async def test_lagging_replica_is_skipped(self, replicas: ReplicaSet):
+        await replicas.check_lag()
+        replicas.replicas[0].lag = replicas.max_lag + 1
+
+        assert replicas.pick() is None
+
+
+class TestUrlRepositoryReplicaReads:
+    async def test_reads_fall_back_to_primary(
+        self, db_session: AsyncSession, replicas: ReplicaSet
+    ):
+        repository = UrlRepository(URL, db_session, replicas=replicas)
+        replicas.mark_down(replicas.replicas[0])
+        # Uncommitted, so only visible on the primary session.
+        db_session.add(URL(original_url="https://a.example", short_code="primary"))
+        await db_session.flush()
+
+        url = await repository.get_by_short_code("primary")
+
+        assert url.original_url == "https://a.example"
+
+    async def test_replica_misses_are_retried_on_primary(
+        self, db_session: AsyncSession, replicas: ReplicaSet
+    ):
+        replicas.mark_down(replicas.replicas[1])
+        db_session.add(URL(original_url="https://a.example", short_code="fresh"))
+        await db_session.flush()
+
+        fresh = UrlRepository(URL, db_session, replicas=replicas)
+        stale = UrlRepository(
+            URL, db_session, replicas=replicas, read_your_writes=False
+        )
+
+        assert (await fresh.get_by_short_code("fresh")).short_code == "fresh"
+        assert await stale.get_by_short_code("fresh") is None
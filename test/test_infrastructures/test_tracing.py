@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from dependency_injector import providers
+from httpx import ASGITransport, AsyncClient
+
+from src.api_server.app import AppContainer, create_app
+from src.core.infrastructures.tracing.exporters import (
+    NdjsonSpanExporter,
+    OtlpHttpSpanExporter,
+    SpanRecord,
+)
+from src.core.infrastructures.tracing.tracer import Tracer, span
+from src.core.shorten.services.url_shorten_service import UrlShortenService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def tracer(tmp_path: Path) -> Tracer:
+    return Tracer(NdjsonSpanExporter(str(tmp_path / "traces.ndjson")))
+
+
+@pytest_asyncio.fixture
+async def tracing_client(
+    test_container: AppContainer, tracer: Tracer
+) -> AsyncGenerator[AsyncClient, None]:
+    test_container.tracer.override(providers.Object(tracer))
+    app = create_app()
+    app.container = test_container
+    test_container.wire(modules=["src.api_server.routes.shorten"])
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    test_container.unwire()
+    test_container.tracer.reset_override()
+    await test_container.database().close_session()
+
+
+def server_timing_phases(header: str) -> dict[str, str]:
+    return dict(metric.split(";", 1) for metric in header.split(", "))
+
+
+class TestTracingMiddleware:
+    async def test_no_header_when_disabled(self, tracing_client: AsyncClient):
+        response = await tracing_client.get("/stats/missing")
+
+        assert "server-timing" not in response.headers
+
+    async def test_server_timing_breaks_down_phases(
+        self,
+        tracing_client: AsyncClient,
+        tracer: Tracer,
+        url_shorten_service: UrlShortenService,
+    ):
+        tracer.server_timing = True
+        url = await url_shorten_service.create_short_url("https://example.com/")
+
+        response = await tracing_client.get(f"/stats/{url.short_code}")
+
+        phases = server_timing_phases(response.headers["server-timing"])
+        assert {"db", "handler", "di", "serialize", "total"} <= phases.keys()
+        assert "trace" not in phases
+
+    async def test_sampled_spans_are_exported(
+        self,
+        tracing_client: AsyncClient,
+        tracer: Tracer,
+        tmp_path: Path,
+        url_shorten_service: UrlShortenService,
+    ):
+        tracer.sample_rate = 1.0
+        url = await url_shorten_service.create_short_url("https://example.com/")
+
+        response = await tracing_client.get(f"/stats/{url.short_code}")
+        await tracer.export()
+
+        spans = [
+            json.loads(line)
+            for line in (tmp_path / "traces.ndjson").read_text().splitlines()
+        ]
+        root = next(s for s in spans if s["parent_span_id"] is None)
+        assert root["name"] == "GET /stats/{short_code}"
+        assert root["attributes"]["http.status_code"] == 200
+        assert {s["trace_id"] for s in spans} == {root["trace_id"]}
+        assert f'trace;desc="{root["trace_id"]}"' in response.headers["server-timing"]
+        assert any(s["name"].startswith("db.UrlRepository.") for s in spans)
+
+
+class TestSpans:
+    async def test_span_outside_a_trace_is_a_noop(self):
+        with span("cache.get") as current:
+            current.set_attribute("key", "value")
+
+    async def test_otlp_encoding(self):
+        exporter = OtlpHttpSpanExporter("http://collector/v1/traces", "kurt")
+        root = SpanRecord("a" * 32, "b" * 16, None, "GET /", 0, 10, {"ok": True})
+        child = SpanRecord("a" * 32, "c" * 16, "b" * 16, "db.get", 1, 2, {"error": "E"})
+
+        [resource] = exporter.encode([root, child])["resourceSpans"]
+        encoded_root, encoded_child = resource["scopeSpans"][0]["spans"]
+
+        assert resource["resource"]["attributes"] == [
+            {"key": "service.name", "value": {"stringValue": "kurt"}}
+        ]
+        assert encoded_root["kind"] == 2
+        assert "parentSpanId" not in encoded_root
+        assert encoded_root["attributes"] == [
+            {"key": "ok", "value": {"boolValue": True}}
+        ]
+        assert encoded_child["parentSpanId"] == "b" * 16
+        assert encoded_child["status"] == {"code": 2}
+        assert encoded_child["endTimeUnixNano"] == "2"
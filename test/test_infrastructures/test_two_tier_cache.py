@@ -0,0 +1,129 @@
+import asyncio
+from typing import AsyncGenerator, Awaitable, Callable
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+
+from src.core.infrastructures.cache import two_tier_cache
+from src.core.infrastructures.cache.inmemory_cache import InMemoryCacheStorage
+from src.core.infrastructures.cache.two_tier_cache import TwoTierCacheStorage
+
+pytestmark = pytest.mark.asyncio
+
+CHANNEL = "cache-invalidation"
+
+
+async def _eventually(condition: Callable[[], Awaitable[bool]], timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def _all_subscribed(nodes: list[TwoTierCacheStorage]) -> bool:
+    [(_, count)] = await nodes[0]._redis.pubsub_numsub(CHANNEL)
+    return count == len(nodes)
+
+
+async def _is_missing(node: TwoTierCacheStorage, key: str) -> bool:
+    return await node.get(key) is None
+
+
+async def _is_missing_from_l1(node: TwoTierCacheStorage, key: str) -> bool:
+    return await node._near.get(key) is None
+
+
+@pytest.fixture
+def remote() -> InMemoryCacheStorage:
+    return InMemoryCacheStorage()
+
+
+@pytest_asyncio.fixture
+async def nodes(
+    fake_redis_server: FakeServer, remote: InMemoryCacheStorage
+) -> AsyncGenerator[list[TwoTierCacheStorage], None]:
+    nodes = [TwoTierCacheStorage(remote, "redis://fake") for _ in range(2)]
+    for node in nodes:
+        await node.start()
+    await _eventually(lambda: _all_subscribed(nodes))
+    yield nodes
+    for node in nodes:
+        await node.close()
+
+
+class TestTwoTierCacheStorage:
+    async def test_reads_are_served_from_l1_after_the_first_l2_hit(
+        self, nodes: list[TwoTierCacheStorage]
+    ):
+        writer, reader = nodes
+        await writer.set("key", "value")
+
+        assert await writer.get("key") == "value"
+        assert await reader.get("key") == "value"
+        assert await reader.get("key") == "value"
+        assert await reader.get("missing") is None
+
+        assert (writer.l1_hits, writer.l2_hits) == (1, 0)
+        stats = reader.stats()
+        assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (1, 1, 1)
+        assert stats["l1_hit_ratio"] == pytest.approx(1 / 3)
+
+    async def test_writes_invalidate_l1_on_other_nodes(
+        self, nodes: list[TwoTierCacheStorage]
+    ):
+        writer, reader = nodes
+        await writer.set("key", "old")
+        assert await reader.get("key") == "old"
+
+        await writer.set("key", "new")
+
+        async def reader_sees_new_value() -> bool:
+            return await reader.get("key") == "new"
+
+        await _eventually(reader_sees_new_value)
+        await writer.delete("key")
+        await _eventually(lambda: _is_missing(reader, "key"))
+
+    async def test_l1_is_cleared_when_the_subscription_is_reestablished(
+        self,
+        nodes: list[TwoTierCacheStorage],
+        remote: InMemoryCacheStorage,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(two_tier_cache, "RECONNECT_INTERVAL", 0.01)
+        writer, reader = nodes
+        await remote.set("key", "old")
+        assert await reader.get("key") == "old"
+        # Changed without an invalidation, as if it had been lost.
+        await remote.set("key", "new")
+
+        async def drop_connection(key: str):
+            raise ConnectionError("Connection lost")
+
+        # The listener fails on the next invalidation and subscribes again.
+        monkeypatch.setattr(reader._near, "delete", drop_connection)
+        await writer.set("other", "value")
+        await _eventually(lambda: _is_missing_from_l1(reader, "key"))
+        monkeypatch.undo()
+
+        assert await reader.get("key") == "new"
+        await _eventually(lambda: _all_subscribed(nodes))
+
+    async def test_l1_is_bounded_and_expires(
+        self, fake_redis_server: FakeServer, remote: InMemoryCacheStorage
+    ):
+        node = TwoTierCacheStorage(
+            remote, "redis://fake", max_entries=2, near_cache_ttl=1
+        )
+        for key in ("a", "b", "c"):
+            await node.set(key, key)
+
+        assert node.stats()["l1_size"] <= 2
+
+        await node.get("c")
+        await remote.set("c", "changed")
+        assert await node.get("c") == "c"
+        await asyncio.sleep(1.05)
+        assert await node.get("c") == "changed"
+        await node.close()
@@ -0,0 +1,117 @@
+import pytest
+from fakeredis import FakeServer
+
+from src.core.infrastructures.visit_counter.redis import RedisVisitCounter
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def visit_counter(fake_redis_server: FakeServer) -> RedisVisitCounter:
+    return RedisVisitCounter("redis://fake", sync_interval=0.01)
+
+
+class TestRedisVisitCounter:
+    async def test_counts_visits_on_top_of_the_base(
+        self, visit_counter: RedisVisitCounter
+    ):
+        visit_counter.incr(1)
+        visit_counter.incr(1)
+        assert await visit_counter.get(1) == (None, 2)
+
+        await visit_counter.set_base(1, 40)
+        await visit_counter.set_base(1, 10)
+        await visit_counter.close()
+
+        other = RedisVisitCounter("redis://fake")
+        assert await other.get(1) == (40, 2)
+
+    async def test_flush_moves_pending_visits_into_the_base(
+        self, visit_counter: RedisVisitCounter
+    ):
+        for url_id in (1, 1, 2, 3):
+            visit_counter.incr(url_id)
+        await visit_counter.close()
+        flusher = RedisVisitCounter("redis://fake")
+
+        pending = await flusher.take_pending()
+        flusher.incr(1)
+        await flusher.complete_flush([1, 2, 3], {1: 12, 2: 21})
+        await flusher.end_flush()
+
+        assert pending == {1: 2, 2: 1, 3: 1}
+        assert await flusher.get(1) == (12, 1)
+        assert await flusher.get(2) == (21, 0)
+        # Url 3 was not found in the database.
+        assert await flusher.get(3) == (None, 0)
+
+    async def test_only_one_flusher_takes_pending_visits(
+        self, visit_counter: RedisVisitCounter
+    ):
+        visit_counter.incr(1)
+        await visit_counter.close()
+        first = RedisVisitCounter("redis://fake")
+        second = RedisVisitCounter("redis://fake")
+
+        assert await first.take_pending() == {1: 1}
+        assert await second.take_pending() == {}
+        await first.end_flush()
+        assert await second.take_pending() == {1: 1}
+
+    async def test_unfinished_flush_keeps_uncompleted_visits(
+        self, visit_counter: RedisVisitCounter
+    ):
+        for url_id in (1, 2, 3):
+            visit_counter.incr(url_id)
+        await visit_counter.close()
+        flusher = RedisVisitCounter("redis://fake")
+        await flusher.take_pending()
+        await flusher.complete_flush([1], {1: 5})
+        await flusher.end_flush()
+
+        flusher.incr(4)
+        await flusher.close()
+        retry = RedisVisitCounter("redis://fake")
+
+        # The unfinished flush is continued before newer visits are taken.
+        assert await retry.take_pending() == {2: 1, 3: 1}
+        await retry.complete_flush([2, 3], {2: 1, 3: 1})
+        await retry.end_flush()
+        assert await retry.take_pending() == {4: 1}
+
+    async def test_retried_flush_keeps_its_id(self, visit_counter: RedisVisitCounter):
+        for url_id in (1, 2):
+            visit_counter.incr(url_id)
+        await visit_counter.close()
+        flusher = RedisVisitCounter("redis://fake")
+        await flusher.take_pending()
+        flush_id = flusher.flush_id
+        await flusher.complete_flush([1], {1: 1})
+        await flusher.end_flush()
+
+        assert await flusher.take_pending() == {2: 1}
+        assert flusher.flush_id == flush_id
+        await flusher.complete_flush([2], {2: 1})
+        await flusher.end_flush()
+
+        flusher.incr(3)
+        await flusher.close()
+        flusher = RedisVisitCounter("redis://fake")
+        assert await flusher.take_pending() == {3: 1}
+        assert flusher.flush_id not in (None, flush_id)
+
+    async def test_lease_is_only_renewed_by_its_holder(
+        self, visit_counter: RedisVisitCounter
+    ):
+        visit_counter.incr(1)
+        await visit_counter.close()
+        first = RedisVisitCounter("redis://fake")
+        second = RedisVisitCounter("redis://fake")
+        await first.take_pending()
+
+        assert await first.renew_flush()
+        # The lease expired and another flusher took over.
+        await first._redis.delete(first._lock_key)
+        assert await second.take_pending() == {1: 1}
+        assert not await first.renew_flush()
+        assert await second.renew_flush()
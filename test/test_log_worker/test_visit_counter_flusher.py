@@ -0,0 +1,137 @@
+import pytest
+from fakeredis import FakeServer
+
+from src.core.infrastructures.visit_counter.redis import RedisVisitCounter
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.log_worker.visit_counter_flusher import VisitCounterFlusher
+
+pytestmark = pytest.mark.asyncio
+
+
+async def create_urls(url_repo: UrlRepository, count: int) -> list[int]:
+    url_ids = []
+    for i in range(count):
+        url = await url_repo.create(
+            obj_in=URL(original_url=f"https://example.com/{i}", short_code=f"f{i}")
+        )
+        url_ids.append(url.id)
+    return url_ids
+
+
+class TestVisitCounterFlusher:
+    async def test_writes_back_counted_visits_in_chunks(
+        self, url_repo: UrlRepository, fake_redis_server: FakeServer
+    ):
+        url_ids = await create_urls(url_repo, 5)
+        visit_counter = RedisVisitCounter("redis://fake")
+        for url_id in url_ids:
+            visit_counter.incr(url_id)
+        visit_counter.incr(url_ids[0])
+        await visit_counter.close()
+        visit_counter = RedisVisitCounter("redis://fake")
+        flusher = VisitCounterFlusher(visit_counter, lambda: url_repo, chunk_size=2)
+
+        assert await flusher.flush(url_repo) == 6
+
+        for url_id in url_ids:
+            url = await url_repo.get(url_id)
+            await url_repo.session.refresh(url)
+            assert await visit_counter.get(url_id) == (url.visit_count, 0)
+        assert (await url_repo.get(url_ids[0])).visit_count == 2
+        assert await flusher.flush(url_repo) == 0
+
+    async def test_failed_chunk_is_retried_without_recounting_earlier_ones(
+        self,
+        url_repo: UrlRepository,
+        fake_redis_server: FakeServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        url_ids = await create_urls(url_repo, 4)
+        visit_counter = RedisVisitCounter("redis://fake")
+        for url_id in url_ids:
+            visit_counter.incr(url_id)
+        await visit_counter.close()
+        visit_counter = RedisVisitCounter("redis://fake")
+        flusher = VisitCounterFlusher(visit_counter, lambda: url_repo, chunk_size=2)
+
+        increment = url_repo.bulk_increment_visit_counts
+        calls = 0
+
+        async def fail_second_chunk(counts, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError("database went away")
+            return await increment(counts, **kwargs)
+
+        monkeypatch.setattr(url_repo, "bulk_increment_visit_counts", fail_second_chunk)
+        with pytest.raises(RuntimeError):
+            await flusher.flush(url_repo)
+        monkeypatch.undo()
+
+        assert await visit_counter.take_pending() == {
+            url_id: 1 for url_id in url_ids[2:]
+        }
+        await visit_counter.end_flush()
+        assert await flusher.flush(url_repo) == 2
+        for url_id in url_ids:
+            url = await url_repo.get(url_id)
+            await url_repo.session.refresh(url)
+            assert url.visit_count == 1
+
+    async def test_chunk_committed_before_a_crash_is_not_counted_twice(
+        self,
+        url_repo: UrlRepository,
+        fake_redis_server: FakeServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        url_ids = await create_urls(url_repo, 4)
+        visit_counter = RedisVisitCounter("redis://fake")
+        for url_id in url_ids:
+            visit_counter.incr(url_id)
+        await visit_counter.close()
+        visit_counter = RedisVisitCounter("redis://fake")
+        flusher = VisitCounterFlusher(visit_counter, lambda: url_repo, chunk_size=2)
+
+        async def crash(url_ids, visit_counts):
+            raise RuntimeError("flusher died")
+
+        # The first chunk commits, but Redis never learns about it.
+        monkeypatch.setattr(visit_counter, "complete_flush", crash)
+        with pytest.raises(RuntimeError):
+            await flusher.flush(url_repo)
+        monkeypatch.undo()
+
+        assert await flusher.flush(url_repo) == 2
+        for url_id in url_ids:
+            url = await url_repo.get(url_id)
+            await url_repo.session.refresh(url)
+            assert url.visit_count == 1
+        assert await visit_counter.take_pending() == {}
+
+    async def test_stops_when_the_flush_is_taken_over(
+        self,
+        url_repo: UrlRepository,
+        fake_redis_server: FakeServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        url_ids = await create_urls(url_repo, 4)
+        visit_counter = RedisVisitCounter("redis://fake")
+        for url_id in url_ids:
+            visit_counter.incr(url_id)
+        await visit_counter.close()
+        visit_counter = RedisVisitCounter("redis://fake")
+        flusher = VisitCounterFlusher(visit_counter, lambda: url_repo, chunk_size=2)
+        renewals = iter([True, False])
+
+        async def lose_lease():
+            return next(renewals)
+
+        monkeypatch.setattr(visit_counter, "renew_flush", lose_lease)
+
+        assert await flusher.flush(url_repo) == 2
+        monkeypatch.undo()
+        assert await visit_counter.take_pending() == {
+            url_id: 1 for url_id in url_ids[2:]
+        }
@@ -0,0 +1,182 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fakeredis import FakeServer
+from sqlalchemy.exc import DBAPIError
+
+from src.core.infrastructures.dependency_injection.app_container import AppContainer
+from src.core.infrastructures.message_queue.in_memory import InMemoryMessageQueue
+from src.core.infrastructures.message_queue.redis_stream import (
+    RedisStreamMessageQueue,
+)
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visits_repository import VisitsRepository
+from src.log_worker.worker import LogWorker
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestLogWorker:
+    async def test_writes_visits_and_grows_batches_while_backed_up(
+        self,
+        test_container: AppContainer,
+        url_repo: UrlRepository,
+        visit_repo: VisitsRepository,
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="worker")
+        )
+        url_id = url.id
+        queue = InMemoryMessageQueue()
+        message = {
+            "original_url": url.original_url,
+            "url_id": url_id,
+            "short_code": "worker",
+            "ip_address": "10.0.0.1",
+        }
+        await queue.publish_many([message] * 70 + [{"malformed": True}])
+
+        worker = LogWorker(
+            queue,
+            url_repository_factory=test_container.url_repository,
+            visits_repository_factory=test_container.visits_repository,
+            visit_rollup_repository_factory=test_container.visit_rollup_repository,
+            writers=1,
+            min_batch_size=10,
+            max_batch_size=40,
+            idle_sleep=0.01,
+        )
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.5)
+        task.cancel()
+
+        assert await visit_repo.count_by_url_id(url_id) == 70
+        assert (await url_repo.get(url_id)).visit_count == 70
+        assert worker.batch_size == 40
+        rollups = await test_container.visit_rollup_repository().get_series(
+            url_id,
+            "day",
+            datetime(2000, 1, 1, tzinfo=timezone.utc),
+            datetime.now(timezone.utc),
+        )
+        assert [visits for _, visits in rollups] == [70]
+
+    async def test_sums_counts_across_batches_before_writing_them(
+        self,
+        test_container: AppContainer,
+        url_repo: UrlRepository,
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="sums")
+        )
+        url_id = url.id
+        queue = InMemoryMessageQueue()
+        message = {
+            "original_url": url.original_url,
+            "url_id": url_id,
+            "short_code": "sums",
+            "ip_address": "10.0.0.1",
+        }
+        await queue.publish_many([message] * 30)
+
+        worker = LogWorker(
+            queue,
+            url_repository_factory=test_container.url_repository,
+            visits_repository_factory=test_container.visits_repository,
+            writers=1,
+            min_batch_size=10,
+            max_batch_size=10,
+            idle_sleep=0.01,
+            counter_flush_interval=0.2,
+        )
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.5)
+        task.cancel()
+
+        assert (await url_repo.get(url_id)).visit_count == 30
+        assert worker.stats.batches == 3
+        assert worker.stats.counter_flushes == 1
+
+    async def test_retries_transactions_that_deadlock(
+        self, test_container: AppContainer, db_session
+    ):
+        class DeadlockDetected(Exception):
+            pgcode = "40P01"
+
+        attempts = []
+
+        async def transaction():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise DBAPIError("UPDATE url", {}, DeadlockDetected())
+
+        worker = LogWorker(
+            InMemoryMessageQueue(),
+            url_repository_factory=test_container.url_repository,
+            visits_repository_factory=test_container.visits_repository,
+        )
+        await worker._retry_on_deadlock(transaction, db_session)
+
+        assert len(attempts) == 3
+        assert worker.stats.deadlocks == 2
+
+    async def test_slow_batches_are_not_redelivered_while_being_written(
+        self,
+        test_container: AppContainer,
+        url_repo: UrlRepository,
+        visit_repo: VisitsRepository,
+        fake_redis_server: FakeServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="slow")
+        )
+        url_id = url.id
+        queue = RedisStreamMessageQueue(
+            "redis://fake", consumer_name="slow", block_ms=10, claim_idle_ms=300
+        )
+        # fakeredis answers without yielding to the event loop, so the worker
+        # has to sleep between empty reads.
+        queue.blocking_reads = False
+        other = RedisStreamMessageQueue(
+            "redis://fake", consumer_name="other", block_ms=10, claim_idle_ms=300
+        )
+        await queue.publish(
+            {
+                "original_url": url.original_url,
+                "url_id": url_id,
+                "short_code": "slow",
+                "ip_address": "10.0.0.1",
+            }
+        )
+
+        worker = LogWorker(
+            queue,
+            url_repository_factory=test_container.url_repository,
+            visits_repository_factory=test_container.visits_repository,
+            writers=1,
+            idle_sleep=0.01,
+        )
+        process_messages = worker.process_messages
+        batches = 0
+
+        async def slow_process_messages(*args, **kwargs):
+            nonlocal batches
+            batches += 1
+            if batches == 1:
+                await asyncio.sleep(1)
+            await process_messages(*args, **kwargs)
+
+        monkeypatch.setattr(worker, "process_messages", slow_process_messages)
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.7)
+
+        assert await other.get_batch(10) == []
+        await asyncio.sleep(0.8)
+        task.cancel()
+
+        assert batches == 1
+        assert await visit_repo.count_by_url_id(url_id) == 1
+        assert await queue.depth() == 0
@@ -0,0 +1,112 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visits_repository import VisitsRepository
+from src.maintenance.partitions import VisitPartitionManager
+
+pytestmark = pytest.mark.asyncio
+
+
+async def explain(session: AsyncSession, statement: Select) -> str:
+    compiled = statement.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    plan = await session.execute(text(f"EXPLAIN {compiled}"))
+    return "\n".join(plan.scalars())
+
+
+class TestVisitPartitionManager:
+    async def test_ensure_partitions_premakes_months(self, db_session: AsyncSession):
+        manager = VisitPartitionManager(db_session, premake_months=2)
+
+        created = await manager.ensure_partitions(date(2026, 11, 15))
+
+        assert created == ["visit_p202611", "visit_p202612", "visit_p202701"]
+        assert await manager.ensure_partitions(date(2026, 11, 20)) == []
+
+    async def test_visits_land_in_their_month_and_queries_prune(
+        self,
+        db_session: AsyncSession,
+        url_repo: UrlRepository,
+        visit_repo: VisitsRepository,
+    ):
+        await VisitPartitionManager(db_session, premake_months=1).ensure_partitions(
+            date(2026, 1, 1)
+        )
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="part")
+        )
+        url_id = url.id
+        await visit_repo.bulk_insert(
+            [
+                (url_id, "10.0.0.1", datetime(2026, 1, 31, 23, tzinfo=timezone.utc)),
+                (url_id, "10.0.0.2", datetime(2026, 2, 1, tzinfo=timezone.utc)),
+            ]
+        )
+
+        result = await db_session.execute(
+            text("SELECT tableoid::regclass::text FROM visit ORDER BY visited_at")
+        )
+        assert result.scalars().all() == ["visit_p202601", "visit_p202602"]
+
+        plan = await explain(
+            db_session,
+            visit_repo.count_by_url_id_query(
+                url_id, start=datetime(2026, 2, 1, tzinfo=timezone.utc)
+            ),
+        )
+        assert "visit_p202602" in plan
+        assert "visit_p202601" not in plan
+        assert (
+            await visit_repo.count_by_url_id(
+                url_id, end=datetime(2026, 2, 1, tzinfo=timezone.utc)
+            )
+            == 1
+        )
+
+    async def test_missed_months_are_moved_out_of_the_default_partition(
+        self,
+        db_session: AsyncSession,
+        url_repo: UrlRepository,
+        visit_repo: VisitsRepository,
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="late")
+        )
+        url_id = url.id
+        await visit_repo.bulk_insert(
+            [
+                (url_id, "10.0.0.1", datetime(2026, 3, 2, tzinfo=timezone.utc)),
+                (url_id, "10.0.0.2", datetime(2027, 1, 2, tzinfo=timezone.utc)),
+            ]
+        )
+        await db_session.commit()
+        manager = VisitPartitionManager(db_session, premake_months=0)
+
+        assert await manager.ensure_partitions(date(2026, 3, 1)) == ["visit_p202603"]
+
+        result = await db_session.execute(
+            text("SELECT tableoid::regclass::text FROM visit ORDER BY visited_at")
+        )
+        assert result.scalars().all() == ["visit_p202603", "visit_default"]
+        assert await manager.default_partition() == "visit_default"
+
+    async def test_expire_partitions_drops_partitions_past_retention(
+        self, db_session: AsyncSession
+    ):
+        manager = VisitPartitionManager(db_session, premake_months=2, retention_days=31)
+        await manager.ensure_partitions(date(2026, 1, 1))
+
+        expired = await manager.expire_partitions(date(2026, 3, 5))
+
+        assert expired == ["visit_p202601"]
+        assert sorted(await manager.list_partitions()) == [
+            date(2026, 2, 1),
+            date(2026, 3, 1),
+        ]
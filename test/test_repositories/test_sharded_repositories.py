@@ -0,0 +1,260 @@
+from datetime import datetime, timezone
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from src.core.common.exceptions import ShortCodeAlreadyExistsError
+from src.core.common.settings import Settings
+from src.core.infrastructures.bloom_filter.in_memory import InMemoryBloomFilter
+from src.core.infrastructures.cache.inmemory_cache import InMemoryCacheStorage
+from src.core.infrastructures.database.shards import ShardRouter
+from src.core.infrastructures.message_queue.buffer import MessageBuffer
+from src.core.infrastructures.message_queue.in_memory import InMemoryMessageQueue
+from src.core.infrastructures.visit_counter.redis import RedisVisitCounter
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.entities.visit_rollups import VisitRollup
+from src.core.shorten.entities.visits import Visit
+from src.core.shorten.repositories.sharded_repositories import (
+    ShardedUrlRepository,
+    ShardedVisitRollupRepository,
+    ShardedVisitsRepository,
+)
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visit_rollup_repository import (
+    VisitRollupRepository,
+)
+from src.core.shorten.repositories.visits_repository import VisitsRepository
+from src.core.shorten.services.url_shorten_service import UrlShortenService
+from src.core.shorten.services.url_visits_service import UrlVisitsService
+from src.core.shorten.utils.id_allocator import UrlIdAllocator
+from src.core.shorten.utils.shorten_strategy.base_62_shorten_stategy import (
+    Base62ShortCodeStrategy,
+)
+from src.core.shorten.utils.url_digest import url_digest
+
+pytestmark = pytest.mark.asyncio
+
+SHARD_DATABASES = ["kurt_test_shard1", "kurt_test_shard2"]
+
+
+@pytest_asyncio.fixture
+async def shard_sessions(
+    test_settings: Settings, db_session: AsyncSession
+) -> AsyncGenerator[list[AsyncSession], None]:
+    url = make_url(str(test_settings.postgres_dsn))
+    admin = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            for name in SHARD_DATABASES:
+                exists = await conn.scalar(
+                    text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                    {"name": name},
+                )
+                if not exists:
+                    await conn.execute(text(f'CREATE DATABASE "{name}"'))
+    except Exception as e:
+        pytest.skip(f"Cannot create shard databases: {e}")
+    finally:
+        await admin.dispose()
+
+    engines = [create_async_engine(url.set(database=name)) for name in SHARD_DATABASES]
+    sessions = [db_session]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+            await conn.run_sync(SQLModel.metadata.create_all)
+        sessions.append(AsyncSession(engine, expire_on_commit=False))
+    yield sessions
+    for session in sessions[1:]:
+        await session.close()
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture
+def router() -> ShardRouter:
+    return ShardRouter(len(SHARD_DATABASES) + 1)
+
+
+@pytest.fixture
+def url_repository(
+    shard_sessions: list[AsyncSession], router: ShardRouter
+) -> ShardedUrlRepository:
+    return ShardedUrlRepository(
+        [UrlRepository(URL, session) for session in shard_sessions], router
+    )
+
+
+@pytest.fixture
+def service(
+    url_repository: ShardedUrlRepository, router: ShardRouter
+) -> UrlShortenService:
+    return UrlShortenService(
+        url_repository=url_repository,
+        short_code_strategy=Base62ShortCodeStrategy(),
+        short_code_filter=InMemoryBloomFilter(),
+        id_allocator=UrlIdAllocator(block_size=10, router=router),
+        cache_storage=InMemoryCacheStorage(),
+    )
+
+
+async def _shard_rows(
+    sessions: list[AsyncSession], statement: str
+) -> list[list[tuple]]:
+    return [list(await session.execute(text(statement))) for session in sessions]
+
+
+class TestShardRouter:
+    async def test_keys_spread_over_every_shard(self, router: ShardRouter):
+        shards = [router.shard_for_id(url_id) for url_id in range(3000)]
+
+        assert {shard: shards.count(shard) > 700 for shard in range(3)} == {
+            0: True,
+            1: True,
+            2: True,
+        }
+
+    async def test_adding_a_shard_moves_few_keys(self, router: ShardRouter):
+        grown = ShardRouter(router.shard_count + 1)
+        moved = sum(
+            router.shard_for_id(url_id) != grown.shard_for_id(url_id)
+            for url_id in range(3000)
+        )
+
+        assert moved < 3000 / 3
+
+
+class TestShardedUrlRepository:
+    async def test_urls_live_on_the_shard_of_their_id(
+        self,
+        service: UrlShortenService,
+        shard_sessions: list[AsyncSession],
+        router: ShardRouter,
+    ):
+        original_urls = [f"https://example.com/{i}" for i in range(30)]
+
+        short_codes = await service.create_short_urls(original_urls)
+
+        rows = await _shard_rows(shard_sessions, "SELECT id, original_url FROM url")
+        assert sum(map(len, rows)) == 30
+        for shard, shard_rows in enumerate(rows):
+            for url_id, original_url in shard_rows:
+                assert router.shard_for_id(url_id) == shard
+                assert router.shard_for_key(url_digest(original_url)) == shard
+        for original_url, short_code in zip(original_urls, short_codes):
+            url = await service.url_repository.get_by_short_code(
+                short_code, service.short_code_strategy.decode(short_code)
+            )
+            assert url.original_url == original_url
+
+    async def test_shortening_again_finds_the_url_on_its_shard(
+        self, service: UrlShortenService
+    ):
+        first = await service.create_short_url("https://example.com/again")
+        service.cache_storage.clear()
+
+        second = await service.create_short_url("https://example.com/again")
+        [batch_code] = await service.create_short_urls(["https://example.com/again"])
+
+        assert second == first
+        assert batch_code == first.short_code
+
+    async def test_custom_code_clashing_with_a_generated_code_is_rejected(
+        self, service: UrlShortenService
+    ):
+        generated = await service.create_short_url("https://example.com/generated")
+
+        with pytest.raises(ShortCodeAlreadyExistsError):
+            await service.create_short_url(
+                "https://example.com/custom", custom_code=generated.short_code
+            )
+
+    async def test_custom_code_is_found_by_its_code(self, service: UrlShortenService):
+        await service.create_short_url("https://example.com/custom", "my-code")
+
+        url = await service.url_repository.get_by_short_code("my-code")
+
+        assert url.original_url == "https://example.com/custom"
+
+    async def test_get_and_visits_lookup_use_the_shard_of_the_id(
+        self, service: UrlShortenService
+    ):
+        codes = await service.create_short_urls(
+            [f"https://example.com/{i}" for i in range(10)]
+        )
+
+        for code in codes:
+            url_id = service.short_code_strategy.decode(code)
+            assert (await service.url_repository.get(url_id)).short_code == code
+            url = await service.url_repository.get_with_visits_by_short_code(
+                code, url_id
+            )
+            assert url.id == url_id
+            assert url.visits == []
+
+    async def test_single_session_methods_are_not_offered(
+        self, url_repository: ShardedUrlRepository
+    ):
+        for method in ("create", "update", "increment_visit_count"):
+            assert not hasattr(url_repository, method)
+
+    async def test_stats_with_a_visit_counter(
+        self,
+        service: UrlShortenService,
+        url_repository: ShardedUrlRepository,
+        shard_sessions: list[AsyncSession],
+        router: ShardRouter,
+        fake_redis_server,
+    ):
+        codes = await service.create_short_urls(
+            [f"https://example.com/{i}" for i in range(10)]
+        )
+        visits_service = UrlVisitsService(
+            url_repository=url_repository,
+            visit_rollup_repository=ShardedVisitRollupRepository(
+                [
+                    VisitRollupRepository(VisitRollup, session)
+                    for session in shard_sessions
+                ],
+                router,
+            ),
+            visit_buffer=MessageBuffer(InMemoryMessageQueue()),
+            cache_storage=InMemoryCacheStorage(),
+            short_code_filter=InMemoryBloomFilter(),
+            short_code_strategy=service.short_code_strategy,
+            visit_counter=RedisVisitCounter("redis://fake"),
+        )
+
+        for code in codes:
+            assert await visits_service.get_url_stats(code) == 0
+
+
+class TestShardedVisitsRepository:
+    async def test_visits_are_stored_with_their_url(
+        self,
+        service: UrlShortenService,
+        shard_sessions: list[AsyncSession],
+        router: ShardRouter,
+    ):
+        codes = await service.create_short_urls(
+            [f"https://example.com/{i}" for i in range(10)]
+        )
+        url_ids = [service.short_code_strategy.decode(code) for code in codes]
+        visits_repository = ShardedVisitsRepository(
+            [VisitsRepository(Visit, session) for session in shard_sessions], router
+        )
+
+        await visits_repository.bulk_insert(
+            [(url_id, "127.0.0.1", datetime.now(timezone.utc)) for url_id in url_ids]
+        )
+        await visits_repository.session.commit()
+
+        rows = await _shard_rows(shard_sessions, "SELECT url_id FROM visit")
+        for shard, shard_rows in enumerate(rows):
+            assert {router.shard_for_id(url_id) for (url_id,) in shard_rows} <= {shard}
+        assert await visits_repository.count_by_url_id(url_ids[0]) == 1
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.core.common.settings import Settings
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.entities.visits import Visit
+from src.core.shorten.repositories.url_repository import UrlRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestUrlRepository:
+    async def test_get_by_short_code_falls_back_when_id_does_not_match(
+        self, url_repo: UrlRepository
+    ):
+        generated = await url_repo.create(
+            obj_in=URL(original_url="https://a.example", short_code="gen")
+        )
+        custom = await url_repo.create(
+            obj_in=URL(original_url="https://b.example", short_code="vanity")
+        )
+        generated_id, custom_id = generated.id, custom.id
+
+        by_id = await url_repo.get_by_short_code("gen", url_id=generated_id)
+        fallback = await url_repo.get_by_short_code("vanity", url_id=generated_id)
+
+        assert by_id.id == generated_id
+        assert fallback.id == custom_id
+
+    async def test_bulk_increment_visit_counts_beyond_the_parameter_limit(
+        self, url_repo: UrlRepository
+    ):
+        count = 20_000
+        ids = await url_repo.reserve_ids(count)
+        await url_repo.bulk_insert(
+            ids,
+            [f"https://example.com/{i}" for i in range(count)],
+            [f"c{i}" for i in range(count)],
+        )
+
+        await url_repo.lock_for_update(ids)
+        visit_counts = await url_repo.bulk_increment_visit_counts(
+            {url_id: 2 for url_id in ids}
+        )
+
+        assert visit_counts == {url_id: 2 for url_id in ids}
+
+    async def test_locked_urls_still_accept_visits(
+        self, url_repo: UrlRepository, test_settings: Settings
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="locked")
+        )
+        url_id = url.id
+        await url_repo.lock_for_update([url_id])
+
+        engine = create_async_engine(str(test_settings.postgres_dsn))
+        try:
+            async with AsyncSession(engine) as other:
+                await other.execute(text("SET lock_timeout = '1s'"))
+                await other.execute(
+                    insert(Visit).values(url_id=url_id, visitor_ip="127.0.0.1")
+                )
+                await other.commit()
+        finally:
+            await engine.dispose()
+        await url_repo.session.rollback()
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.api_server.app import AppContainer
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visit_rollup_repository import (
+    VisitRollupRepository,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestVisitRollupRepository:
+    async def test_bulk_add_visits_beyond_the_parameter_limit(
+        self, url_repo: UrlRepository, test_container: AppContainer
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="rollup")
+        )
+        rollup_repo: VisitRollupRepository = test_container.visit_rollup_repository()
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # 4 parameters per key would pass the 32767 limit of one statement.
+        counts = {
+            (url.id, "hour", start + timedelta(hours=hour)): 1 for hour in range(10_000)
+        }
+
+        await rollup_repo.bulk_add_visits(counts)
+        await rollup_repo.bulk_add_visits(counts)
+
+        series = await rollup_repo.get_series(
+            url.id, "hour", start, start + timedelta(hours=10_000)
+        )
+        assert len(series) == 10_000
+        assert {visits for _, visits in series} == {2}
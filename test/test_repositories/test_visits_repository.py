@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core.shorten.entities.urls import URL
+from src.core.shorten.repositories.url_repository import UrlRepository
+from src.core.shorten.repositories.visits_repository import VisitsRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestVisitsRepository:
+    async def test_bulk_insert_writes_rows_in_session_transaction(
+        self, url_repo: UrlRepository, visit_repo: VisitsRepository
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://example.com", short_code="copy")
+        )
+        url_id = url.id
+        # The COPY has to be the first statement of its transaction.
+        await url_repo.session.commit()
+
+        now = datetime.now(timezone.utc)
+        await visit_repo.bulk_insert(
+            [(url_id, "10.0.0.1", now), (url_id, "10.0.0.2", now)]
+        )
+        assert await visit_repo.count_by_url_id(url_id) == 2
+
+        await visit_repo.session.rollback()
+        assert await visit_repo.count_by_url_id(url_id) == 0
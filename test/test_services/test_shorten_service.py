@@ -1,8 +1,17 @@
 import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from typing import Set
 
 import pytest
-from src.core.common.exceptions import NotFoundException
+from src.core.common.exceptions import (
+    BadRequestException,
+    NotFoundException,
+    ShortCodeAllocationError,
+    ShortCodeAlreadyExistsError,
+)
+from src.core.infrastructures.cache.decorators import NEGATIVE_RESULT
+from src.core.infrastructures.visit_counter.database import DatabaseVisitCounter
 from src.core.shorten.entities.urls import URL
 from src.core.shorten.repositories.url_repository import UrlRepository
 from src.core.shorten.services.url_shorten_service import UrlShortenService
@@ -38,15 +47,92 @@ class TestUrlShortenService:
         self, url_shorten_service: UrlShortenService, url_repo: UrlRepository
     ):
         long_url = "https://www.github.com/Dawoodkhorsandi/kurt2"
-        initial_url = await url_repo.create(
-            obj_in=URL(original_url=long_url, short_code="existing")
-        )
+        initial_url = await url_repo.insert(long_url, "existing", deduplicate=True)
 
         retrieved_url = await url_shorten_service.create_short_url(long_url)
 
         assert retrieved_url.id == initial_url.id
         assert retrieved_url.short_code == "existing"
 
+    async def test_create_short_url_with_taken_custom_code(
+        self, url_shorten_service: UrlShortenService
+    ):
+        await url_shorten_service.create_short_url("https://a.example", "taken")
+
+        with pytest.raises(ShortCodeAlreadyExistsError):
+            await url_shorten_service.create_short_url("https://b.example", "taken")
+
+    async def test_create_short_url_skips_ids_whose_code_is_taken(
+        self, url_shorten_service: UrlShortenService, url_repo: UrlRepository
+    ):
+        # The custom url takes next_id + 1, and the code of next_id + 2.
+        [next_id] = await url_repo.reserve_ids(1)
+        strategy = url_shorten_service.short_code_strategy
+        await url_shorten_service.create_short_url(
+            "https://custom.example", strategy.generate(next_id + 2)
+        )
+        url_shorten_service.id_allocator.block_size = 2
+
+        created_url = await url_shorten_service.create_short_url("https://a.example")
+
+        assert created_url.id == next_id + 3
+        assert created_url.short_code == strategy.generate(next_id + 3)
+
+    async def test_create_short_url_gives_up_when_codes_keep_colliding(
+        self, url_shorten_service: UrlShortenService, monkeypatch
+    ):
+        await url_shorten_service.create_short_url("https://custom.example", "taken")
+        strategy = url_shorten_service.short_code_strategy
+        monkeypatch.setattr(strategy, "generate", lambda url_id: "taken")
+        monkeypatch.setattr(
+            strategy, "generate_many", lambda ids: ["taken" for _ in ids]
+        )
+
+        with pytest.raises(ShortCodeAllocationError):
+            await url_shorten_service.create_short_url("https://a.example")
+        with pytest.raises(ShortCodeAllocationError):
+            await url_shorten_service.create_short_urls(["https://b.example"])
+
+    async def test_custom_codes_are_not_reused_for_later_shortens(
+        self, url_shorten_service: UrlShortenService, url_repo: UrlRepository
+    ):
+        long_url = "https://www.example.com/custom"
+        await url_shorten_service.create_short_url(long_url, custom_code="vanity")
+
+        first = await url_shorten_service.create_short_url(long_url)
+        second = await url_shorten_service.create_short_url(long_url)
+
+        assert first.short_code != "vanity"
+        assert second == first
+        assert (await url_repo.get_by_original_url(long_url)).id == first.id
+
+    async def test_created_urls_are_not_reused_for_later_shortens(
+        self, url_shorten_service: UrlShortenService, url_repo: UrlRepository
+    ):
+        long_url = "https://www.example.com/created"
+        await url_repo.create(obj_in=URL(original_url=long_url, short_code="made"))
+        await url_repo.create(obj_in=URL(original_url=long_url, short_code="again"))
+
+        url = await url_shorten_service.create_short_url(long_url)
+
+        assert url.short_code not in ("made", "again")
+
+    async def test_create_short_urls_keeps_input_order_and_existing_codes(
+        self, url_shorten_service: UrlShortenService, url_repo: UrlRepository
+    ):
+        existing = await url_shorten_service.create_short_url("https://a.example")
+        existing_code = existing.short_code
+
+        short_codes = await url_shorten_service.create_short_urls(
+            ["https://b.example", "https://a.example", "https://b.example"]
+        )
+
+        assert short_codes[1] == existing_code
+        assert short_codes[0] == short_codes[2] != existing_code
+        created = await url_repo.get_by_short_code(short_codes[0])
+        assert created.original_url == "https://b.example"
+        assert await url_shorten_service.short_code_filter.might_contain(short_codes[0])
+
 
 class TestUrlVisitsService:
     async def test_get_original_url_and_logs_visit(
@@ -74,12 +160,80 @@ class TestUrlVisitsService:
         assert f'"short_code":"{short_code}"' in messages[0]
         assert '"ip_address":"127.0.0.1"' in messages[0]
 
+    async def test_get_original_url_is_cached_per_short_code(
+        self, url_visits_service: UrlVisitsService, url_repo: UrlRepository
+    ):
+        await url_repo.create(
+            obj_in=URL(original_url="https://www.python.org/", short_code="cached")
+        )
+
+        await url_visits_service.get_original_url(
+            short_code="cached", ip_address="10.0.0.1", user_agent="first"
+        )
+        await url_visits_service.get_original_url(
+            short_code="cached", ip_address="10.0.0.2", user_agent="second"
+        )
+
+        assert len(url_visits_service.cache_storage) == 1
+
+        await url_visits_service.invalidate_original_url("cached")
+
+        assert len(url_visits_service.cache_storage) == 0
+
     async def test_get_original_url_not_found(
         self, url_visits_service: UrlVisitsService
     ):
         with pytest.raises(NotFoundException, match="Short code not found."):
             await url_visits_service.get_original_url(short_code="nonexistent")
 
+    async def test_unknown_short_code_is_rejected_without_database_lookup(
+        self,
+        url_visits_service: UrlVisitsService,
+        url_repo: UrlRepository,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        await url_repo.create(
+            obj_in=URL(original_url="https://www.python.org/", short_code="known")
+        )
+        await url_visits_service.short_code_filter.rebuild(url_repo.iter_short_codes())
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("the database should not be queried")
+
+        monkeypatch.setattr(
+            url_visits_service.url_repository, "get_by_short_code", fail
+        )
+
+        with pytest.raises(NotFoundException, match="Short code not found."):
+            await url_visits_service.get_original_url(short_code="unknown")
+        cache_key = UrlVisitsService.resolve_short_code.cache_key(
+            url_visits_service, short_code="unknown"
+        )
+        assert await url_visits_service.cache_storage.get(cache_key) == NEGATIVE_RESULT
+
+    async def test_created_code_is_no_longer_cached_as_missing(
+        self,
+        url_visits_service: UrlVisitsService,
+        url_shorten_service: UrlShortenService,
+    ):
+        with pytest.raises(NotFoundException):
+            await url_visits_service.get_original_url(short_code="fresh")
+        created = await url_shorten_service.create_short_url(
+            "https://a.example", "fresh"
+        )
+        # Ids are handed out in order, so the batch gets the next one.
+        next_code = url_shorten_service.short_code_strategy.generate(created.id + 1)
+        with pytest.raises(NotFoundException):
+            await url_visits_service.get_original_url(short_code=next_code)
+
+        [code] = await url_shorten_service.create_short_urls(["https://b.example"])
+
+        url = await url_visits_service.get_original_url(short_code="fresh")
+        assert url.original_url == "https://a.example"
+        assert code == next_code
+        url = await url_visits_service.get_original_url(short_code=code)
+        assert url.original_url == "https://b.example"
+
     async def test_get_url_stats(
         self, url_visits_service: UrlVisitsService, url_repo: UrlRepository
     ):
@@ -94,3 +248,71 @@ class TestUrlVisitsService:
         visit_count = await url_visits_service.get_url_stats(short_code="python")
 
         assert visit_count == 42
+
+    async def test_get_url_stats_adds_unflushed_visits_from_counter(
+        self,
+        url_visits_service: UrlVisitsService,
+        url_repo: UrlRepository,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        class FakeVisitCounter(DatabaseVisitCounter):
+            enabled = True
+
+            def __init__(self):
+                self.bases = {}
+                self.visits = Counter()
+
+            def incr(self, url_id: int) -> None:
+                self.visits[url_id] += 1
+
+            async def get(self, url_id: int):
+                return self.bases.get(url_id), self.visits[url_id]
+
+            async def set_base(self, url_id: int, visit_count: int) -> None:
+                self.bases.setdefault(url_id, visit_count)
+
+        url = await url_repo.create(
+            obj_in=URL(
+                original_url="https://www.python.org/",
+                short_code="python",
+                visit_count=42,
+            )
+        )
+        url_id = url.id
+        url_visits_service.visit_counter = FakeVisitCounter()
+
+        await url_visits_service.get_original_url(short_code="python")
+        assert await url_visits_service.get_url_stats(short_code="python") == 43
+        assert url_visits_service.visit_counter.bases == {url_id: 42}
+
+        # The base is now known, so the database is no longer asked.
+        monkeypatch.setattr(url_visits_service.url_repository, "get", None)
+        await url_visits_service.get_original_url(short_code="python")
+        assert await url_visits_service.get_url_stats(short_code="python") == 44
+
+    async def test_get_url_timeseries_fills_empty_buckets(
+        self, url_visits_service: UrlVisitsService, url_repo: UrlRepository
+    ):
+        url = await url_repo.create(
+            obj_in=URL(original_url="https://www.python.org/", short_code="python")
+        )
+        day = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        await url_visits_service.visit_rollup_repository.bulk_add_visits(
+            {
+                (url.id, "hour", day + timedelta(hours=1)): 3,
+                (url.id, "hour", day + timedelta(hours=3)): 1,
+                (url.id, "day", day): 4,
+            }
+        )
+
+        points = await url_visits_service.get_url_timeseries(
+            "python", bucket="hour", start=day, end=day + timedelta(hours=4)
+        )
+
+        assert [visits for _, visits in points] == [0, 3, 0, 1]
+        assert points[0][0] == day
+
+        with pytest.raises(BadRequestException):
+            await url_visits_service.get_url_timeseries(
+                "python", bucket="day", start=day, end=day
+            )
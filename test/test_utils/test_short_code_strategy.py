@@ -0,0 +1,40 @@
+import pytest
+
+from src.core.shorten.utils.shorten_strategy.base_62_shorten_stategy import (
+    Base62ShortCodeStrategy,
+)
+from src.core.shorten.utils.shorten_strategy.feistel_shorten_strategy import (
+    FeistelShortCodeStrategy,
+)
+
+IDS = [0, 1, 2, 61, 62, 2**40 - 1, 2**40, 2**63 - 1]
+
+
+class TestBase62ShortCodeStrategy:
+    def test_decode_inverts_generate(self):
+        strategy = Base62ShortCodeStrategy()
+
+        assert strategy.decode_many(strategy.generate_many(IDS)) == IDS
+
+    @pytest.mark.parametrize("short_code", ["", "00", "01", "a-b", "zzzzzzzzzzzz"])
+    def test_decode_rejects_codes_it_never_generates(self, short_code):
+        assert Base62ShortCodeStrategy().decode(short_code) is None
+
+
+class TestFeistelShortCodeStrategy:
+    def test_decode_inverts_generate(self):
+        strategy = FeistelShortCodeStrategy("secret")
+        url_ids = IDS + list(range(63, 10_000))
+
+        short_codes = strategy.generate_many(url_ids)
+
+        assert len(set(short_codes)) == len(url_ids)
+        assert strategy.decode_many(short_codes) == url_ids
+        assert [strategy.generate(url_id) for url_id in url_ids] == short_codes
+
+    def test_codes_depend_on_the_secret(self):
+        first = FeistelShortCodeStrategy("first").generate_many(range(1, 100))
+        second = FeistelShortCodeStrategy("second").generate_many(range(1, 100))
+
+        assert all(a != b for a, b in zip(first, second))
+        assert max(len(short_code) for short_code in first) <= 7